@@ -0,0 +1,214 @@
+"""
+In-memory audio decoding for Whisper
+
+Turns uploaded bytes into the float32 mono 16 kHz array Whisper's
+``transcribe`` accepts directly, without temp files:
+
+- WAV (PCM 8/16/24/32-bit or float) and raw PCM are parsed with NumPy
+- Other containers (WebM/Opus, Ogg, MP3, M4A...) are decoded in-process
+  with PyAV when it is installed, otherwise piped through ffmpeg's
+  stdin/stdout
+"""
+import io
+import struct
+import sys
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import av
+except ImportError:
+    av = None
+
+# Add shared utilities to path
+sys.path.append(str(Path(__file__).parent.parent / 'shared'))
+
+from resampling import resample
+
+SAMPLE_RATE = 16000
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+class AudioDecodeError(Exception):
+    """Raised when audio bytes cannot be decoded"""
+
+def parse_content_type(content_type: Optional[str]) -> Tuple[str, dict]:
+    """Split 'audio/L16; rate=16000; channels=1' into mime type and params"""
+    if not content_type:
+        return "", {}
+
+    mime, *params = [part.strip() for part in content_type.split(";")]
+    options = {}
+    for param in params:
+        if "=" in param:
+            key, value = param.split("=", 1)
+            options[key.strip().lower()] = value.strip()
+
+    return mime.lower(), options
+
+def pcm_to_float(samples: bytes, sample_width: int, float_format: bool = False,
+                 big_endian: bool = False) -> np.ndarray:
+    """Interleaved PCM samples to float32 in [-1, 1]"""
+    order = ">" if big_endian else "<"
+
+    if float_format:
+        if sample_width not in (4, 8):
+            raise AudioDecodeError(f"Unsupported float sample width: {sample_width}")
+        return np.frombuffer(samples, dtype=f"{order}f{sample_width}").astype(np.float32)
+
+    if sample_width == 1:
+        # 8-bit PCM is unsigned
+        return (np.frombuffer(samples, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if sample_width == 2:
+        return np.frombuffer(samples, dtype=f"{order}i2").astype(np.float32) / 32768.0
+    if sample_width == 3:
+        raw = np.frombuffer(samples, dtype=np.uint8)
+        raw = raw[:len(raw) - len(raw) % 3].reshape(-1, 3).astype(np.int32)
+        if big_endian:
+            raw = raw[:, ::-1]
+        values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        values = np.where(values & 0x800000, values - (1 << 24), values)
+        return values.astype(np.float32) / 8388608.0
+    if sample_width == 4:
+        return np.frombuffer(samples, dtype=f"{order}i4").astype(np.float32) / 2147483648.0
+
+    raise AudioDecodeError(f"Unsupported PCM sample width: {sample_width}")
+
+def to_mono(audio: np.ndarray, channels: int) -> np.ndarray:
+    """Average interleaved channels"""
+    if channels <= 1:
+        return audio
+    frames = len(audio) // channels
+    return audio[:frames * channels].reshape(frames, channels).mean(axis=1)
+
+def parse_wav(data: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    """Decode a RIFF/WAVE file to (mono float32 samples, sample rate); None if not WAV"""
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+
+    view = memoryview(data)
+    fmt = None
+    samples = None
+    pos = 12
+
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        size = struct.unpack_from("<I", data, pos + 4)[0]
+        body_start = pos + 8
+
+        if chunk_id == b"fmt ":
+            if size < 16 or body_start + 16 > len(data):
+                raise AudioDecodeError("WAV fmt chunk is truncated")
+            format_tag, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body_start)
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and size >= 26 and body_start + 26 <= len(data):
+                format_tag = struct.unpack_from("<H", data, body_start + 24)[0]
+            fmt = (format_tag, channels, sample_rate, bits)
+        elif chunk_id == b"data":
+            # Streamed recordings often leave the data size at 0 or 0xFFFFFFFF
+            end = body_start + size if 0 < size <= len(data) - body_start else len(data)
+            samples = view[body_start:end]
+            break
+
+        pos = body_start + size + (size & 1)
+
+    if fmt is None or samples is None:
+        raise AudioDecodeError("WAV file is missing its fmt or data chunk")
+
+    format_tag, channels, sample_rate, bits = fmt
+    if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+        raise AudioDecodeError(f"Unsupported WAV encoding: 0x{format_tag:04x}")
+    if channels == 0 or sample_rate == 0 or bits == 0 or bits % 8:
+        raise AudioDecodeError(f"Invalid WAV format: {channels} channels, {sample_rate} Hz, {bits} bits")
+
+    sample_width = bits // 8
+    usable = len(samples) - len(samples) % (sample_width * channels)
+    audio = pcm_to_float(samples[:usable], sample_width, float_format=format_tag == WAVE_FORMAT_IEEE_FLOAT)
+
+    return to_mono(audio, channels), sample_rate
+
+def decode_pcm(data: bytes, sample_rate: int = SAMPLE_RATE, channels: int = 1,
+               sample_width: int = 2, big_endian: bool = False) -> np.ndarray:
+    """Raw interleaved integer PCM to mono float32 at 16 kHz"""
+    usable = len(data) - len(data) % (sample_width * channels)
+    audio = to_mono(pcm_to_float(data[:usable], sample_width, big_endian=big_endian), channels)
+    return resample(audio, sample_rate, SAMPLE_RATE)
+
+def decode_with_pyav(data: bytes) -> np.ndarray:
+    """Decode any container/codec in-process with PyAV"""
+    chunks = []
+    with av.open(io.BytesIO(data), mode="r") as container:
+        stream = container.streams.audio[0]
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+
+        for frame in container.decode(stream):
+            for out in resampler.resample(frame):
+                chunks.append(out.to_ndarray().reshape(-1))
+
+        # Drain samples buffered inside the resampler
+        for out in resampler.resample(None):
+            chunks.append(out.to_ndarray().reshape(-1))
+
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+
+    return np.concatenate(chunks).astype(np.float32) / 32768.0
+
+def decode_with_ffmpeg(data: bytes, **input_options) -> np.ndarray:
+    """Decode by piping bytes through ffmpeg (no files on disk)"""
+    import ffmpeg
+
+    try:
+        out, _ = (
+            ffmpeg.input("pipe:0", threads=0, **input_options)
+            .output("pipe:1", format="s16le", acodec="pcm_s16le", ac=1, ar=SAMPLE_RATE)
+            .run(cmd=["ffmpeg", "-nostdin"], input=data, capture_stdout=True, capture_stderr=True)
+        )
+    except ffmpeg.Error as e:
+        raise AudioDecodeError(f"ffmpeg failed to decode audio: {e.stderr.decode(errors='ignore').strip()[-300:]}")
+
+    return np.frombuffer(out, dtype=np.int16).astype(np.float32) / 32768.0
+
+def decode_audio(data: bytes, content_type: Optional[str] = None) -> np.ndarray:
+    """
+    Decode uploaded audio bytes to float32 mono 16 kHz samples
+
+    Args:
+        data: Encoded audio (any format ffmpeg understands) or raw PCM
+        content_type: Optional MIME type; 'audio/L16' (big-endian) and
+                      'audio/pcm' (little-endian) with rate/channels params
+                      select the raw PCM path
+
+    Returns:
+        Samples in [-1, 1] ready for ``whisper.transcribe``
+    """
+    if not data:
+        raise AudioDecodeError("Empty audio data")
+
+    mime, params = parse_content_type(content_type)
+
+    if mime in ("audio/l16", "audio/pcm", "audio/x-pcm", "audio/raw"):
+        try:
+            sample_rate = int(params.get("rate", SAMPLE_RATE))
+            channels = int(params.get("channels", 1))
+        except ValueError:
+            raise AudioDecodeError(f"Invalid PCM parameters in content type: {content_type}")
+        if sample_rate <= 0 or channels <= 0:
+            raise AudioDecodeError(f"Invalid PCM parameters in content type: {content_type}")
+        return decode_pcm(data, sample_rate=sample_rate, channels=channels, big_endian=mime == "audio/l16")
+
+    wav = parse_wav(data)
+    if wav is not None:
+        audio, sample_rate = wav
+        return resample(audio, sample_rate, SAMPLE_RATE)
+
+    if av is not None:
+        try:
+            return decode_with_pyav(data)
+        except Exception as e:
+            print(f"⚠️ PyAV decode failed, falling back to ffmpeg: {e}")
+
+    return decode_with_ffmpeg(data)
@@ -34,9 +34,13 @@ streaming:
   enabled: true
   chunk_size: 1024
   overlap_duration: 0.5  # seconds
-  silence_threshold: 0.1
+  silence_threshold: 0.1  # energy VAD: fraction of the noise-to-speech level gap
   min_speech_duration: 0.5
   max_silence_duration: 2.0
+  partial_interval: 1.0  # seconds of new speech between partial results
+  max_window_duration: 15.0  # longer speech is cut into overlapping windows
+  vad: "energy"  # energy, webrtc (needs webrtcvad)
+  vad_aggressiveness: 2  # webrtc only, 0-3
 
 # Post-processing Settings
 post_processing:
@@ -0,0 +1,254 @@
+"""
+Streaming transcription with voice activity detection
+
+Audio is cut into short frames and classified as speech or silence. Speech
+opens a segment (with a little pre-roll so the first word is not clipped)
+and the segment is transcribed once as a final hypothesis when the speaker
+pauses for ``max_silence_duration``. While a segment grows, partial
+hypotheses are emitted every ``partial_interval`` seconds so captions can
+update live. Segments longer than ``max_window_duration`` are cut and the
+next window starts ``overlap_duration`` seconds before the cut; words the
+overlap repeats are dropped. Finished text is carried into the next window
+as the decoder prompt.
+"""
+import logging
+import re
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+logger = logging.getLogger(__name__)
+
+class EnergyVAD:
+    """Frame RMS against an adaptive noise floor
+
+    A frame is speech when its RMS clears the noise floor by
+    ``threshold`` of the gap between floor and recent peak level, and is at
+    least twice the floor. The floor follows quiet frames, so the detector
+    adapts to the room instead of relying on an absolute level.
+    """
+
+    def __init__(self, threshold: float = 0.1, min_rms: float = 0.002,
+                 noise_adapt: float = 0.05, peak_decay: float = 0.999):
+        self.threshold = threshold
+        self.min_rms = min_rms
+        self.noise_adapt = noise_adapt
+        self.peak_decay = peak_decay
+        self.noise_floor: Optional[float] = None
+        self.peak = min_rms
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        rms = float(np.sqrt(np.mean(np.square(frame, dtype=np.float64))))
+        if self.noise_floor is None:
+            self.noise_floor = rms
+
+        level = self.noise_floor + self.threshold * (self.peak - self.noise_floor)
+        speech = rms > max(level, self.min_rms, 2.0 * self.noise_floor)
+
+        if rms < self.noise_floor:
+            # Fall quickly so a loud start does not mask the real floor
+            self.noise_floor = 0.5 * (self.noise_floor + rms)
+        elif not speech:
+            self.noise_floor += self.noise_adapt * (rms - self.noise_floor)
+        self.peak = max(rms, self.peak * self.peak_decay)
+
+        return speech
+
+class WebRtcVAD:
+    """WebRTC's GMM voice detector (10/20/30 ms frames at 8/16/32/48 kHz)"""
+
+    def __init__(self, sample_rate: int = 16000, aggressiveness: int = 2):
+        self.sample_rate = sample_rate
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        pcm = (np.clip(frame, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+        return self.vad.is_speech(pcm, self.sample_rate)
+
+def create_vad(kind: str = "energy", sample_rate: int = 16000, threshold: float = 0.1,
+               aggressiveness: int = 2):
+    """'webrtc' when the webrtcvad package is installed, energy otherwise"""
+    if kind == "webrtc":
+        if webrtcvad is not None:
+            return WebRtcVAD(sample_rate, aggressiveness)
+        logger.warning("webrtcvad is not installed, using the energy VAD")
+    return EnergyVAD(threshold)
+
+def _words(text: str) -> List[str]:
+    return [re.sub(r"[^\w']", "", word).lower() for word in text.split()]
+
+def merge_overlap(previous: str, text: str, max_words: int = 8) -> str:
+    """Drop the leading words of ``text`` that repeat the end of ``previous``"""
+    tail = _words(previous)[-max_words:]
+    words = text.split()
+    head = _words(text)[:max_words]
+
+    for size in range(min(len(tail), len(head)), 0, -1):
+        if tail[-size:] == head[:size]:
+            return " ".join(words[size:])
+    return text
+
+class StreamingTranscriber:
+    def __init__(self, transcribe: Callable[[np.ndarray, Optional[str], bool], Dict],
+                 sample_rate: int = 16000, vad=None, frame_duration: float = 0.03,
+                 overlap_duration: float = 0.5, max_silence_duration: float = 2.0,
+                 min_speech_duration: float = 0.5, partial_interval: float = 1.0,
+                 max_window_duration: float = 15.0, max_prompt_chars: int = 200):
+        """
+        Args:
+            transcribe: ``transcribe(audio, prompt, partial)`` returning a
+                        result dict with at least 'text'
+            sample_rate: Rate of the audio passed to ``feed``
+            vad: Object with ``is_speech(frame)``; energy VAD by default
+            frame_duration: VAD frame length in seconds
+            overlap_duration: Pre-roll before speech and overlap between windows
+            max_silence_duration: Pause that ends a segment
+            min_speech_duration: Segments with less speech are not transcribed
+            partial_interval: Seconds of new audio between partial hypotheses
+            max_window_duration: Longest window transcribed in one pass
+            max_prompt_chars: Finished text carried over as the prompt
+        """
+        self.transcribe = transcribe
+        self.sample_rate = sample_rate
+        self.vad = vad or EnergyVAD()
+        self.frame_size = int(sample_rate * frame_duration)
+        self.frame_duration = self.frame_size / sample_rate
+        self.overlap_frames = int(round(overlap_duration / self.frame_duration))
+        self.max_silence_duration = max_silence_duration
+        self.min_speech_duration = min_speech_duration
+        self.partial_interval = partial_interval
+        self.max_window_duration = max_window_duration
+        self.max_prompt_chars = max_prompt_chars
+        self.reset()
+
+    def reset(self):
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.frames_seen = 0
+        self.preroll = deque(maxlen=max(self.overlap_frames, 1))
+        self.segment: List[np.ndarray] = []
+        self.segment_start = 0.0
+        self.speech_duration = 0.0
+        self.silence_frames = 0
+        self.since_partial = 0.0
+        # Text of the window this one overlaps, for de-duplication
+        self.window_text = ""
+        self.prompt = ""
+
+    def feed(self, audio: np.ndarray) -> List[Dict]:
+        """Process mono float32 samples; returns the hypotheses they produced"""
+        audio = np.concatenate([self.pending, np.asarray(audio, dtype=np.float32).reshape(-1)])
+        usable = len(audio) - len(audio) % self.frame_size
+        self.pending = audio[usable:]
+
+        events = []
+        for start in range(0, usable, self.frame_size):
+            events.extend(self._process_frame(audio[start:start + self.frame_size]))
+        return events
+
+    def flush(self) -> List[Dict]:
+        """Finalize whatever segment is open (end of stream)"""
+        events = self._finalize(endpoint=True) if self.segment else []
+        self.pending = np.zeros(0, dtype=np.float32)
+        return events
+
+    @property
+    def time(self) -> float:
+        """Stream time in seconds of the audio processed so far"""
+        return self.frames_seen * self.frame_duration
+
+    def _process_frame(self, frame: np.ndarray) -> List[Dict]:
+        speech = self.vad.is_speech(frame)
+        self.frames_seen += 1
+
+        if not self.segment:
+            if not speech:
+                self.preroll.append(frame)
+                return []
+            self.segment = list(self.preroll) + [frame]
+            self.preroll.clear()
+            self.segment_start = self.time - len(self.segment) * self.frame_duration
+            self.speech_duration = self.frame_duration
+            self.silence_frames = 0
+            self.since_partial = self.frame_duration
+            return []
+
+        self.segment.append(frame)
+        self.since_partial += self.frame_duration
+        if speech:
+            self.speech_duration += self.frame_duration
+            self.silence_frames = 0
+        else:
+            self.silence_frames += 1
+
+        if self.silence_frames * self.frame_duration >= self.max_silence_duration:
+            return self._finalize(endpoint=True)
+        if len(self.segment) * self.frame_duration >= self.max_window_duration:
+            return self._finalize(endpoint=False)
+        if (self.since_partial >= self.partial_interval and self.silence_frames == 0
+                and self.speech_duration >= self.min_speech_duration):
+            self.since_partial = 0.0
+            # Like finals, partials without text are not emitted
+            event = self._hypothesis(self.segment, partial=True)
+            return [event] if event['text'] else []
+        return []
+
+    def _hypothesis(self, frames: List[np.ndarray], partial: bool) -> Dict:
+        result = self.transcribe(np.concatenate(frames), self.prompt or None, partial)
+        text = result.get('text', '')
+        if self.window_text:
+            text = merge_overlap(self.window_text, text)
+
+        # Window-relative segment times to stream time
+        segments = [
+            {**segment, 'start': segment['start'] + self.segment_start,
+             'end': segment['end'] + self.segment_start}
+            for segment in result.get('segments', [])
+        ]
+
+        return {
+            **result,
+            'text': text,
+            'segments': segments,
+            'type': 'partial' if partial else 'final',
+            'is_final': not partial,
+            'start': round(self.segment_start, 2),
+            'end': round(self.segment_start + len(frames) * self.frame_duration, 2)
+        }
+
+    def _finalize(self, endpoint: bool) -> List[Dict]:
+        frames = self.segment
+        if endpoint:
+            # Keep only the start of the closing pause
+            trailing = max(self.silence_frames - self.overlap_frames, 0)
+            frames = frames[:len(frames) - trailing]
+
+        events = []
+        text = ""
+        if self.speech_duration >= self.min_speech_duration:
+            event = self._hypothesis(frames, partial=False)
+            text = event['text']
+            if text:
+                events.append(event)
+                self.prompt = f"{self.prompt} {text}".strip()[-self.max_prompt_chars:]
+
+        if endpoint:
+            self.preroll.extend(self.segment[-self.overlap_frames:] if self.overlap_frames else [])
+            self.segment = []
+            self.window_text = ""
+        else:
+            # Next window re-hears the end of this one
+            overlap = self.segment[len(self.segment) - self.overlap_frames:]
+            self.segment_start += (len(self.segment) - len(overlap)) * self.frame_duration
+            self.segment = overlap
+            # The overlap was already counted; the next window needs speech of its own
+            self.speech_duration = 0.0
+            self.since_partial = 0.0
+            self.window_text = text
+
+        return events
@@ -7,13 +7,23 @@ import threading
 import queue
 import time
 import warnings
+import sys
+import yaml
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent.parent / 'shared'))
+
+from streaming import StreamingTranscriber, create_vad
+from resampling import PolyphaseResampler, resample
 
 # Suppress warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 
 class WhisperOfflineSTT:
-    def __init__(self, model_size="base", device="auto"):
+    def __init__(self, model_size="base", device="auto", config_path=None):
         """Initialize Whisper offline speech-to-text"""
+        self.config = self.load_config(config_path or Path(__file__).parent / 'config.py')
         self.model_size = model_size
         self.device = self._get_device(device)
         
@@ -32,16 +42,57 @@ class WhisperOfflineSTT:
         self.is_streaming = False
         self.stream_queue = queue.Queue()
         self.stream_thread = None
-        self.audio_buffer = []
+        self.audio_queue = queue.Queue()
+        self.streaming_config = self.config.get('streaming', {})
+        self.stream_language = None
         
         self.logger.info(f"Whisper model loaded: {model_size} on {self.device}")
     
+    def load_config(self, config_path):
+        """Load configuration from YAML file"""
+        try:
+            with open(config_path, 'r') as f:
+                return yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            # Default config
+            return {
+                'streaming': {
+                    'overlap_duration': 0.5,
+                    'silence_threshold': 0.1,
+                    'min_speech_duration': 0.5,
+                    'max_silence_duration': 2.0,
+                    'partial_interval': 1.0,
+                    'max_window_duration': 15.0,
+                    'vad': 'energy'
+                }
+            }
+    
     def _get_device(self, device):
         """Determine the best device for inference"""
         if device == "auto":
             return "cuda" if torch.cuda.is_available() else "cpu"
         return device
     
+    def _format_result(self, result: Dict) -> Dict:
+        """Whisper output to the result dict returned by this class"""
+        segments = []
+        for segment in result['segments']:
+            segments.append({
+                'start': segment['start'],
+                'end': segment['end'],
+                'text': segment['text'].strip(),
+                'confidence': segment.get('avg_logprob', 0.0)
+            })
+        
+        return {
+            'text': result['text'].strip(),
+            'language': result['language'],
+            'segments': segments,
+            'duration': result.get('duration', 0),
+            'model': self.model_size,
+            'device': self.device
+        }
+    
     def transcribe_file(self, audio_file_path: str, 
                        language=None, task="transcribe") -> Dict:
         """Transcribe audio file using Whisper"""
@@ -57,24 +108,7 @@ class WhisperOfflineSTT:
                 fp16=self.device == "cuda"
             )
             
-            # Process result
-            segments = []
-            for segment in result['segments']:
-                segments.append({
-                    'start': segment['start'],
-                    'end': segment['end'],
-                    'text': segment['text'].strip(),
-                    'confidence': segment.get('avg_logprob', 0.0)
-                })
-            
-            return {
-                'text': result['text'].strip(),
-                'language': result['language'],
-                'segments': segments,
-                'duration': result.get('duration', 0),
-                'model': self.model_size,
-                'device': self.device
-            }
+            return self._format_result(result)
             
         except Exception as e:
             self.logger.error(f"Error transcribing file: {str(e)}")
@@ -84,21 +118,21 @@ class WhisperOfflineSTT:
             }
     
     def transcribe_audio_data(self, audio_data: np.ndarray,
-                            language=None, task="transcribe") -> Dict:
-        """Transcribe audio data using Whisper"""
+                            language=None, task="transcribe",
+                            input_sample_rate=None) -> Dict:
+        """
+        Transcribe audio data using Whisper
+        
+        ``input_sample_rate`` is the rate of ``audio_data`` (16 kHz when not
+        given); anything else is converted with a cached polyphase filter.
+        """
         try:
-            # Ensure correct sample rate
+            # Downmix (samples, channels) to mono
             if len(audio_data.shape) > 1:
                 audio_data = np.mean(audio_data, axis=1)
             
-            # Resample if needed (assuming input is 44.1kHz)
-            if len(audio_data) != self.sample_rate * len(audio_data) // 44100:
-                import librosa
-                audio_data = librosa.resample(
-                    audio_data, 
-                    orig_sr=44100, 
-                    target_sr=self.sample_rate
-                )
+            # Ensure correct sample rate
+            audio_data = resample(audio_data, input_sample_rate or self.sample_rate, self.sample_rate)
             
             # Transcribe
             result = self.model.transcribe(
@@ -108,24 +142,7 @@ class WhisperOfflineSTT:
                 fp16=self.device == "cuda"
             )
             
-            # Process result
-            segments = []
-            for segment in result['segments']:
-                segments.append({
-                    'start': segment['start'],
-                    'end': segment['end'],
-                    'text': segment['text'].strip(),
-                    'confidence': segment.get('avg_logprob', 0.0)
-                })
-            
-            return {
-                'text': result['text'].strip(),
-                'language': result['language'],
-                'segments': segments,
-                'duration': result.get('duration', 0),
-                'model': self.model_size,
-                'device': self.device
-            }
+            return self._format_result(result)
             
         except Exception as e:
             self.logger.error(f"Error transcribing audio data: {str(e)}")
@@ -134,17 +151,45 @@ class WhisperOfflineSTT:
                 'error': str(e)
             }
     
-    def start_streaming(self, callback=None, language=None):
-        """Start streaming transcription"""
+    def start_streaming(self, callback=None, language=None, input_sample_rate=None):
+        """
+        Start streaming transcription
+        
+        Feed mono float32 chunks at ``input_sample_rate`` (16 kHz when not
+        given) with ``add_audio_chunk``; other rates are converted once, as
+        a continuous signal, before voice detection. Results are
+        passed to ``callback`` (or queued for ``get_stream_result``) as they
+        are produced: 'partial' hypotheses while someone is speaking, then a
+        'final' one when they pause, each with stream-time 'start'/'end'.
+        """
         try:
             if self.is_streaming:
                 return {'status': 'already_streaming'}
             
+            settings = self.streaming_config
+            transcriber = StreamingTranscriber(
+                self._transcribe_window,
+                sample_rate=self.sample_rate,
+                vad=create_vad(
+                    settings.get('vad', 'energy'),
+                    sample_rate=self.sample_rate,
+                    threshold=settings.get('silence_threshold', 0.1),
+                    aggressiveness=settings.get('vad_aggressiveness', 2)
+                ),
+                overlap_duration=settings.get('overlap_duration', 0.5),
+                max_silence_duration=settings.get('max_silence_duration', 2.0),
+                min_speech_duration=settings.get('min_speech_duration', 0.5),
+                partial_interval=settings.get('partial_interval', 1.0),
+                max_window_duration=settings.get('max_window_duration', 15.0)
+            )
+            
             self.is_streaming = True
-            self.audio_buffer = []
+            self.stream_language = language
+            self.audio_queue = queue.Queue()
+            resampler = PolyphaseResampler(input_sample_rate or self.sample_rate, self.sample_rate)
             self.stream_thread = threading.Thread(
                 target=self._stream_worker,
-                args=(callback, language)
+                args=(transcriber, resampler, callback)
             )
             self.stream_thread.daemon = True
             self.stream_thread.start()
@@ -159,46 +204,73 @@ class WhisperOfflineSTT:
         """Add audio chunk to buffer for streaming"""
         try:
             if self.is_streaming:
-                self.audio_buffer.append(audio_chunk)
+                if audio_chunk.ndim > 1:
+                    audio_chunk = np.mean(audio_chunk, axis=1)
+                self.audio_queue.put(audio_chunk.astype(np.float32, copy=False))
         except Exception as e:
             self.logger.error(f"Error adding audio chunk: {str(e)}")
     
-    def _stream_worker(self, callback, language):
+    def _transcribe_window(self, audio: np.ndarray, prompt: Optional[str], partial: bool) -> Dict:
+        """Transcribe one streaming window, conditioned on the text before it"""
+        try:
+            result = self.model.transcribe(
+                audio,
+                language=self.stream_language,
+                initial_prompt=prompt,
+                # The prompt already carries the context; windows are short
+                condition_on_previous_text=False,
+                # Partials are replaced soon, skip temperature fallback retries
+                temperature=0.0 if partial else (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+                fp16=self.device == "cuda"
+            )
+            
+            result = self._format_result(result)
+            
+            # Detect the language once, then keep it for the whole stream
+            if not partial and self.stream_language is None and result['text']:
+                self.stream_language = result['language']
+            
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"Error transcribing stream window: {str(e)}")
+            return {
+                'text': '',
+                'error': str(e)
+            }
+    
+    def _stream_worker(self, transcriber, resampler, callback):
         """Worker thread for streaming transcription"""
+        def emit(results):
+            for result in results:
+                if callback:
+                    callback(result)
+                else:
+                    self.stream_queue.put(result)
+        
         try:
-            while self.is_streaming:
-                if len(self.audio_buffer) > 0:
-                    # Combine buffered audio
-                    combined_audio = np.concatenate(self.audio_buffer)
-                    self.audio_buffer = []
-                    
-                    # Transcribe chunk
-                    result = self.transcribe_audio_data(combined_audio, language)
-                    
-                    # Send result
-                    if callback:
-                        callback(result)
-                    else:
-                        self.stream_queue.put(result)
-                
-                time.sleep(0.1)  # Small delay to prevent excessive CPU usage
+            # Drain what was queued before stop, then close the last segment
+            while self.is_streaming or not self.audio_queue.empty():
+                try:
+                    chunk = self.audio_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
                 
+                emit(transcriber.feed(resampler.process(chunk)))
+            
+            emit(transcriber.feed(resampler.flush()))
+            emit(transcriber.flush())
+            
         except Exception as e:
             self.logger.error(f"Stream worker error: {str(e)}")
     
-    def stop_streaming(self):
-        """Stop streaming transcription"""
+    def stop_streaming(self, timeout=30):
+        """Stop streaming transcription; final results for buffered audio are still delivered"""
         try:
             self.is_streaming = False
             
             if self.stream_thread and self.stream_thread.is_alive():
-                self.stream_thread.join(timeout=2)
-            
-            # Process remaining audio
-            if len(self.audio_buffer) > 0:
-                combined_audio = np.concatenate(self.audio_buffer)
-                result = self.transcribe_audio_data(combined_audio)
-                self.stream_queue.put(result)
+                self.stream_thread.join(timeout=timeout)
             
             return {'status': 'streaming_stopped'}
             
@@ -284,7 +356,6 @@ class WhisperOfflineSTT:
         """Cleanup resources"""
         try:
             self.stop_streaming()
-            self.audio_buffer = []
             
             # Clear CUDA cache if using GPU
             if self.device == "cuda":
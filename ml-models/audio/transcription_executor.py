@@ -0,0 +1,240 @@
+"""
+Worker pool for Whisper transcriptions
+
+Transcriptions run in worker processes (one model registry per worker) or
+worker threads, never on the event loop. Admission is bounded: at most
+``workers`` jobs run and ``max_queue`` wait; beyond that requests are
+rejected immediately so clients can retry instead of piling up. Every job
+has a deadline covering queueing and processing, and each response reports
+where the request sat in the queue and the wait that was estimated for it.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from whisper_service import model_registry
+
+class QueueFullError(Exception):
+    """Raised when the transcription queue is at capacity"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Transcription queue is full")
+        self.retry_after = retry_after
+
+class TranscriptionTimeoutError(Exception):
+    """Raised when a transcription misses its deadline"""
+
+def _init_worker(preload: List[str], torch_threads: int):
+    """Process initializer: size the torch thread pool and load models"""
+    import torch
+    torch.set_num_threads(torch_threads)
+    model_registry.preload(preload)
+
+def worker_status() -> Dict:
+    """Models resident in the calling worker"""
+    return {"pid": os.getpid(), **model_registry.get_status()}
+
+def run_transcription(model: str, audio_data: bytes, language: str,
+                      content_type: Optional[str]) -> Tuple[dict, Dict]:
+    """Job body, executed inside a worker"""
+    with model_registry.lease(model) as service:
+        result = service.transcribe_audio(audio_data, language, content_type)
+    return result, worker_status()
+
+class TranscriptionExecutor:
+    def __init__(self, workers: int = 2, max_queue: int = 8, timeout: float = 120.0,
+                 mode: str = "process", preload: Optional[List[str]] = None):
+        """
+        Args:
+            workers: Transcriptions running at once (processes or threads)
+            max_queue: Requests allowed to wait for a worker before rejecting
+            timeout: Seconds from admission to result, queueing included
+            mode: "process" (one model copy per worker, uses all cores) or
+                  "thread" (one shared copy per model, e.g. a single GPU;
+                  the registry's per-model concurrency limit still applies)
+            preload: Models each worker loads at startup
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.mode = mode
+        self.preload = preload or []
+        self.pool = None
+        self.slots: Optional[asyncio.Semaphore] = None
+
+        # Admission state, only touched from the event loop
+        self.running = 0
+        self.waiting = 0
+
+        # Stats
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.avg_seconds = 3.0
+        self.worker_models: Dict[int, Dict] = {}
+
+    def start(self):
+        """Create the pool; process workers load their models right away"""
+        self.slots = asyncio.Semaphore(self.workers)
+        self._create_pool()
+        print(f"🧵 Transcription executor started: {self.workers} {self.mode} workers, "
+              f"queue {self.max_queue}, timeout {self.timeout:.0f}s")
+
+    def _create_pool(self):
+        if self.mode == "process":
+            torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # Forking a process that already runs torch threads can deadlock
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.preload, torch_threads)
+            )
+            # Spawn every worker now so model loading happens before traffic
+            for _ in range(self.workers):
+                self.pool.submit(worker_status).add_done_callback(self._record_status)
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="whisper")
+            model_registry.preload(self.preload)
+
+    def _record_status(self, future):
+        if not future.cancelled() and future.exception() is None:
+            status = future.result()
+            self.worker_models[status["pid"]] = status
+
+    def shutdown(self):
+        if self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def estimate_wait(self) -> Tuple[int, float]:
+        """(queue position, seconds until a result) for a request arriving now
+
+        Position 0 means a worker is free; otherwise it is the 1-based place
+        among requests waiting for a worker.
+        """
+        # Admitted requests beyond the worker count are the ones still queued
+        queued = self.running + self.waiting - self.workers
+        position = queued + 1 if queued >= 0 else 0
+        rounds = -(-position // self.workers)  # ceil
+        return position, (rounds + 1) * self.avg_seconds
+
+    async def submit(self, model: str, audio_data: bytes, language: str = "en",
+                     content_type: Optional[str] = None) -> dict:
+        """Run one transcription; the result gains a 'queue' entry"""
+        # Reject bad model names before they take a worker
+        model_registry.validate(model)
+
+        if self.running + self.waiting >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(retry_after=self.avg_seconds)
+
+        position, eta = self.estimate_wait()
+        admitted = time.monotonic()
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.slots.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise TranscriptionTimeoutError(f"No worker became free within {self.timeout:g}s")
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        started = time.monotonic()
+
+        # A job that outlives its caller keeps its slot until the worker is done
+        release_now = True
+        pool = self.pool
+        try:
+            future = asyncio.get_running_loop().run_in_executor(
+                pool, run_transcription, model, audio_data, language, content_type
+            )
+            done, _ = await asyncio.wait({future}, timeout=self.timeout - (started - admitted))
+            if not done:
+                release_now = False
+                future.add_done_callback(self._finish_abandoned)
+                self.timeouts += 1
+                raise TranscriptionTimeoutError(f"Transcription did not finish within {self.timeout:g}s")
+
+            result, status = future.result()
+        except asyncio.CancelledError:
+            # Client went away mid-transcription
+            release_now = False
+            future.add_done_callback(self._finish_abandoned)
+            self.cancelled += 1
+            raise
+        except BrokenProcessPool:
+            self.failed += 1
+            # Concurrent jobs all see the same broken pool; restart it once
+            if self.pool is pool:
+                print("❌ Transcription worker died, restarting pool")
+                self.shutdown()
+                self._create_pool()
+            raise RuntimeError("Transcription worker crashed")
+        except TranscriptionTimeoutError:
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            if release_now:
+                self._release()
+
+        processing = time.monotonic() - started
+        self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * processing
+        self.completed += 1
+        self.worker_models[status["pid"]] = status
+
+        result["queue"] = {
+            "position": position,
+            "eta_seconds": round(eta, 2),
+            "wait_ms": round((started - admitted) * 1000),
+            "processing_ms": round(processing * 1000)
+        }
+        return result
+
+    def _release(self):
+        self.running -= 1
+        self.slots.release()
+
+    def _finish_abandoned(self, future):
+        if not future.cancelled():
+            # Mark any exception as retrieved
+            future.exception()
+        self._release()
+
+    def get_models_status(self) -> List[Dict]:
+        """Resident models per worker (last reported, for process workers)"""
+        if self.mode == "process":
+            return list(self.worker_models.values())
+        return [worker_status()]
+
+    def get_stats(self) -> Dict:
+        position, eta = self.estimate_wait()
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "running": self.running,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "timeout": self.timeout,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "avg_seconds": round(self.avg_seconds, 2),
+            "next_position": position,
+            "next_eta_seconds": round(eta, 2)
+        }
@@ -9,7 +9,9 @@ from pydantic import BaseModel
 # Add current directory to Python path
 sys.path.append(str(Path(__file__).parent))
 
-from whisper_service import get_whisper_service
+from audio_decoder import AudioDecodeError
+from whisper_service import PRELOAD_MODELS
+from transcription_executor import QueueFullError, TranscriptionExecutor, TranscriptionTimeoutError
 
 # Pydantic model for base64 audio request
 class AudioRequest(BaseModel):
@@ -28,13 +30,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Transcriptions run in a worker pool so the event loop stays responsive
+transcription_executor = TranscriptionExecutor(
+    workers=int(os.getenv("WHISPER_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) // 2))))),
+    max_queue=int(os.getenv("WHISPER_MAX_QUEUE", "8")),
+    timeout=float(os.getenv("WHISPER_TIMEOUT", "120")),
+    mode=os.getenv("WHISPER_EXECUTOR", "process"),
+    preload=PRELOAD_MODELS
+)
+
+async def transcribe(audio_data: bytes, language: str, model: str, content_type: str = None) -> dict:
+    """Queue a transcription, mapping executor errors to HTTP errors"""
+    try:
+        return await transcription_executor.submit(model, audio_data, language, content_type)
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode audio: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Transcription queue is full, please retry shortly.",
+            headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
+    except TranscriptionTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+@app.on_event("startup")
+def start_executor():
+    """Start the workers; they load and warm up the configured models"""
+    transcription_executor.start()
+
+@app.on_event("shutdown")
+def stop_executor():
+    transcription_executor.shutdown()
+
 @app.get("/")
 async def root():
     return {
         "message": "Whisper Speech-to-Text API",
         "status": "Running",
         "models": ["tiny", "base", "small", "medium", "large"],
-        "current_model": "base"
+        "loaded_models": sorted({
+            model["model"]
+            for worker in transcription_executor.get_models_status()
+            for model in worker["resident"]
+        })
     }
 
 @app.post("/speech-to-text")
@@ -77,8 +118,7 @@ async def speech_to_text(
         print(f"📦 Audio data size: {len(audio_data)} bytes")
         
         # Get Whisper service and transcribe
-        whisper_service = get_whisper_service(model)
-        result = whisper_service.transcribe_audio(audio_data, language)
+        result = await transcribe(audio_data, language, model, file.content_type)
         
         if not result.get("success"):
             raise HTTPException(
@@ -95,6 +135,7 @@ async def speech_to_text(
             "language": result["language"],
             "model": result["model"],
             "duration": result["duration"],
+            "queue": result["queue"],
             "timestamp": "2024-01-01T00:00:00Z"  # Placeholder timestamp
         }
         
@@ -129,9 +170,12 @@ async def speech_to_text_base64(request: AudioRequest):
         print(f"📝 Language: {language}, Model: {model}")
         
         # Decode base64 audio
-        # Remove data URL prefix if present
+        # Remove data URL prefix if present, keeping its MIME type
+        content_type = None
         if "," in audio_data:
-            audio_data = audio_data.split(",", 1)[1]
+            prefix, audio_data = audio_data.split(",", 1)
+            if prefix.startswith("data:"):
+                content_type = prefix[5:].replace(";base64", "")
         
         audio_bytes = base64.b64decode(audio_data)
         
@@ -144,8 +188,7 @@ async def speech_to_text_base64(request: AudioRequest):
         print(f"📦 Audio data size: {len(audio_bytes)} bytes")
         
         # Get Whisper service and transcribe
-        whisper_service = get_whisper_service(model)
-        result = whisper_service.transcribe_audio(audio_bytes, language)
+        result = await transcribe(audio_bytes, language, model, content_type)
         
         if not result.get("success"):
             raise HTTPException(
@@ -162,6 +205,7 @@ async def speech_to_text_base64(request: AudioRequest):
             "language": result["language"],
             "model": result["model"],
             "duration": result["duration"],
+            "queue": result["queue"],
             "timestamp": "2024-01-01T00:00:00Z"  # Placeholder timestamp
         }
         
@@ -178,12 +222,13 @@ async def speech_to_text_base64(request: AudioRequest):
 async def health_check():
     """Health check endpoint"""
     try:
-        # Test if Whisper service is available
-        service = get_whisper_service()
+        # Report resident models without loading any
+        workers = transcription_executor.get_models_status()
         return {
             "status": "healthy",
-            "whisper_loaded": service.model is not None,
-            "model": service.model_name
+            "whisper_loaded": any(worker["resident"] for worker in workers),
+            "workers": workers,
+            "executor": transcription_executor.get_stats()
         }
     except Exception as e:
         return {
@@ -1,36 +1,126 @@
 import whisper
-import tempfile
+import gc
 import os
-from typing import Optional
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from audio_decoder import SAMPLE_RATE, AudioDecodeError, decode_audio
+
+# Approximate fp32 weight size per model, used to make room before loading
+MODEL_SIZE_MB = {
+    "tiny": 150, "tiny.en": 150,
+    "base": 290, "base.en": 290,
+    "small": 970, "small.en": 970,
+    "medium": 3060, "medium.en": 3060,
+    "large": 6170, "large-v1": 6170, "large-v2": 6170, "large-v3": 6170
+}
 
 class WhisperService:
-    def __init__(self, model_name: str = "base"):
+    def __init__(self, model_name: str = "base", device: Optional[str] = None,
+                 precision: str = "fp32", max_concurrency: int = 1):
         """
         Initialize Whisper service with specified model
         Models: tiny, base, small, medium, large
         base is good balance of speed and accuracy
+        
+        Args:
+            device: "cpu" or "cuda" (default: cuda when available)
+            precision: "fp16" or "fp32" inference
+            max_concurrency: Transcriptions allowed to run on this model at once
         """
         self.model_name = model_name
+        self.device = device
+        self.precision = precision
         self.model = None
+        
+        # Usage tracking for the registry
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.requests = 0
+        self.requests_lock = threading.Lock()
+        self.last_used = time.time()
+        self.load_seconds = 0.0
+        self.warmup_ms = None
+        
         self._load_model()
     
     def _load_model(self):
         """Load the Whisper model"""
         try:
             print(f"🤖 Loading Whisper model: {self.model_name}")
-            self.model = whisper.load_model(self.model_name)
-            print(f"✅ Whisper {self.model_name} model loaded successfully")
+            started = time.perf_counter()
+            self.model = whisper.load_model(self.model_name, device=self.device)
+            self.device = str(self.model.device)
+            self.load_seconds = time.perf_counter() - started
+            print(f"✅ Whisper {self.model_name} model loaded successfully on {self.device} "
+                  f"({self.memory_mb:.0f} MB, {self.load_seconds:.1f}s)")
         except Exception as e:
             print(f"❌ Error loading Whisper model: {e}")
             raise e
     
-    def transcribe_audio(self, audio_data: bytes, language: str = "en") -> dict:
+    @property
+    def fp16(self) -> bool:
+        # Whisper falls back to fp32 on CPU anyway
+        return self.precision == "fp16" and not self.device.startswith("cpu")
+    
+    @property
+    def memory_mb(self) -> float:
+        """Size of the model's parameters and buffers"""
+        if self.model is None:
+            return 0.0
+        tensors = list(self.model.parameters()) + list(self.model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors) / (1024 * 1024)
+    
+    def warmup(self) -> float:
+        """Run one inference on silence so the first real request is not slow"""
+        started = time.perf_counter()
+        self.model.transcribe(
+            np.zeros(SAMPLE_RATE, dtype=np.float32),
+            language="en",
+            fp16=self.fp16,
+            verbose=None
+        )
+        self.warmup_ms = (time.perf_counter() - started) * 1000
+        print(f"🔥 Whisper {self.model_name} warmed up in {self.warmup_ms:.0f}ms")
+        return self.warmup_ms
+    
+    def unload(self):
+        """Release the model's memory"""
+        self.model = None
+        gc.collect()
+        if self.device.startswith("cuda"):
+            import torch
+            torch.cuda.empty_cache()
+    
+    def get_status(self) -> dict:
+        return {
+            "model": self.model_name,
+            "device": self.device,
+            "precision": self.precision,
+            "memory_mb": round(self.memory_mb, 1),
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "idle_seconds": round(time.time() - self.last_used, 1),
+            "load_seconds": round(self.load_seconds, 2),
+            "warmup_ms": round(self.warmup_ms) if self.warmup_ms is not None else None
+        }
+    
+    def transcribe_audio(self, audio_data: bytes, language: str = "en",
+                         content_type: Optional[str] = None) -> dict:
         """
         Transcribe audio data using Whisper
         
         Args:
             audio_data: Raw audio bytes
             language: Language code (default: "en")
+            content_type: MIME type of the upload, needed for raw PCM ('audio/L16; rate=...')
         
         Returns:
             Dictionary with transcription results
@@ -39,44 +129,44 @@ class WhisperService:
             raise Exception("Whisper model not loaded")
         
         try:
-            # Create temporary file with proper extension
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as temp_file:
-                temp_file.write(audio_data)
-                temp_path = temp_file.name
+            print(f"🎤 Transcribing audio with Whisper {self.model_name}...")
+            print(f"📊 Audio size: {len(audio_data)} bytes")
             
-            try:
-                print(f"🎤 Transcribing audio with Whisper {self.model_name}...")
-                print(f"📁 Temp file: {temp_path}")
-                print(f"📊 Audio size: {len(audio_data)} bytes")
-                
+            # Decode in memory straight to 16 kHz float32 samples
+            audio = decode_audio(audio_data, content_type)
+            print(f"🔊 Decoded {len(audio) / SAMPLE_RATE:.2f}s of audio")
+            
+            # One slot per concurrent transcription on this model
+            with self.requests_lock:
+                self.requests += 1
+            with self.slots:
                 # Try to transcribe with Whisper
                 result = self.model.transcribe(
-                    temp_path, 
+                    audio, 
                     language=language,
-                    fp16=False,
+                    fp16=self.fp16,
                     verbose=False  # Reduce verbosity
                 )
-                
-                transcript = result.get("text", "").strip()
-                confidence = self._calculate_confidence(result)
-                
-                print(f"✅ Transcription result: '{transcript}'")
-                print(f"📊 Confidence: {confidence:.2f}")
-                
-                return {
-                    "success": True,
-                    "transcript": transcript,
-                    "confidence": confidence,
-                    "language": language,
-                    "model": self.model_name,
-                    "duration": result.get("segments", [{}])[0].get("end", 0) if result.get("segments") else 0
-                }
-                
-            finally:
-                # Clean up temporary file
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-                    
+            self.last_used = time.time()
+            
+            transcript = result.get("text", "").strip()
+            confidence = self._calculate_confidence(result)
+            
+            print(f"✅ Transcription result: '{transcript}'")
+            print(f"📊 Confidence: {confidence:.2f}")
+            
+            return {
+                "success": True,
+                "transcript": transcript,
+                "confidence": confidence,
+                "language": language,
+                "model": self.model_name,
+                "duration": result.get("segments", [{}])[0].get("end", 0) if result.get("segments") else 0
+            }
+        
+        except AudioDecodeError:
+            # The upload is at fault, callers report it as a client error
+            raise
         except Exception as e:
             print(f"❌ Error transcribing audio: {e}")
             print(f"🔍 Error details: {str(e)}")
@@ -111,15 +201,192 @@ class WhisperService:
         except Exception:
             return 0.8  # Default confidence on error
 
-# Global Whisper service instance
-whisper_service = None
+class WhisperModelRegistry:
+    """
+    Loaded Whisper models keyed by (model, device, precision)
+    
+    Models are loaded on first use (or preloaded), warmed up, and evicted
+    least-recently-used first when loading another would exceed the memory
+    budget. Models held through ``lease`` are never evicted.
+    """
+    
+    def __init__(self, memory_budget_mb: float = 4096, device: Optional[str] = None,
+                 precision: str = "fp32", max_concurrency: int = 1, warmup: bool = True):
+        self.memory_budget_mb = memory_budget_mb
+        self.device = device
+        self.precision = precision
+        self.max_concurrency = max_concurrency
+        self.warmup = warmup
+        self.models: "OrderedDict[Tuple[str, str, str], WhisperService]" = OrderedDict()
+        self.evictions = 0
+        self.lock = threading.RLock()
+        
+        # Models being loaded (outside the lock) and their estimated size
+        self.loading: Dict[Tuple[str, str, str], threading.Event] = {}
+        self.loading_mb = 0.0
+    
+    def _key(self, model_name: str, device: Optional[str], precision: Optional[str]) -> Tuple[str, str, str]:
+        # Resolve the default device the way whisper.load_model does, so a
+        # request naming it explicitly shares the same loaded model
+        device = device or self.device
+        if device in (None, "auto"):
+            import torch
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        return model_name, device, precision or self.precision
+    
+    @staticmethod
+    def validate(model_name: str):
+        """Raise ValueError for names whisper cannot load"""
+        if model_name not in whisper.available_models():
+            raise ValueError(f"Unknown Whisper model '{model_name}'. "
+                             f"Available: {', '.join(whisper.available_models())}")
+    
+    def get(self, model_name: str = "base", device: Optional[str] = None,
+            precision: Optional[str] = None) -> WhisperService:
+        """Return the requested model, loading it if needed
+        
+        The model is not protected from eviction afterwards; use ``lease``
+        while transcribing with it.
+        """
+        return self._acquire(model_name, device, precision, lease=False)
+    
+    @contextmanager
+    def lease(self, model_name: str = "base", device: Optional[str] = None,
+              precision: Optional[str] = None):
+        """Use a model while keeping it safe from eviction"""
+        service = self._acquire(model_name, device, precision, lease=True)
+        try:
+            yield service
+        finally:
+            with self.lock:
+                service.in_flight -= 1
+    
+    def _acquire(self, model_name: str, device: Optional[str], precision: Optional[str],
+                 lease: bool) -> WhisperService:
+        """Look up or load a model; the lock is never held while loading
+        
+        Concurrent requests for a model that is being loaded wait for that
+        load instead of starting their own, and models that are already
+        resident stay available while another one loads.
+        """
+        self.validate(model_name)
+        
+        key = self._key(model_name, device, precision)
+        estimate_mb = MODEL_SIZE_MB.get(model_name, 0)
+        
+        while True:
+            with self.lock:
+                service = self.models.get(key)
+                if service is not None:
+                    self.models.move_to_end(key)
+                    if lease:
+                        service.in_flight += 1
+                    return service
+                
+                loading = self.loading.get(key)
+                if loading is None:
+                    # This thread loads the model; others wait on the event
+                    loading = self.loading[key] = threading.Event()
+                    self._make_room(estimate_mb)
+                    self.loading_mb += estimate_mb
+                    break
+            
+            # Whoever was loading it finished (or failed); look again
+            loading.wait()
+        
+        try:
+            service = WhisperService(
+                model_name,
+                device=key[1],
+                precision=key[2],
+                max_concurrency=self.max_concurrency
+            )
+            if self.warmup:
+                service.warmup()
+        except Exception:
+            with self.lock:
+                del self.loading[key]
+                self.loading_mb -= estimate_mb
+            loading.set()
+            raise
+        
+        with self.lock:
+            del self.loading[key]
+            self.loading_mb -= estimate_mb
+            self.models[key] = service
+            if lease:
+                service.in_flight += 1
+            
+            # Estimates can be off; enforce the budget with real sizes too
+            self._make_room(0)
+        loading.set()
+        return service
+    
+    def _make_room(self, needed_mb: float):
+        """Evict idle models, least recently used first, until needed_mb fits
+        
+        Models still loading count with their estimated size.
+        """
+        needed_mb += self.loading_mb
+        for key in list(self.models):
+            if self.memory_used_mb() + needed_mb <= self.memory_budget_mb:
+                return
+            
+            service = self.models[key]
+            if service.in_flight:
+                continue
+            
+            print(f"♻️ Evicting Whisper {key[0]} ({service.memory_mb:.0f} MB) to stay within "
+                  f"{self.memory_budget_mb:.0f} MB")
+            del self.models[key]
+            service.unload()
+            self.evictions += 1
+        
+        if self.memory_used_mb() + needed_mb > self.memory_budget_mb:
+            print(f"⚠️ Whisper models need {self.memory_used_mb() + needed_mb:.0f} MB, "
+                  f"over the {self.memory_budget_mb:.0f} MB budget")
+    
+    def preload(self, model_names: List[str]):
+        """Load (and warm up) models ahead of the first request"""
+        for model_name in model_names:
+            try:
+                self.get(model_name)
+            except Exception as e:
+                print(f"❌ Could not preload Whisper {model_name}: {e}")
+    
+    def memory_used_mb(self) -> float:
+        return sum(service.memory_mb for service in self.models.values())
+    
+    def get_status(self) -> Dict:
+        """Resident models and memory use, most recently used last"""
+        # No lock: a model load in progress must not stall health checks
+        services = list(self.models.values())
+        return {
+            "resident": [service.get_status() for service in services],
+            "memory_used_mb": round(sum(service.memory_mb for service in services), 1),
+            "memory_budget_mb": self.memory_budget_mb,
+            "evictions": self.evictions
+        }
+
+# Global model registry, configured from the environment
+model_registry = WhisperModelRegistry(
+    memory_budget_mb=float(os.getenv("WHISPER_MEMORY_BUDGET_MB", "4096")),
+    device=os.getenv("WHISPER_DEVICE") or None,
+    precision=os.getenv("WHISPER_PRECISION", "fp32"),
+    max_concurrency=int(os.getenv("WHISPER_MAX_CONCURRENCY", "1")),
+    warmup=os.getenv("WHISPER_WARMUP", "true").lower() == "true"
+)
+
+# Models to load at startup, e.g. "base,small"
+PRELOAD_MODELS = [name.strip() for name in os.getenv("WHISPER_PRELOAD_MODELS", "base").split(",") if name.strip()]
 
 def get_whisper_service(model_name: str = "base") -> WhisperService:
-    """Get or create Whisper service instance"""
-    global whisper_service
-    if whisper_service is None:
-        whisper_service = WhisperService(model_name)
-    return whisper_service
+    """Get the Whisper service for a model, loading it if needed
+    
+    Gives no protection from eviction; transcribe under
+    ``model_registry.lease`` instead of holding on to the result.
+    """
+    return model_registry.get(model_name)
 
 def transcribe_audio_file(audio_path: str, language: str = "en") -> dict:
     """
@@ -136,8 +403,8 @@ def transcribe_audio_file(audio_path: str, language: str = "en") -> dict:
         with open(audio_path, "rb") as f:
             audio_data = f.read()
         
-        service = get_whisper_service()
-        return service.transcribe_audio(audio_data, language)
+        with model_registry.lease() as service:
+            return service.transcribe_audio(audio_data, language)
         
     except Exception as e:
         return {
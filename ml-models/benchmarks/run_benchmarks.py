@@ -0,0 +1,304 @@
+"""Micro/macro benchmarks for the shared pre- and postprocessing modules
+
+Usage:
+    python run_benchmarks.py --output results.json
+    python run_benchmarks.py --filter nms --output after.json --compare before.json
+
+All inputs are synthetic and generated from a fixed seed, so results are
+comparable between commits on the same machine. Each benchmark reports
+ops/sec, p50/p99 latency and peak traced memory of a single call.
+"""
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Add shared utilities to path
+sys.path.append(str(Path(__file__).parent.parent / 'shared'))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEED = 1234
+CLASSES = ['person', 'car', 'bicycle', 'dog', 'chair', 'bus']
+
+# name -> (group, setup function returning a zero-argument callable)
+BENCHMARKS: Dict[str, tuple] = {}
+
+def benchmark(name: str, group: str = 'micro'):
+    """Register a benchmark setup function"""
+    def decorator(setup: Callable[[], Callable[[], object]]):
+        BENCHMARKS[name] = (group, setup)
+        return setup
+    return decorator
+
+# Synthetic data
+
+def synthetic_detections(count: int, rng: np.random.Generator,
+                         width: int = 1280, height: int = 720) -> List[Dict]:
+    """Crowded-scene detections: clusters of jittered boxes around a few objects"""
+    objects = max(1, count // 8)
+    centers = rng.uniform([0, 0], [width, height], size=(objects, 2))
+    sizes = rng.uniform(20, 200, size=(objects, 2))
+
+    picks = rng.integers(0, objects, size=count)
+    jitter = rng.normal(0, 6, size=(count, 4))
+
+    boxes = np.column_stack([
+        centers[picks] - sizes[picks] / 2,
+        centers[picks] + sizes[picks] / 2
+    ]) + jitter
+
+    return [
+        {
+            'class': CLASSES[picks[i] % len(CLASSES)],
+            'confidence': float(rng.uniform(0.3, 1.0)),
+            'bbox': [int(v) for v in boxes[i]]
+        }
+        for i in range(count)
+    ]
+
+def synthetic_audio(seconds: float, rng: np.random.Generator, sample_rate: int = 16000) -> np.ndarray:
+    """Speech-like tone mixture with background noise"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    signal = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((220, 440, 880, 1760)))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 3 * t))
+    return (0.3 * signal * envelope + 0.05 * rng.standard_normal(len(t))).astype(np.float32)
+
+def synthetic_images(count: int, rng: np.random.Generator,
+                     shape=(480, 640, 3)) -> List[np.ndarray]:
+    """Random BGR frames"""
+    return [rng.integers(0, 256, size=shape, dtype=np.uint8) for _ in range(count)]
+
+# Postprocessing benchmarks
+
+def _postprocessor():
+    from postprocessing import PostProcessor
+    return PostProcessor()
+
+for _count in (50, 300, 1000):
+    def _nms_setup(count=_count):
+        postprocessor = _postprocessor()
+        detections = synthetic_detections(count, np.random.default_rng(SEED))
+        return lambda: postprocessor.apply_nms(detections, score_threshold=0.3)
+
+    def _merge_setup(count=_count):
+        postprocessor = _postprocessor()
+        detections = synthetic_detections(count, np.random.default_rng(SEED))
+        return lambda: postprocessor.merge_overlapping_detections(detections)
+
+    benchmark(f'postprocessing.apply_nms[n={_count}]')(_nms_setup)
+    benchmark(f'postprocessing.merge_overlapping_detections[n={_count}]')(_merge_setup)
+
+@benchmark('postprocessing.smooth_predictions[n=300]')
+def _smooth_setup():
+    postprocessor = _postprocessor()
+    rng = np.random.default_rng(SEED)
+    predictions = [
+        {'class': CLASSES[i], 'confidence': float(c)}
+        for i, c in zip(rng.integers(0, 3, size=300), rng.uniform(0.2, 1.0, size=300))
+    ]
+    return lambda: postprocessor.smooth_predictions(predictions, window_size=5)
+
+@benchmark('postprocessing.ensemble_predictions[models=3,n=100]')
+def _ensemble_setup():
+    postprocessor = _postprocessor()
+    rng = np.random.default_rng(SEED)
+    prediction_sets = [synthetic_detections(100, rng) for _ in range(3)]
+    return lambda: postprocessor.ensemble_predictions(prediction_sets)
+
+# Preprocessing benchmarks
+
+@benchmark('preprocessing.extract_mel_spectrogram[1s]')
+def _mel_setup():
+    from preprocessing import AudioPreprocessor
+    preprocessor = AudioPreprocessor(sample_rate=16000)
+    audio = synthetic_audio(1.0, np.random.default_rng(SEED))
+    return lambda: preprocessor.extract_mel_spectrogram(audio)
+
+@benchmark('preprocessing.apply_noise_reduction[1s]')
+def _noise_setup():
+    from preprocessing import AudioPreprocessor
+    preprocessor = AudioPreprocessor(sample_rate=16000)
+    audio = synthetic_audio(1.0, np.random.default_rng(SEED))
+    return lambda: preprocessor.apply_noise_reduction(audio)
+
+@benchmark('preprocessing.batch_preprocess_images[batch=8]')
+def _batch_images_setup():
+    from preprocessing import DataPreprocessor
+    preprocessor = DataPreprocessor()
+    images = synthetic_images(8, np.random.default_rng(SEED))
+    return lambda: preprocessor.batch_preprocess_images(images)
+
+# Macro benchmarks (realistic per-frame pipelines)
+
+@benchmark('pipeline.detection_postprocess[n=300]', group='macro')
+def _detection_pipeline_setup():
+    postprocessor = _postprocessor()
+    detections = synthetic_detections(300, np.random.default_rng(SEED))
+
+    def run():
+        kept = postprocessor.apply_nms(detections, score_threshold=0.3)
+        merged = postprocessor.merge_overlapping_detections(kept)
+        return postprocessor.filter_by_confidence(merged, 0.5)
+
+    return run
+
+@benchmark('pipeline.audio_features[3s]', group='macro')
+def _audio_pipeline_setup():
+    from preprocessing import AudioPreprocessor
+    preprocessor = AudioPreprocessor(sample_rate=16000)
+    audio = synthetic_audio(3.0, np.random.default_rng(SEED))
+
+    def run():
+        clean = preprocessor.apply_noise_reduction(preprocessor.normalize_audio(audio))
+        return preprocessor.extract_mel_spectrogram(clean)
+
+    return run
+
+# Runner
+
+def measure(fn: Callable[[], object], min_time: float, min_runs: int,
+            max_runs: int, warmup: int) -> Dict:
+    """Time repeated calls and the peak traced memory of one call"""
+    for _ in range(warmup):
+        fn()
+
+    durations = []
+    started = time.perf_counter()
+
+    while len(durations) < max_runs and (len(durations) < min_runs or time.perf_counter() - started < min_time):
+        call_start = time.perf_counter_ns()
+        fn()
+        durations.append(time.perf_counter_ns() - call_start)
+
+    # Memory is measured separately, tracemalloc slows allocation-heavy code
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    durations_ms = np.array(durations) / 1e6
+
+    return {
+        'runs': len(durations),
+        'ops_per_sec': float(1000.0 / durations_ms.mean()),
+        'mean_ms': float(durations_ms.mean()),
+        'p50_ms': float(np.percentile(durations_ms, 50)),
+        'p99_ms': float(np.percentile(durations_ms, 99)),
+        'peak_memory_kb': peak / 1024
+    }
+
+def git_revision() -> Optional[str]:
+    """Current commit hash, if run inside a git checkout"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).parent, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+def run_benchmarks(name_filter: Optional[str] = None, group: Optional[str] = None,
+                   min_time: float = 1.0, min_runs: int = 10,
+                   max_runs: int = 10000, warmup: int = 3) -> Dict:
+    """Run all registered benchmarks and return a JSON-serializable report"""
+    results = {}
+
+    for name, (bench_group, setup) in BENCHMARKS.items():
+        if name_filter and name_filter not in name:
+            continue
+        if group and bench_group != group:
+            continue
+
+        try:
+            fn = setup()
+        except ImportError as e:
+            logger.warning(f"Skipping {name}: {str(e)}")
+            results[name] = {'group': bench_group, 'skipped': str(e)}
+            continue
+
+        result = measure(fn, min_time, min_runs, max_runs, warmup)
+        result['group'] = bench_group
+        results[name] = result
+
+        logger.info(
+            f"{name}: {result['ops_per_sec']:.1f} ops/s, "
+            f"p50 {result['p50_ms']:.3f} ms, p99 {result['p99_ms']:.3f} ms, "
+            f"peak {result['peak_memory_kb']:.1f} KiB"
+        )
+
+    return {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'seed': SEED,
+        'results': results
+    }
+
+def compare(current: Dict, baseline: Dict, threshold: float = 0.10) -> bool:
+    """Print per-benchmark change against a baseline report
+
+    Returns False when any benchmark's p50 regressed by more than
+    ``threshold`` (fractional).
+    """
+    ok = True
+
+    print(f"\n{'benchmark':<58}{'base p50':>10}{'new p50':>10}{'change':>9}")
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base or 'skipped' in base or 'skipped' in result:
+            continue
+
+        change = result['p50_ms'] / base['p50_ms'] - 1 if base['p50_ms'] else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            ok = False
+
+        print(f"{name:<58}{base['p50_ms']:>10.3f}{result['p50_ms']:>10.3f}{change:>+9.1%}{flag}")
+
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filter', help='only run benchmarks whose name contains this string')
+    parser.add_argument('--group', choices=['micro', 'macro'], help='only run one benchmark group')
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds to spend per benchmark')
+    parser.add_argument('--min-runs', type=int, default=10)
+    parser.add_argument('--output', help='write JSON report here')
+    parser.add_argument('--compare', help='baseline JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='p50 regression threshold (fraction)')
+    parser.add_argument('--list', action='store_true', help='list benchmarks and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (group, _) in BENCHMARKS.items():
+            print(f"{group:<6} {name}")
+        return
+
+    report = run_benchmarks(args.filter, args.group, args.min_time, args.min_runs)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
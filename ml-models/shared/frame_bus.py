@@ -0,0 +1,274 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BUS_MAGIC = 0x46425553  # "FBUS"
+BUS_VERSION = 1
+
+# Header fields (int64 each)
+HEADER_FIELDS = ('magic', 'version', 'slots', 'height', 'width', 'channels', 'head', 'closed')
+HEADER_SIZE = 64
+ALIGNMENT = 64
+
+# Slot sequence value while the writer is filling it
+SLOT_WRITING = -1
+
+# Serializes the resource tracker patch in _attach
+_tracker_lock = threading.Lock()
+
+@dataclass
+class BusFrame:
+    """Frame read from the bus (``frame`` may be a view into shared memory)"""
+    frame: np.ndarray
+    sequence: int
+    frame_id: int
+    timestamp: float
+
+def _layout(slots: int, height: int, width: int, channels: int) -> Tuple[int, int]:
+    """Offset of the frame data and total segment size"""
+    metadata = HEADER_SIZE + 3 * 8 * slots
+    frames_offset = (metadata + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+    return frames_offset, frames_offset + slots * height * width * channels
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing segment without registering it with the resource tracker
+
+    A tracked attachment would destroy the bus when a reader process exits.
+    Unregistering after attaching is not safe either: when reader and writer
+    share a tracker (fork, or the same process) it drops the writer's own
+    registration.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track flag; skip the registration instead
+        with _tracker_lock:
+            register = resource_tracker.register
+            resource_tracker.register = lambda *args: None
+            try:
+                return shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+
+class _FrameBusBase:
+    """Maps the header, per-slot metadata and frame slots of a bus segment"""
+
+    def _map(self, shm: shared_memory.SharedMemory, slots: int, height: int,
+             width: int, channels: int):
+        self.shm = shm
+        self.slots = slots
+        self.shape = (height, width, channels)
+
+        buffer = shm.buf
+        self.header = np.ndarray((len(HEADER_FIELDS),), dtype=np.int64, buffer=buffer)
+
+        offset = HEADER_SIZE
+        # Per-slot sequence doubles as the slot lock: SLOT_WRITING while being
+        # overwritten, the frame's sequence number once complete
+        self.slot_sequences = np.ndarray((slots,), dtype=np.int64, buffer=buffer, offset=offset)
+        offset += 8 * slots
+        self.slot_frame_ids = np.ndarray((slots,), dtype=np.int64, buffer=buffer, offset=offset)
+        offset += 8 * slots
+        self.slot_timestamps = np.ndarray((slots,), dtype=np.float64, buffer=buffer, offset=offset)
+
+        frames_offset, _ = _layout(slots, height, width, channels)
+        self.slot_frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=buffer, offset=frames_offset)
+
+    @property
+    def head(self) -> int:
+        """Sequence number of the newest complete frame (-1 when empty)"""
+        return int(self.header[HEADER_FIELDS.index('head')])
+
+    def is_valid(self, sequence: int) -> bool:
+        """Whether the slot of a previously read frame still holds that frame"""
+        return int(self.slot_sequences[sequence % self.slots]) == sequence
+
+    def _release_views(self):
+        # Views must be dropped before the segment can be closed
+        self.header = self.slot_sequences = self.slot_frame_ids = None
+        self.slot_timestamps = self.slot_frames = None
+
+class SharedFrameBus(_FrameBusBase):
+    """Writer side of a shared-memory frame bus
+
+    The capture process writes each frame once into a ring of fixed-size
+    slots in a ``multiprocessing.shared_memory`` segment. Detector, landmark
+    and recorder processes attach with ``FrameBusReader`` and read the frames
+    zero-copy, so each runs on its own core without the GIL and without a
+    JPEG/base64 round-trip.
+
+    Each slot carries a sequence number that acts as a seqlock: it is set to
+    ``SLOT_WRITING`` while the frame is copied in, and readers check it
+    before and after use to detect a frame that was overwritten under them.
+    """
+
+    def __init__(self, name: str, height: int, width: int, channels: int = 3, slots: int = 4):
+        self.name = name
+        _, size = _layout(slots, height, width, channels)
+
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a crashed writer; tracked, so unlink() balances it
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        self._map(shm, slots, height, width, channels)
+
+        self.slot_sequences.fill(SLOT_WRITING)
+        self.header[:] = [BUS_MAGIC, BUS_VERSION, slots, height, width, channels, -1, 0]
+
+        logger.info(f"Frame bus '{name}' created: {slots} slots of {width}x{height}x{channels}")
+
+    def write(self, frame: np.ndarray, frame_id: int = 0,
+              timestamp: Optional[float] = None) -> int:
+        """Copy a frame into the next slot and publish it; returns its sequence"""
+        if frame.shape != self.shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match bus shape {self.shape}")
+
+        sequence = self.head + 1
+        index = sequence % self.slots
+
+        self.slot_sequences[index] = SLOT_WRITING
+        np.copyto(self.slot_frames[index], frame)
+        self.slot_frame_ids[index] = frame_id
+        self.slot_timestamps[index] = timestamp if timestamp is not None else time.time()
+        self.slot_sequences[index] = sequence
+
+        self.header[HEADER_FIELDS.index('head')] = sequence
+        return sequence
+
+    def close(self):
+        """Mark the bus closed, then release and remove the segment"""
+        if self.shm is None:
+            return
+
+        self.header[HEADER_FIELDS.index('closed')] = 1
+        self._release_views()
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+        logger.info(f"Frame bus '{self.name}' closed")
+
+class FrameBusReader(_FrameBusBase):
+    """Reader side of a shared-memory frame bus (one per consumer process)"""
+
+    def __init__(self, name: str, timeout: float = 10.0, poll_interval: float = 0.001):
+        self.name = name
+        self.poll_interval = poll_interval
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                shm = _attach(name)
+                break
+            except FileNotFoundError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.1)
+
+        header = np.ndarray((len(HEADER_FIELDS),), dtype=np.int64, buffer=shm.buf)
+        magic, version, slots, height, width, channels = (int(v) for v in header[:6])
+        del header
+
+        if magic != BUS_MAGIC or version != BUS_VERSION:
+            shm.close()
+            raise ValueError(f"Shared memory '{name}' is not a version {BUS_VERSION} frame bus")
+
+        self._map(shm, slots, height, width, channels)
+
+        # Next sequence this reader expects; starts at the newest frame
+        self.cursor = max(self.head, 0)
+        self.frames_read = 0
+        self.frames_dropped = 0
+
+    @property
+    def closed(self) -> bool:
+        """Whether the writer has shut the bus down"""
+        return self.shm is None or bool(self.header[HEADER_FIELDS.index('closed')])
+
+    def _read_slot(self, sequence: int, copy: bool) -> Optional[BusFrame]:
+        index = sequence % self.slots
+        if int(self.slot_sequences[index]) != sequence:
+            return None
+
+        frame = self.slot_frames[index]
+        result = BusFrame(
+            frame=frame.copy() if copy else frame,
+            sequence=sequence,
+            frame_id=int(self.slot_frame_ids[index]),
+            timestamp=float(self.slot_timestamps[index])
+        )
+
+        # Overwritten while we were reading it
+        if int(self.slot_sequences[index]) != sequence:
+            return None
+
+        return result
+
+    def read_latest(self, copy: bool = False) -> Optional[BusFrame]:
+        """Newest unread frame, skipping (and counting) any older unread ones"""
+        head = self.head
+        if head < self.cursor:
+            return None
+
+        result = self._read_slot(head, copy)
+        if result is None:
+            return None
+
+        self.frames_dropped += head - self.cursor
+        self.frames_read += 1
+        self.cursor = head + 1
+
+        return result
+
+    def wait_latest(self, timeout: Optional[float] = None, copy: bool = False) -> Optional[BusFrame]:
+        """Block until a new frame is published, then return the newest one"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while not self.closed:
+            result = self.read_latest(copy)
+            if result is not None:
+                return result
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+        return None
+
+    def frames(self, copy: bool = False) -> Iterator[BusFrame]:
+        """Iterate over the newest frames until the writer closes the bus"""
+        while not self.closed:
+            result = self.wait_latest(timeout=1.0, copy=copy)
+            if result is not None:
+                yield result
+
+    def get_stats(self) -> dict:
+        """Reader statistics"""
+        return {
+            'bus': self.name,
+            'shape': self.shape,
+            'slots': self.slots,
+            'head': self.head if self.shm is not None else None,
+            'frames_read': self.frames_read,
+            'frames_dropped': self.frames_dropped
+        }
+
+    def close(self):
+        """Detach from the bus (the writer owns the segment)"""
+        if self.shm is None:
+            return
+
+        self._release_views()
+        self.shm.close()
+        self.shm = None
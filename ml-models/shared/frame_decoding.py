@@ -0,0 +1,143 @@
+import base64
+import time
+from typing import Any, Dict, Tuple
+
+import cv2
+import numpy as np
+
+# Content types accepted as an encoded (JPEG/PNG) request body
+ENCODED_CONTENT_TYPES = ('image/jpeg', 'image/jpg', 'image/png', 'image/webp')
+
+# Content types accepted as a raw pixel buffer
+RAW_CONTENT_TYPES = {
+    'application/x-raw-bgr': 'bgr',
+    'application/x-raw-nv12': 'nv12',
+}
+
+class FrameDecodeError(ValueError):
+    """Raised when a request does not contain a decodable frame"""
+
+def decode_base64_image(base64_string: str) -> np.ndarray:
+    """Decode base64 image string to numpy array"""
+    try:
+        if ',' in base64_string:
+            base64_string = base64_string.split(',')[1]
+
+        img_data = base64.b64decode(base64_string)
+        return decode_image_bytes(img_data)
+    except FrameDecodeError:
+        raise
+    except Exception as e:
+        raise FrameDecodeError(f"Error decoding image: {str(e)}")
+
+def decode_image_bytes(img_data: bytes) -> np.ndarray:
+    """Decode JPEG/PNG bytes to a BGR numpy array"""
+    nparr = np.frombuffer(img_data, np.uint8)
+    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+    if img is None:
+        raise FrameDecodeError("Failed to decode image")
+
+    return img
+
+def decode_raw_buffer(buffer: bytes, width: int, height: int,
+                      pixel_format: str = 'bgr') -> np.ndarray:
+    """Wrap a raw pixel buffer as a BGR array
+
+    BGR buffers are viewed in place through ``np.frombuffer`` (no copy, the
+    result is read-only). NV12 buffers are viewed in place and converted to
+    BGR once.
+    """
+    if width <= 0 or height <= 0:
+        raise FrameDecodeError("Frame width and height must be positive")
+
+    if pixel_format == 'bgr':
+        expected = width * height * 3
+        if len(buffer) != expected:
+            raise FrameDecodeError(
+                f"BGR buffer size {len(buffer)} does not match {width}x{height} ({expected} bytes)"
+            )
+        return np.frombuffer(buffer, np.uint8).reshape(height, width, 3)
+
+    if pixel_format == 'nv12':
+        if height % 2:
+            raise FrameDecodeError("NV12 frame height must be even")
+        expected = width * height * 3 // 2
+        if len(buffer) != expected:
+            raise FrameDecodeError(
+                f"NV12 buffer size {len(buffer)} does not match {width}x{height} ({expected} bytes)"
+            )
+        yuv = np.frombuffer(buffer, np.uint8).reshape(height * 3 // 2, width)
+        return cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_NV12)
+
+    raise FrameDecodeError(f"Unsupported raw pixel format: {pixel_format}")
+
+def _header_int(headers, name: str) -> int:
+    """Read a required integer header"""
+    value = headers.get(name)
+    if value is None:
+        raise FrameDecodeError(f"Missing {name} header")
+    try:
+        return int(value)
+    except ValueError:
+        raise FrameDecodeError(f"Invalid {name} header: {value}")
+
+def decode_frame_request(request) -> Tuple[np.ndarray, Dict[str, Any], float]:
+    """Decode a frame from a Flask request in any supported body mode
+
+    Supported modes:
+      - ``application/json`` with a base64 ``image`` field (legacy)
+      - ``multipart/form-data`` with an ``image`` file part
+      - ``image/jpeg`` / ``image/png`` raw encoded body
+      - ``application/x-raw-bgr`` / ``application/x-raw-nv12`` raw pixel
+        body with ``X-Frame-Width`` and ``X-Frame-Height`` headers
+        (``application/octet-stream`` with these headers plus
+        ``X-Frame-Format`` also works; without them it is treated as an
+        encoded image)
+
+    Returns the BGR image, the request parameters (JSON body, form fields or
+    query string) and the decode time in milliseconds.
+    """
+    content_type = (request.mimetype or '').lower()
+    start_time = time.perf_counter()
+
+    if content_type == 'application/json' or not content_type:
+        data = request.get_json(silent=True) or {}
+        # A valid JSON body that is not an object has no image field either
+        if not isinstance(data, dict):
+            raise FrameDecodeError("No image provided")
+        image_data = data.get('image')
+        if not image_data:
+            raise FrameDecodeError("No image provided")
+        img = decode_base64_image(image_data)
+        params = data
+
+    elif content_type == 'multipart/form-data':
+        image_file = request.files.get('image')
+        if image_file is None:
+            raise FrameDecodeError("No image provided")
+        img = decode_image_bytes(image_file.read())
+        params = request.form.to_dict()
+
+    elif content_type in ENCODED_CONTENT_TYPES or (
+            content_type == 'application/octet-stream' and 'X-Frame-Width' not in request.headers):
+        body = request.get_data(cache=False)
+        if not body:
+            raise FrameDecodeError("No image provided")
+        img = decode_image_bytes(body)
+        params = request.args.to_dict()
+
+    elif content_type in RAW_CONTENT_TYPES or content_type == 'application/octet-stream':
+        pixel_format = RAW_CONTENT_TYPES.get(content_type) or \
+            request.headers.get('X-Frame-Format', 'bgr').lower()
+        width = _header_int(request.headers, 'X-Frame-Width')
+        height = _header_int(request.headers, 'X-Frame-Height')
+        img = decode_raw_buffer(request.get_data(cache=False), width, height, pixel_format)
+        params = request.args.to_dict()
+
+    else:
+        raise FrameDecodeError(f"Unsupported content type: {content_type}")
+
+    decode_ms = (time.perf_counter() - start_time) * 1000
+
+    return img, params, decode_ms
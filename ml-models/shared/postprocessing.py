@@ -8,11 +8,20 @@ class PostProcessor:
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        self.tracker = None
     
     def apply_nms(self, detections: List[Dict], 
                   iou_threshold: float = 0.45,
-                  score_threshold: float = 0.5) -> List[Dict]:
-        """Apply Non-Maximum Suppression to detections"""
+                  score_threshold: float = 0.5,
+                  class_aware: bool = False,
+                  method: str = "nms",
+                  sigma: float = 0.5) -> List[Dict]:
+        """Apply Non-Maximum Suppression to detections
+        
+        Thin wrapper over the array-backed ``batched_nms``. ``method`` is one
+        of "nms", "diou" or "soft"; Soft-NMS returns copies of the kept
+        detections with their decayed confidence.
+        """
         if not detections:
             return []
         
@@ -25,29 +34,167 @@ class PostProcessor:
         if not filtered_detections:
             return []
         
-        # Sort by confidence
-        filtered_detections.sort(key=lambda x: x['confidence'], reverse=True)
+        boxes, scores, class_ids = self.detections_to_arrays(filtered_detections)
+        
+        keep, kept_scores = self.batched_nms(
+            boxes, scores,
+            class_ids if class_aware else None,
+            iou_threshold=iou_threshold,
+            method=method,
+            sigma=sigma,
+            score_threshold=score_threshold
+        )
         
-        # Apply NMS
-        keep_detections = []
+        if method == "soft":
+            return [
+                {**filtered_detections[i], 'confidence': float(score)}
+                for i, score in zip(keep, kept_scores)
+            ]
         
-        for detection in filtered_detections:
-            keep = True
+        return [filtered_detections[i] for i in keep]
+    
+    def detections_to_arrays(self, detections: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Convert detection dicts to (N,4) boxes, (N,) scores and (N,) class ids"""
+        boxes = np.array([det['bbox'] for det in detections], dtype=np.float32).reshape(-1, 4)
+        scores = np.array([det.get('confidence', 0) for det in detections], dtype=np.float64)
+        
+        class_index = {}
+        class_ids = np.array([
+            class_index.setdefault(det.get('class', 'unknown'), len(class_index))
+            for det in detections
+        ], dtype=np.int64)
+        
+        return boxes, scores, class_ids
+    
+    def compute_iou_matrix(self, boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+        """Pairwise IoU between (N,4) and (M,4) xyxy boxes as an (N,M) matrix"""
+        boxes1 = np.asarray(boxes1, dtype=np.float32).reshape(-1, 4)
+        boxes2 = np.asarray(boxes2, dtype=np.float32).reshape(-1, 4)
+        
+        area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+        area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+        
+        top_left = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+        bottom_right = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+        wh = np.clip(bottom_right - top_left, 0, None)
+        intersection = wh[..., 0] * wh[..., 1]
+        
+        union = area1[:, None] + area2[None, :] - intersection
+        
+        return np.divide(
+            intersection, union,
+            out=np.zeros_like(intersection),
+            where=union > 0
+        )
+    
+    def batched_nms(self, boxes: np.ndarray, scores: np.ndarray,
+                    class_ids: Optional[np.ndarray] = None,
+                    iou_threshold: float = 0.45,
+                    method: str = "nms",
+                    sigma: float = 0.5,
+                    score_threshold: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+        """Array-backed NMS over (N,4) xyxy boxes
+        
+        When ``class_ids`` is given, boxes only suppress boxes of the same
+        class. Returns kept indices in descending score order and their
+        (possibly decayed) scores.
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+        
+        if len(boxes) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        
+        if method not in ("nms", "diou", "soft"):
+            raise ValueError(f"Unsupported NMS method: {method}")
+        
+        if class_ids is not None:
+            class_ids = np.asarray(class_ids).reshape(-1)
+        
+        if method == "soft":
+            return self._soft_nms(boxes, scores, class_ids, sigma, score_threshold)
+        
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        order = np.argsort(-scores, kind='stable')
+        keep = []
+        
+        # Each kept box removes everything it suppresses from the candidate
+        # list, so the loop runs once per kept box rather than once per box
+        while order.size:
+            i = order[0]
+            keep.append(i)
+            rest = order[1:]
             
-            for kept_detection in keep_detections:
-                iou = self._calculate_iou(
-                    detection['bbox'], 
-                    kept_detection['bbox']
-                )
-                
-                if iou > iou_threshold:
-                    keep = False
-                    break
+            overlap = self._overlap_one_to_many(boxes[i], areas[i], boxes[rest], areas[rest], method)
+            suppressed = overlap > iou_threshold
+            
+            # Boxes of different classes never suppress each other
+            if class_ids is not None:
+                suppressed &= class_ids[rest] == class_ids[i]
+            
+            order = rest[~suppressed]
+        
+        keep = np.array(keep, dtype=np.int64)
+        
+        return keep, scores[keep]
+    
+    def _overlap_one_to_many(self, box: np.ndarray, area: float,
+                             boxes: np.ndarray, areas: np.ndarray,
+                             method: str = "nms") -> np.ndarray:
+        """IoU (or DIoU) of one box against (M,4) boxes with precomputed areas"""
+        inter_w = np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0])
+        inter_h = np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1])
+        intersection = np.clip(inter_w, 0, None) * np.clip(inter_h, 0, None)
+        union = area + areas - intersection
+        
+        iou = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+        
+        if method != "diou":
+            return iou
+        
+        center_distance = (
+            ((box[0] + box[2]) - (boxes[:, 0] + boxes[:, 2])) ** 2 +
+            ((box[1] + box[3]) - (boxes[:, 1] + boxes[:, 3])) ** 2
+        ) / 4
+        enclose_diagonal = (
+            (np.maximum(box[2], boxes[:, 2]) - np.minimum(box[0], boxes[:, 0])) ** 2 +
+            (np.maximum(box[3], boxes[:, 3]) - np.minimum(box[1], boxes[:, 1])) ** 2
+        )
+        
+        return iou - np.divide(
+            center_distance, enclose_diagonal,
+            out=np.zeros_like(center_distance),
+            where=enclose_diagonal > 0
+        )
+    
+    def _soft_nms(self, boxes: np.ndarray, scores: np.ndarray,
+                  class_ids: Optional[np.ndarray],
+                  sigma: float, score_threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Gaussian Soft-NMS"""
+        scores = scores.copy()
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        remaining = np.arange(len(scores))
+        keep = []
+        kept_scores = []
+        
+        while remaining.size:
+            position = np.argmax(scores[remaining])
+            best = remaining[position]
+            
+            if scores[best] < score_threshold:
+                break
             
-            if keep:
-                keep_detections.append(detection)
+            keep.append(best)
+            kept_scores.append(scores[best])
+            remaining = np.delete(remaining, position)
+            
+            # Decay overlapping boxes instead of discarding them
+            iou = self._overlap_one_to_many(boxes[best], areas[best], boxes[remaining], areas[remaining])
+            if class_ids is not None:
+                iou = np.where(class_ids[remaining] == class_ids[best], iou, 0.0)
+            scores[remaining] *= np.exp(-(iou ** 2) / sigma)
         
-        return keep_detections
+        return np.array(keep, dtype=np.int64), np.array(kept_scores, dtype=np.float64)
     
     def _calculate_iou(self, bbox1: List[int], bbox2: List[int]) -> float:
         """Calculate Intersection over Union (IoU) for two bounding boxes"""
@@ -149,6 +296,9 @@ class PostProcessor:
             # Sort by confidence
             class_detections.sort(key=lambda x: x['confidence'], reverse=True)
             
+            # Merges are order-dependent and the merged set per class stays
+            # small, so a scalar loop with early exit beats per-detection
+            # NumPy calls here
             merged = []
             
             for detection in class_detections:
@@ -197,92 +347,49 @@ class PostProcessor:
     def apply_temporal_filter(self, detections_history: List[List[Dict]],
                             min_appearances: int = 3,
                             max_disappeared: int = 5) -> List[Dict]:
-        """Apply temporal filtering to reduce false positives"""
+        """Apply temporal filtering to reduce false positives
+        
+        Replays the history through a fresh MultiObjectTracker. For live
+        streams use ``update_tracks`` instead, which keeps tracker state
+        between calls and processes one frame at a time.
+        """
         if not detections_history:
             return []
         
-        # Track objects over time
-        object_tracks = {}
-        track_id_counter = 0
+        from tracking import MultiObjectTracker
         
-        for frame_idx, detections in enumerate(detections_history):
-            current_objects = {}
-            
-            for detection in detections:
-                # Find matching track
-                matched_track = None
-                
-                for track_id, track in object_tracks.items():
-                    if track['class'] == detection['class']:
-                        # Check spatial proximity (simplified)
-                        if frame_idx > 0:
-                            last_bbox = track['last_bbox']
-                            current_bbox = detection['bbox']
-                            
-                            # Calculate center distance
-                            center1 = ((last_bbox[0] + last_bbox[2]) / 2, 
-                                     (last_bbox[1] + last_bbox[3]) / 2)
-                            center2 = ((current_bbox[0] + current_bbox[2]) / 2,
-                                     (current_bbox[1] + current_bbox[3]) / 2)
-                            
-                            distance = np.sqrt(
-                                (center1[0] - center2[0])**2 + 
-                                (center1[1] - center2[1])**2
-                            )
-                            
-                            if distance < 100:  # Threshold for matching
-                                matched_track = track_id
-                                break
-                
-                if matched_track is not None:
-                    # Update existing track
-                    object_tracks[matched_track]['appearances'] += 1
-                    object_tracks[matched_track]['last_bbox'] = detection['bbox']
-                    object_tracks[matched_track]['last_seen'] = frame_idx
-                    object_tracks[matched_track]['confidence'] = detection['confidence']
-                    current_objects[matched_track] = object_tracks[matched_track]
-                else:
-                    # Create new track
-                    object_tracks[track_id_counter] = {
-                        'class': detection['class'],
-                        'appearances': 1,
-                        'last_bbox': detection['bbox'],
-                        'last_seen': frame_idx,
-                        'confidence': detection['confidence'],
-                        'created': frame_idx
-                    }
-                    current_objects[track_id_counter] = object_tracks[track_id_counter]
-                    track_id_counter += 1
-            
-            # Update tracks (remove old ones)
-            tracks_to_remove = []
-            for track_id, track in object_tracks.items():
-                if track_id not in current_objects:
-                    track['disappeared'] = track.get('disappeared', 0) + 1
-                    if track['disappeared'] > max_disappeared:
-                        tracks_to_remove.append(track_id)
-            
-            for track_id in tracks_to_remove:
-                del object_tracks[track_id]
+        tracker = MultiObjectTracker(
+            max_disappeared=max_disappeared,
+            min_appearances=min_appearances
+        )
         
-        # Filter tracks by minimum appearances
-        stable_objects = [
-            track for track in object_tracks.values()
-            if track['appearances'] >= min_appearances
-        ]
+        for detections in detections_history:
+            tracker.update(detections)
+        
+        return tracker.get_active_tracks()
+    
+    def update_tracks(self, detections: List[Dict],
+                      min_appearances: int = 3,
+                      max_disappeared: int = 5) -> List[Dict]:
+        """Feed one frame of detections to the persistent tracker
+        
+        Returns confirmed tracks matched in this frame, each with a stable
+        integer ``track_id``.
+        """
+        if self.tracker is None:
+            from tracking import MultiObjectTracker
+            
+            self.tracker = MultiObjectTracker(
+                max_disappeared=max_disappeared,
+                min_appearances=min_appearances
+            )
         
-        # Convert to detection format
-        final_detections = []
-        for track in stable_objects:
-            final_detections.append({
-                'class': track['class'],
-                'confidence': track['confidence'],
-                'bbox': track['last_bbox'],
-                'track_id': id(track),
-                'appearances': track['appearances']
-            })
-        
-        return final_detections
+        return self.tracker.update(detections)
+    
+    def reset_tracks(self):
+        """Drop all persistent tracks"""
+        if self.tracker is not None:
+            self.tracker.reset()
     
     def format_output(self, predictions: List[Dict],
                      output_format: str = "json") -> Any:
@@ -0,0 +1,140 @@
+"""
+Polyphase sample rate conversion
+
+Filters are designed once per rate pair and cached. ``PolyphaseResampler``
+keeps the filter history between calls, so audio can be converted chunk
+by chunk as it streams in; the concatenated output equals converting the
+whole signal at once, which matches ``scipy.signal.resample_poly``.
+Whole signals go through SciPy's C implementation with the cached filter
+when SciPy is installed.
+"""
+from functools import lru_cache
+from math import gcd
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    from scipy.signal import resample_poly
+except ImportError:
+    resample_poly = None
+
+# Output samples computed per vectorized block, bounds temporary memory
+BLOCK_SIZE = 8192
+
+@lru_cache(maxsize=32)
+def design_filter(up: int, down: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Kaiser-windowed low-pass, also split into ``up`` phases
+
+    Returns the filter (gain ``up``), its (up, taps) phase matrix and its
+    half length in upsampled samples. Same design as ``resample_poly``'s
+    default.
+    """
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    length = 2 * half_len + 1
+
+    cutoff = 1.0 / max_rate
+    n = np.arange(length) - half_len
+    h = cutoff * np.sinc(cutoff * n) * np.kaiser(length, 5.0)
+    h *= up / h.sum()
+
+    # Phase p holds taps h[p], h[p + up], h[p + 2 up], ...
+    taps = -(-length // up)
+    padded = np.zeros(taps * up)
+    padded[:length] = h
+    phases = padded.reshape(taps, up).T.astype(np.float32)
+    h.flags.writeable = False
+    phases.flags.writeable = False
+
+    return h, phases, half_len
+
+class PolyphaseResampler:
+    def __init__(self, orig_sr: int, target_sr: int):
+        """Stateful converter from ``orig_sr`` to ``target_sr``"""
+        divisor = gcd(orig_sr, target_sr)
+        self.orig_sr = orig_sr
+        self.target_sr = target_sr
+        self.up = target_sr // divisor
+        self.down = orig_sr // divisor
+        _, self.phases, self.half_len = design_filter(self.up, self.down)
+        self.taps = self.phases.shape[1]
+        self.reset()
+
+    def reset(self):
+        """Forget buffered input and start a new signal"""
+        # Zero history stands in for the samples before the signal starts
+        self.buffer = np.zeros(self.taps - 1, dtype=np.float32)
+        self.buffer_start = -(self.taps - 1)
+        self.received = 0
+        self.produced = 0
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        """Convert the next chunk; returns every output sample it completes"""
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        if self.up == self.down:
+            self.received += len(audio)
+            self.produced += len(audio)
+            return audio
+
+        self.buffer = np.concatenate([self.buffer, audio])
+        self.received += len(audio)
+        return self._emit(self.received)
+
+    def flush(self) -> np.ndarray:
+        """Output still held back by the filter delay; then ``reset``"""
+        if self.up == self.down:
+            self.reset()
+            return np.zeros(0, dtype=np.float32)
+
+        total = -(-self.received * self.up // self.down)
+        needed = (total * self.down + self.half_len) // self.up + 1
+        self.buffer = np.concatenate([
+            self.buffer, np.zeros(max(needed - self.received, 0), dtype=np.float32)
+        ])
+        out = self._emit(max(needed, self.received), limit=total)
+        self.reset()
+        return out
+
+    def _emit(self, available: int, limit: Optional[int] = None) -> np.ndarray:
+        # Output m is centred on upsampled index m * down + half_len and
+        # needs input samples up to (m * down + half_len) // up
+        last = (available * self.up - 1 - self.half_len) // self.down
+        if limit is not None:
+            last = min(last, limit - 1)
+        if last < self.produced:
+            return np.zeros(0, dtype=np.float32)
+
+        offsets = np.arange(self.taps)
+        blocks = []
+        for first in range(self.produced, last + 1, BLOCK_SIZE):
+            m = np.arange(first, min(first + BLOCK_SIZE, last + 1))
+            t = m * self.down + self.half_len
+            newest = t // self.up - self.buffer_start
+            window = self.buffer[newest[:, None] - offsets]
+            blocks.append(np.einsum('ij,ij->i', window, self.phases[t % self.up]))
+        self.produced = last + 1
+
+        # Keep only the history the next output reaches back to
+        next_input = (self.produced * self.down + self.half_len) // self.up
+        drop = next_input - (self.taps - 1) - self.buffer_start
+        if drop > 0:
+            self.buffer = self.buffer[drop:]
+            self.buffer_start += drop
+
+        return np.concatenate(blocks)
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """Convert a whole signal (cached filter, fresh state)"""
+    if orig_sr == target_sr:
+        return np.asarray(audio, dtype=np.float32)
+
+    if resample_poly is not None:
+        divisor = gcd(orig_sr, target_sr)
+        up, down = target_sr // divisor, orig_sr // divisor
+        h = design_filter(up, down)[0]
+        # resample_poly applies the gain of ``up`` itself
+        return resample_poly(audio, up, down, window=h / up).astype(np.float32)
+
+    resampler = PolyphaseResampler(orig_sr, target_sr)
+    return np.concatenate([resampler.process(audio), resampler.flush()])
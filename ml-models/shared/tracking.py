@@ -0,0 +1,240 @@
+import itertools
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from postprocessing import PostProcessor
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # Fall back to greedy matching without scipy
+    linear_sum_assignment = None
+
+class KalmanBoxTrack:
+    """Constant-velocity Kalman filter over a single bounding box (SORT-style)
+
+    State is [cx, cy, area, aspect, vx, vy, v_area]; aspect ratio is assumed
+    constant.
+    """
+
+    # Shared model matrices
+    F = np.eye(7)
+    F[0, 4] = F[1, 5] = F[2, 6] = 1.0
+    H = np.eye(4, 7)
+    R = np.diag([1.0, 1.0, 10.0, 10.0])
+    Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+
+    def __init__(self, bbox: List[float], track_id: int, class_name: str,
+                 confidence: float, frame_index: int):
+        self.track_id = track_id
+        self.class_name = class_name
+        self.confidence = confidence
+
+        self.x = np.zeros(7)
+        self.x[:4] = self._bbox_to_z(bbox)
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+
+        self.appearances = 1
+        self.hit_streak = 1
+        self.time_since_update = 0
+        self.created = frame_index
+        self.last_seen = frame_index
+
+    @staticmethod
+    def _bbox_to_z(bbox) -> np.ndarray:
+        """Convert [x1, y1, x2, y2] to [cx, cy, area, aspect]"""
+        x1, y1, x2, y2 = bbox
+        w = max(float(x2 - x1), 1e-6)
+        h = max(float(y2 - y1), 1e-6)
+        return np.array([x1 + w / 2, y1 + h / 2, w * h, w / h])
+
+    def get_bbox(self) -> np.ndarray:
+        """Current state as [x1, y1, x2, y2]"""
+        cx, cy, area, aspect = self.x[:4]
+        area = max(area, 1e-6)
+        w = np.sqrt(area * aspect)
+        h = area / w
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+    def predict(self) -> np.ndarray:
+        """Advance the state by one frame and return the predicted box"""
+        # Keep the area from going negative
+        if self.x[2] + self.x[6] <= 0:
+            self.x[6] = 0.0
+
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+
+        return self.get_bbox()
+
+    def update(self, bbox: List[float], confidence: float, frame_index: int):
+        """Correct the state with a matched detection"""
+        z = self._bbox_to_z(bbox)
+        y = z - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+
+        self.x = self.x + K @ y
+        self.P = (np.eye(7) - K @ self.H) @ self.P
+
+        self.confidence = confidence
+        self.appearances += 1
+        self.hit_streak += 1
+        self.time_since_update = 0
+        self.last_seen = frame_index
+
+    def to_detection(self) -> Dict:
+        """Convert track to detection format"""
+        x1, y1, x2, y2 = self.get_bbox()
+        return {
+            'class': self.class_name,
+            'confidence': self.confidence,
+            'bbox': [int(x1), int(y1), int(x2), int(y2)],
+            'track_id': self.track_id,
+            'appearances': self.appearances,
+            'age': self.last_seen - self.created + 1,
+            'time_since_update': self.time_since_update,
+            'velocity': [float(self.x[4]), float(self.x[5])]
+        }
+
+class MultiObjectTracker:
+    """Incremental multi-object tracker
+
+    Kalman-predicted boxes are matched to new detections with Hungarian
+    assignment on an IoU cost matrix. Tracks keep stable integer ids for
+    their whole lifetime.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3,
+                 max_disappeared: int = 5,
+                 min_appearances: int = 3,
+                 class_aware: bool = True):
+        self.iou_threshold = iou_threshold
+        self.max_disappeared = max_disappeared
+        self.min_appearances = min_appearances
+        self.class_aware = class_aware
+
+        self.postprocessor = PostProcessor()
+        self.logger = logging.getLogger(__name__)
+
+        self.reset()
+
+    def reset(self):
+        """Drop all tracks and restart id assignment"""
+        self.tracks: List[KalmanBoxTrack] = []
+        self.frame_index = -1
+        # Detection index -> track id for the most recent update()
+        self.last_assignments: Dict[int, int] = {}
+        self._id_counter = itertools.count()
+
+    def _match(self, detections: List[Dict],
+               predicted_boxes: np.ndarray) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+        """Match detections to predicted track boxes"""
+        if not detections or not self.tracks:
+            return [], list(range(len(detections))), list(range(len(self.tracks)))
+
+        det_boxes = np.array([det['bbox'] for det in detections], dtype=np.float32)
+        iou = self.postprocessor.compute_iou_matrix(det_boxes, predicted_boxes)
+
+        if self.class_aware:
+            det_classes = np.array([det.get('class', 'unknown') for det in detections], dtype=object)
+            track_classes = np.array([track.class_name for track in self.tracks], dtype=object)
+            iou = np.where(det_classes[:, None] == track_classes[None, :], iou, 0.0)
+
+        if linear_sum_assignment is not None:
+            rows, cols = linear_sum_assignment(-iou)
+            pairs = list(zip(rows, cols))
+        else:
+            # Greedy matching on highest IoU first
+            pairs = []
+            used_rows, used_cols = set(), set()
+            for flat in np.argsort(-iou, axis=None):
+                row, col = np.unravel_index(flat, iou.shape)
+                if row not in used_rows and col not in used_cols:
+                    pairs.append((row, col))
+                    used_rows.add(row)
+                    used_cols.add(col)
+
+        matches = [(int(row), int(col)) for row, col in pairs if iou[row, col] >= self.iou_threshold]
+        matched_rows = {row for row, _ in matches}
+        matched_cols = {col for _, col in matches}
+
+        unmatched_detections = [i for i in range(len(detections)) if i not in matched_rows]
+        unmatched_tracks = [j for j in range(len(self.tracks)) if j not in matched_cols]
+
+        return matches, unmatched_detections, unmatched_tracks
+
+    def update(self, detections: List[Dict]) -> List[Dict]:
+        """Process one frame of detections and return confirmed tracks seen this frame"""
+        self.frame_index += 1
+
+        if self.tracks:
+            predicted_boxes = np.array([track.predict() for track in self.tracks], dtype=np.float32)
+        else:
+            predicted_boxes = np.empty((0, 4), dtype=np.float32)
+
+        matches, unmatched_detections, unmatched_tracks = self._match(detections, predicted_boxes)
+
+        self.last_assignments = {}
+
+        for det_index, track_index in matches:
+            detection = detections[det_index]
+            self.tracks[track_index].update(
+                detection['bbox'], detection.get('confidence', 0), self.frame_index
+            )
+            self.last_assignments[det_index] = self.tracks[track_index].track_id
+
+        for track_index in unmatched_tracks:
+            track = self.tracks[track_index]
+            track.time_since_update += 1
+            track.hit_streak = 0
+
+        for det_index in unmatched_detections:
+            detection = detections[det_index]
+            track = KalmanBoxTrack(
+                detection['bbox'],
+                next(self._id_counter),
+                detection.get('class', 'unknown'),
+                detection.get('confidence', 0),
+                self.frame_index
+            )
+            self.tracks.append(track)
+            self.last_assignments[det_index] = track.track_id
+
+        # Remove tracks that have been missing for too long
+        self.tracks = [
+            track for track in self.tracks
+            if track.time_since_update <= self.max_disappeared
+        ]
+
+        return [
+            track.to_detection() for track in self.tracks
+            if track.time_since_update == 0 and track.appearances >= self.min_appearances
+        ]
+
+    def predict(self) -> List[Dict]:
+        """Advance all tracks one frame without detections
+
+        Used on frames where the detector is skipped; tracks are propagated
+        by their motion model and are not counted as missed.
+        """
+        self.frame_index += 1
+
+        predictions = []
+        for track in self.tracks:
+            track.predict()
+            if track.appearances >= self.min_appearances:
+                predictions.append(track.to_detection())
+
+        return predictions
+
+    def get_active_tracks(self, min_appearances: Optional[int] = None) -> List[Dict]:
+        """Get all live tracks, including ones missing from the latest frame"""
+        if min_appearances is None:
+            min_appearances = self.min_appearances
+
+        return [
+            track.to_detection() for track in self.tracks
+            if track.appearances >= min_appearances
+        ]
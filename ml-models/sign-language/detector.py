@@ -2,10 +2,17 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import cv2
 import numpy as np
-import base64
+import sys
+import time
+from pathlib import Path
 import mediapipe as mp
 import logging
 
+# Add shared utilities to path
+sys.path.append(str(Path(__file__).parent.parent / 'shared'))
+
+from frame_decoding import decode_frame_request, FrameDecodeError
+
 app = Flask(__name__)
 CORS(app)
 
@@ -37,20 +44,6 @@ ASL_SIGNS = {
     'Y': 'Thumb and pinky out',
 }
 
-def decode_base64_image(base64_string):
-    """Decode base64 image string to numpy array"""
-    try:
-        if ',' in base64_string:
-            base64_string = base64_string.split(',')[1]
-        
-        img_data = base64.b64decode(base64_string)
-        nparr = np.frombuffer(img_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        return img
-    except Exception as e:
-        logger.error(f"Error decoding image: {str(e)}")
-        return None
-
 def detect_sign_from_landmarks(landmarks):
     """Simple sign detection logic based on hand landmarks"""
     # This is a simplified version - real implementation would use ML model
@@ -64,24 +57,33 @@ def detect_sign_from_landmarks(landmarks):
 
 @app.route('/detect', methods=['POST'])
 def detect_sign_language():
-    """Detect sign language from image"""
+    """Detect sign language from image
+
+    Accepts a base64 JSON body, a multipart upload, a raw JPEG/PNG body or a
+    raw BGR/NV12 buffer (see frame_decoding.decode_frame_request).
+    """
     try:
-        data = request.get_json()
-        image_data = data.get('image')
-        
-        if not image_data:
-            return jsonify({'error': 'No image provided'}), 400
+        start_time = time.perf_counter()
         
         # Decode image
-        img = decode_base64_image(image_data)
-        if img is None:
-            return jsonify({'error': 'Failed to decode image'}), 400
+        try:
+            img, _, decode_ms = decode_frame_request(request)
+        except FrameDecodeError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Convert BGR to RGB
         img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         
         # Process image
+        inference_start = time.perf_counter()
         results = hands.process(img_rgb)
+        inference_ms = (time.perf_counter() - inference_start) * 1000
+        
+        timing = {
+            'decode_ms': decode_ms,
+            'inference_ms': inference_ms,
+            'total_ms': (time.perf_counter() - start_time) * 1000
+        }
         
         if results.multi_hand_landmarks:
             # Get first hand landmarks
@@ -105,14 +107,16 @@ def detect_sign_language():
                 'success': True,
                 'sign': sign,
                 'confidence': confidence,
-                'landmarks': landmarks_list
+                'landmarks': landmarks_list,
+                'timing': timing
             })
         else:
             return jsonify({
                 'success': False,
                 'sign': 'Unknown',
                 'confidence': 0.0,
-                'message': 'No hand detected'
+                'message': 'No hand detected',
+                'timing': timing
             })
         
     except Exception as e:
@@ -0,0 +1,220 @@
+import ast
+import logging
+from abc import ABC, abstractmethod
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Add shared utilities to path
+sys.path.append(str(Path(__file__).parent.parent / 'shared'))
+
+from postprocessing import PostProcessor
+
+logger = logging.getLogger(__name__)
+
+# ONNX Runtime execution providers per backend name
+ONNX_PROVIDERS = {
+    'onnx': ['CPUExecutionProvider'],
+    'openvino': ['OpenVINOExecutionProvider', 'CPUExecutionProvider'],
+}
+
+def letterbox(image: np.ndarray, size: int = 640,
+              color: Tuple[int, int, int] = (114, 114, 114)) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """Resize keeping aspect ratio and pad to a square input (YOLOv8 style)
+
+    Returns the padded image, the scale ratio and the (x, y) padding.
+    """
+    height, width = image.shape[:2]
+    ratio = min(size / height, size / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+    pad_x = (size - new_width) / 2
+    pad_y = (size - new_height) / 2
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+
+    padded = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+
+    return padded, ratio, (left, top)
+
+def preprocess_image(image: np.ndarray, size: int = 640) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """Letterbox a BGR image into a (1, 3, size, size) float32 RGB tensor"""
+    padded, ratio, padding = letterbox(image, size)
+    tensor = cv2.cvtColor(padded, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)
+    tensor = np.ascontiguousarray(tensor, dtype=np.float32)[None] / 255.0
+
+    return tensor, ratio, padding
+
+class DetectionBackend(ABC):
+    """Common interface for YOLO inference engines
+
+    ``predict`` returns one (N, 6) float32 array per image with rows of
+    [x1, y1, x2, y2, confidence, class_id] in original image pixels.
+    """
+
+    name = 'base'
+
+    def __init__(self, model_path: str = ''):
+        self.model_path = str(model_path)
+        self.names: Dict[int, str] = {}
+
+    @abstractmethod
+    def predict(self, images: List[np.ndarray], conf: float = 0.25,
+                iou: float = 0.7, max_det: int = 300) -> List[np.ndarray]:
+        """Detect objects in a batch of BGR images"""
+
+    def warmup(self, size: Tuple[int, int] = (480, 640)):
+        """Run one dummy inference so the first request is not slow"""
+        self.predict([np.zeros((size[0], size[1], 3), dtype=np.uint8)])
+
+class UltralyticsBackend(DetectionBackend):
+    """PyTorch inference through ultralytics.YOLO"""
+
+    name = 'ultralytics'
+
+    def __init__(self, model_path: str = 'yolov8n.pt', device: Optional[str] = None):
+        super().__init__(model_path)
+        from ultralytics import YOLO
+        import torch
+
+        self.model = YOLO(model_path)
+        self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+        self.model.to(self.device)
+        self.names = dict(self.model.names)
+
+    def predict(self, images: List[np.ndarray], conf: float = 0.25,
+                iou: float = 0.7, max_det: int = 300) -> List[np.ndarray]:
+        results = self.model(images, conf=conf, iou=iou, max_det=max_det, verbose=False)
+
+        return [
+            result.boxes.data.cpu().numpy().astype(np.float32)[:, :6]
+            if result.boxes is not None else np.empty((0, 6), dtype=np.float32)
+            for result in results
+        ]
+
+class OnnxRuntimeBackend(DetectionBackend):
+    """CPU inference of an exported (optionally int8-quantized) YOLOv8 ONNX model"""
+
+    name = 'onnx'
+
+    def __init__(self, model_path: str = 'yolov8n.onnx', providers: Optional[List[str]] = None,
+                 num_threads: Optional[int] = None):
+        super().__init__(model_path)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        available = ort.get_available_providers()
+        providers = [p for p in (providers or ONNX_PROVIDERS['onnx']) if p in available]
+
+        self.session = ort.InferenceSession(model_path, sess_options=options,
+                                            providers=providers or ['CPUExecutionProvider'])
+        if 'OpenVINOExecutionProvider' in self.session.get_providers():
+            self.name = 'openvino'
+        self.input = self.session.get_inputs()[0]
+        self.input_size = self.input.shape[2] if isinstance(self.input.shape[2], int) else 640
+        # Exported with a fixed batch of 1 unless dynamic axes were requested
+        self.dynamic_batch = not isinstance(self.input.shape[0], int)
+
+        self.names = self._read_names()
+        self.postprocessor = PostProcessor()
+
+        logger.info(f"ONNX backend loaded {model_path} with {self.session.get_providers()}")
+
+    def _read_names(self) -> Dict[int, str]:
+        """Class names from ultralytics export metadata"""
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        try:
+            return {int(k): v for k, v in ast.literal_eval(metadata.get('names', '{}')).items()}
+        except (ValueError, SyntaxError):
+            return {}
+
+    def predict(self, images: List[np.ndarray], conf: float = 0.25,
+                iou: float = 0.7, max_det: int = 300) -> List[np.ndarray]:
+        prepared = [preprocess_image(image, self.input_size) for image in images]
+
+        if self.dynamic_batch and len(prepared) > 1:
+            batch = np.concatenate([tensor for tensor, _, _ in prepared])
+            outputs = self.session.run(None, {self.input.name: batch})[0]
+        else:
+            outputs = np.concatenate([
+                self.session.run(None, {self.input.name: tensor})[0]
+                for tensor, _, _ in prepared
+            ])
+
+        return [
+            self._decode(output, ratio, padding, image.shape[:2], conf, iou, max_det)
+            for output, (_, ratio, padding), image in zip(outputs, prepared, images)
+        ]
+
+    def _decode(self, output: np.ndarray, ratio: float, padding: Tuple[float, float],
+                shape: Tuple[int, int], conf: float, iou: float, max_det: int) -> np.ndarray:
+        """Decode a raw (4 + classes, anchors) YOLOv8 head into detections"""
+        predictions = output.T
+        class_scores = predictions[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+
+        mask = scores >= conf
+        if not np.any(mask):
+            return np.empty((0, 6), dtype=np.float32)
+
+        xywh = predictions[mask, :4]
+        scores = scores[mask]
+        class_ids = class_ids[mask]
+
+        boxes = np.empty_like(xywh)
+        boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+        keep, _ = self.postprocessor.batched_nms(boxes, scores, class_ids, iou_threshold=iou)
+        keep = keep[:max_det]
+
+        # Undo letterbox
+        boxes = boxes[keep]
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - padding[0]) / ratio
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - padding[1]) / ratio
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+
+        return np.column_stack([boxes, scores[keep], class_ids[keep]]).astype(np.float32)
+
+def default_model_path(backend: str, weights: str = 'yolov8n.pt') -> str:
+    """Model file a backend loads for the given ultralytics weights
+
+    ONNX backends use the export quantize_onnx.py writes next to the
+    weights (``weights/yolov8n.pt`` -> ``weights/yolov8n.onnx``).
+    """
+    if backend in ONNX_PROVIDERS:
+        return str(Path(weights).with_suffix('.onnx'))
+    return weights
+
+def create_backend(backend: Optional[str] = None, model_path: Optional[str] = None,
+                   weights: str = 'yolov8n.pt', **kwargs) -> DetectionBackend:
+    """Create a detection backend by name
+
+    ``backend`` is "ultralytics", "onnx" or "openvino" (ONNX Runtime with the
+    OpenVINO execution provider). When not given, they come from the
+    YOLO_BACKEND and YOLO_MODEL_PATH environment variables; without
+    YOLO_MODEL_PATH the model is derived from ``weights`` for the backend.
+    """
+    backend = (backend or os.getenv('YOLO_BACKEND', 'ultralytics')).lower()
+    model_path = model_path or os.getenv('YOLO_MODEL_PATH') or default_model_path(backend, weights)
+
+    if backend == 'ultralytics':
+        return UltralyticsBackend(model_path, **kwargs)
+
+    if backend in ONNX_PROVIDERS:
+        return OnnxRuntimeBackend(model_path, providers=ONNX_PROVIDERS[backend], **kwargs)
+
+    raise ValueError(f"Unsupported detection backend: {backend}")
@@ -0,0 +1,207 @@
+import threading
+import queue
+import time
+import logging
+from collections import Counter, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+@dataclass
+class BatchRequest:
+    """Single image waiting to be batched"""
+    image: np.ndarray
+    confidence_threshold: float
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    future: Future = field(default_factory=Future)
+
+class BatchInferenceQueue:
+    """Dynamic micro-batching queue for detector inference
+
+    Requests arriving within ``max_wait_ms`` of the first queued request (or
+    until ``max_batch_size`` images are collected) are run as one batched
+    forward pass. Each caller receives only its own detections, filtered by
+    its own confidence threshold.
+    """
+
+    def __init__(self, infer_fn: Callable[[List[np.ndarray], float], List[List[Dict]]],
+                 max_batch_size: int = 8,
+                 max_wait_ms: float = 10.0,
+                 max_queue_size: int = 64,
+                 stats_window: int = 1000):
+        """Initialize batching queue
+
+        ``infer_fn`` takes a list of images and a confidence threshold and
+        returns one list of detection dicts per image.
+        """
+        self.infer_fn = infer_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.request_queue = queue.Queue(maxsize=max_queue_size)
+
+        # Statistics
+        self.stats_lock = threading.Lock()
+        self.batch_size_histogram = Counter()
+        self.queue_depth_histogram = Counter()
+        self.wait_times = deque(maxlen=stats_window)
+        self.latencies = deque(maxlen=stats_window)
+        self.total_requests = 0
+        self.total_batches = 0
+        self.rejected_requests = 0
+
+        self.is_running = False
+        self.worker_thread = None
+
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """Start the batching worker thread"""
+        if self.is_running:
+            return
+
+        self.is_running = True
+        self.worker_thread = threading.Thread(target=self._batch_worker, daemon=True)
+        self.worker_thread.start()
+
+        self.logger.info(
+            f"Batch queue started (max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait * 1000:.1f})"
+        )
+
+    def stop(self, timeout: float = 2.0):
+        """Stop the batching worker thread"""
+        self.is_running = False
+
+        if self.worker_thread and self.worker_thread.is_alive():
+            self.worker_thread.join(timeout=timeout)
+
+        # Fail anything still waiting
+        while True:
+            try:
+                request = self.request_queue.get_nowait()
+            except queue.Empty:
+                break
+            request.future.set_exception(RuntimeError("Batch queue stopped"))
+
+    def submit(self, image: np.ndarray, confidence_threshold: float) -> Future:
+        """Queue an image for batched inference"""
+        request = BatchRequest(image=image, confidence_threshold=confidence_threshold)
+
+        try:
+            self.request_queue.put_nowait(request)
+        except queue.Full:
+            with self.stats_lock:
+                self.rejected_requests += 1
+            request.future.set_exception(RuntimeError("Inference queue is full"))
+
+        return request.future
+
+    def infer(self, image: np.ndarray, confidence_threshold: float,
+              timeout: Optional[float] = None) -> List[Dict]:
+        """Queue an image and block until its detections are ready"""
+        return self.submit(image, confidence_threshold).result(timeout=timeout)
+
+    def _collect_batch(self) -> List[BatchRequest]:
+        """Block for the first request, then gather more until the window closes"""
+        try:
+            first = self.request_queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.request_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _batch_worker(self):
+        """Worker thread that runs batched inference"""
+        while self.is_running:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            queue_depth = self.request_queue.qsize()
+            started_at = time.perf_counter()
+
+            # Run once at the loosest threshold, then filter per caller
+            min_confidence = min(request.confidence_threshold for request in batch)
+
+            try:
+                results = self.infer_fn([request.image for request in batch], min_confidence)
+            except Exception as e:
+                self.logger.error(f"Batch inference error: {str(e)}")
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            finished_at = time.perf_counter()
+
+            for request, detections in zip(batch, results):
+                request.future.set_result([
+                    det for det in detections
+                    if det.get('confidence', 0) >= request.confidence_threshold
+                ])
+
+            with self.stats_lock:
+                self.total_batches += 1
+                self.total_requests += len(batch)
+                self.batch_size_histogram[len(batch)] += 1
+                self.queue_depth_histogram[self._depth_bucket(queue_depth)] += 1
+
+                for request in batch:
+                    self.wait_times.append(started_at - request.enqueued_at)
+                    self.latencies.append(finished_at - request.enqueued_at)
+
+    def _depth_bucket(self, depth: int) -> str:
+        """Bucket queue depth into power-of-two ranges"""
+        if depth == 0:
+            return '0'
+
+        upper = 1
+        while upper < depth:
+            upper *= 2
+        lower = upper // 2 + 1
+
+        return str(upper) if lower >= upper else f"{lower}-{upper}"
+
+    def get_stats(self) -> Dict:
+        """Get queue depth, batch size and latency statistics"""
+        with self.stats_lock:
+            wait_ms = np.array(self.wait_times) * 1000
+            latency_ms = np.array(self.latencies) * 1000
+
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'queue_depth': self.request_queue.qsize(),
+                'total_requests': self.total_requests,
+                'total_batches': self.total_batches,
+                'rejected_requests': self.rejected_requests,
+                'average_batch_size': self.total_requests / self.total_batches if self.total_batches else 0.0,
+                'batch_size_histogram': {str(size): count for size, count in sorted(self.batch_size_histogram.items())},
+                'queue_depth_histogram': dict(self.queue_depth_histogram),
+                'wait_ms': self._percentiles(wait_ms),
+                'latency_ms': self._percentiles(latency_ms)
+            }
+
+    def _percentiles(self, values: np.ndarray) -> Dict[str, float]:
+        """Summarize a latency sample"""
+        if len(values) == 0:
+            return {'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+
+        return {
+            'p50': float(np.percentile(values, 50)),
+            'p99': float(np.percentile(values, 99)),
+            'max': float(np.max(values))
+        }
@@ -1,10 +1,18 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import cv2
-import numpy as np
-import base64
-from ultralytics import YOLO
+import os
+import sys
+import time
+from pathlib import Path
 import logging
+from batch_queue import BatchInferenceQueue
+from backends import create_backend
+
+# Add shared utilities to path
+sys.path.append(str(Path(__file__).parent.parent / 'shared'))
+
+from frame_decoding import decode_frame_request, FrameDecodeError
+from stream_server import DetectionStreamServer
 
 app = Flask(__name__)
 CORS(app)
@@ -13,68 +21,95 @@ CORS(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load YOLO model
-model = YOLO('yolov8n.pt')  # Using YOLOv8 nano for speed
+# Load YOLO model (YOLO_BACKEND=ultralytics|onnx|openvino, YOLO_MODEL_PATH)
+backend = create_backend()  # YOLOv8 nano by default for speed
 
-def decode_base64_image(base64_string):
-    """Decode base64 image string to numpy array"""
-    try:
-        if ',' in base64_string:
-            base64_string = base64_string.split(',')[1]
-        
-        img_data = base64.b64decode(base64_string)
-        nparr = np.frombuffer(img_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        return img
-    except Exception as e:
-        logger.error(f"Error decoding image: {str(e)}")
-        return None
+# Micro-batching settings (requests arriving within the window share one forward pass)
+BATCH_MAX_SIZE = int(os.getenv('YOLO_BATCH_MAX_SIZE', '8'))
+BATCH_WINDOW_MS = float(os.getenv('YOLO_BATCH_WINDOW_MS', '10'))
+BATCH_TIMEOUT = float(os.getenv('YOLO_BATCH_TIMEOUT', '5'))
+
+# Persistent WebSocket channel for continuous frame streaming
+STREAM_PORT = int(os.getenv('YOLO_WS_PORT', '5005'))
+
+def parse_results(results):
+    """Convert YOLO results into one detection list per image"""
+    batch_detections = []
+    for boxes in results:
+        detections = []
+        for x1, y1, x2, y2, conf, cls in boxes:
+            conf = float(conf)
+            class_name = backend.names.get(int(cls), 'unknown')
+            
+            detection = {
+                'object_type': class_name,
+                'confidence': conf,
+                'bbox_x': int(x1),
+                'bbox_y': int(y1),
+                'bbox_width': int(x2 - x1),
+                'bbox_height': int(y2 - y1),
+            }
+            detections.append(detection)
+        batch_detections.append(detections)
+    return batch_detections
+
+def run_batch(images, confidence_threshold):
+    """Run a single batched YOLO forward pass"""
+    results = backend.predict(images, conf=confidence_threshold)
+    return parse_results(results)
+
+batch_queue = BatchInferenceQueue(
+    run_batch,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_WINDOW_MS
+)
+batch_queue.start()
+
+stream_server = DetectionStreamServer(
+    lambda img, conf: batch_queue.infer(img, conf, timeout=BATCH_TIMEOUT)
+)
+# Started on import like the batching queue, so it also runs under a WSGI server
+stream_server.start_in_thread(port=STREAM_PORT)
 
 @app.route('/detect', methods=['POST'])
 def detect_objects():
-    """Detect objects in an image using YOLO"""
+    """Detect objects in an image using YOLO
+
+    Accepts a base64 JSON body, a multipart upload, a raw JPEG/PNG body or a
+    raw BGR/NV12 buffer (see frame_decoding.decode_frame_request).
+    """
     try:
-        data = request.get_json()
-        image_data = data.get('image')
-        confidence_threshold = data.get('confidence_threshold', 0.75)
-        
-        if not image_data:
-            return jsonify({'error': 'No image provided'}), 400
+        start_time = time.perf_counter()
         
         # Decode image
-        img = decode_base64_image(image_data)
-        if img is None:
-            return jsonify({'error': 'Failed to decode image'}), 400
+        try:
+            img, params, decode_ms = decode_frame_request(request)
+        except FrameDecodeError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Run inference
-        results = model(img, conf=confidence_threshold)
+        try:
+            confidence_threshold = float(params.get('confidence_threshold', 0.75))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'confidence_threshold must be a number'}), 400
+        if not 0.0 <= confidence_threshold <= 1.0:
+            return jsonify({'error': 'confidence_threshold must be between 0 and 1'}), 400
         
-        # Parse results
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                conf = float(box.conf[0])
-                cls = int(box.cls[0])
-                class_name = model.names[cls]
-                
-                detection = {
-                    'object_type': class_name,
-                    'confidence': conf,
-                    'bbox_x': int(x1),
-                    'bbox_y': int(y1),
-                    'bbox_width': int(x2 - x1),
-                    'bbox_height': int(y2 - y1),
-                }
-                detections.append(detection)
+        # Run inference through the batching queue
+        inference_start = time.perf_counter()
+        detections = batch_queue.infer(img, confidence_threshold, timeout=BATCH_TIMEOUT)
+        inference_ms = (time.perf_counter() - inference_start) * 1000
         
         logger.info(f"Detected {len(detections)} objects")
         
         return jsonify({
             'success': True,
             'detections': detections,
-            'count': len(detections)
+            'count': len(detections),
+            'timing': {
+                'decode_ms': decode_ms,
+                'inference_ms': inference_ms,
+                'total_ms': (time.perf_counter() - start_time) * 1000
+            }
         })
         
     except Exception as e:
@@ -86,9 +121,17 @@ def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'model': 'YOLOv8n'
+        'model': backend.model_path,
+        'backend': backend.name,
+        'queue_depth': batch_queue.request_queue.qsize(),
+        'stream_sessions': stream_server.active_sessions
     })
 
+@app.route('/stats', methods=['GET'])
+def batch_stats():
+    """Batching queue statistics (queue depth and batch size histograms)"""
+    return jsonify(batch_queue.get_stats())
+
 if __name__ == '__main__':
     logger.info("Starting YOLO detection server...")
-    app.run(host='0.0.0.0', port=5001, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5001, debug=False, threaded=True)
\ No newline at end of file
@@ -1,17 +1,26 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
-import torch
 from typing import List, Dict, Tuple
 import yaml
+import sys
+from pathlib import Path
+
+# Add detection backends to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backends import create_backend
 
 class ObjectRecognizer:
-    def __init__(self, model_path='weights/yolov8n.pt', config_path='config.yaml'):
+    def __init__(self, model_path=None, config_path='config.yaml', backend=None):
         """Initialize YOLO object recognizer"""
-        self.model = YOLO(model_path)
         self.config = self.load_config(config_path)
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        self.model.to(self.device)
+        # ultralytics (PyTorch), onnx or openvino; unset falls back to YOLO_BACKEND.
+        # Without model_path, ONNX backends load the .onnx export of the weights
+        self.backend = create_backend(
+            backend or self.config.get('backend'),
+            model_path,
+            weights=self.config.get('model', {}).get('weights', 'weights/yolov8n.pt')
+        )
         
         # COCO class names
         self.class_names = [
@@ -73,8 +82,8 @@ class ObjectRecognizer:
         """Recognize objects in image"""
         try:
             # Run inference
-            results = self.model(
-                image,
+            results = self.backend.predict(
+                [image],
                 conf=self.config['confidence_threshold'],
                 iou=self.config['iou_threshold'],
                 max_det=self.config['max_detections']
@@ -84,14 +93,13 @@ class ObjectRecognizer:
             frame_area = frame_width * frame_height
             objects = []
             
-            for result in results:
-                boxes = result.boxes
+            for boxes in results:
                 if boxes is not None:
                     for box in boxes:
                         # Get bounding box coordinates
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                        confidence = box.conf[0].cpu().numpy()
-                        class_id = int(box.cls[0].cpu().numpy())
+                        x1, y1, x2, y2 = box[:4].astype(int)
+                        confidence = box[4]
+                        class_id = int(box[5])
                         
                         # Get class name
                         class_name = self.class_names[class_id] if class_id < len(self.class_names) else 'unknown'
@@ -1,17 +1,29 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
-import torch
 from typing import List, Dict, Tuple
 import yaml
+import sys
+import time
+from pathlib import Path
+
+# Add shared utilities and detection backends to path
+sys.path.append(str(Path(__file__).parent.parent.parent / 'shared'))
+sys.path.append(str(Path(__file__).parent.parent))
+
+from tracking import MultiObjectTracker
+from backends import create_backend
 
 class ObstacleDetector:
-    def __init__(self, model_path='weights/yolov8n.pt', config_path='config.yaml'):
+    def __init__(self, model_path=None, config_path='config.yaml', backend=None):
         """Initialize YOLO obstacle detector"""
-        self.model = YOLO(model_path)
         self.config = self.load_config(config_path)
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        self.model.to(self.device)
+        # ultralytics (PyTorch), onnx or openvino; unset falls back to YOLO_BACKEND.
+        # Without model_path, ONNX backends load the .onnx export of the weights
+        self.backend = create_backend(
+            backend or self.config.get('backend'),
+            model_path,
+            weights=self.config.get('model', {}).get('weights', 'weights/yolov8n.pt')
+        )
         
         # Obstacle categories (COCO dataset classes that are obstacles)
         self.obstacle_classes = {
@@ -30,6 +42,16 @@ class ObstacleDetector:
             79: 'pizza', 80: 'donut', 81: 'cake'
         }
         
+        # Detect-then-track scheduler state
+        self.tracker = MultiObjectTracker(
+            iou_threshold=0.3,
+            max_disappeared=self.config.get('max_disappeared', 3),
+            min_appearances=1
+        )
+        self.frame_index = 0
+        self.last_detection_frame = None
+        self.last_detection_gray = None
+        
     def load_config(self, config_path):
         """Load configuration from YAML file"""
         try:
@@ -42,7 +64,10 @@ class ObstacleDetector:
                 'iou_threshold': 0.45,
                 'max_detections': 100,
                 'obstacle_distance_threshold': 2.0,  # meters
-                'warning_distance': 1.0  # meters
+                'warning_distance': 1.0,  # meters
+                'detection_interval': 3,  # run YOLO every K frames in process_frame
+                'motion_threshold': 0.08,  # mean frame difference that forces detection
+                'max_disappeared': 3  # detections a track may miss before it is dropped
             }
     
     def calculate_distance(self, bbox: List[int], frame_width: int, frame_height: int) -> float:
@@ -73,8 +98,8 @@ class ObstacleDetector:
         """Detect obstacles in image"""
         try:
             # Run inference
-            results = self.model(
-                image,
+            results = self.backend.predict(
+                [image],
                 conf=self.config['confidence_threshold'],
                 iou=self.config['iou_threshold'],
                 max_det=self.config['max_detections']
@@ -82,53 +107,23 @@ class ObstacleDetector:
             
             frame_height, frame_width = image.shape[:2]
             obstacles = []
-            warnings = []
             
-            for result in results:
-                boxes = result.boxes
+            for boxes in results:
                 if boxes is not None:
                     for box in boxes:
                         # Get bounding box coordinates
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                        confidence = box.conf[0].cpu().numpy()
-                        class_id = int(box.cls[0].cpu().numpy())
+                        x1, y1, x2, y2 = box[:4].astype(int)
+                        confidence = box[4]
+                        class_id = int(box[5])
                         
                         # Check if this class is an obstacle
                         if class_id in self.obstacle_classes:
-                            class_name = self.obstacle_classes[class_id]
-                            distance = self.calculate_distance(
+                            obstacles.append(self._build_obstacle(
+                                self.obstacle_classes[class_id], float(confidence),
                                 [x1, y1, x2, y2], frame_width, frame_height
-                            )
-                            
-                            obstacle = {
-                                'class': class_name,
-                                'confidence': float(confidence),
-                                'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                                'distance': distance,
-                                'center': [int((x1 + x2) / 2), int((y1 + y2) / 2)],
-                                'size': [int(x2 - x1), int(y2 - y1)]
-                            }
-                            
-                            obstacles.append(obstacle)
-                            
-                            # Check for warnings
-                            if distance < self.config['warning_distance']:
-                                warnings.append({
-                                    'type': 'proximity_warning',
-                                    'obstacle': obstacle,
-                                    'message': f"{class_name} {distance:.1f}m ahead"
-                                })
+                            ))
             
-            # Sort obstacles by distance (closest first)
-            obstacles.sort(key=lambda x: x['distance'])
-            
-            return {
-                'obstacles': obstacles,
-                'warnings': warnings,
-                'total_obstacles': len(obstacles),
-                'closest_obstacle': obstacles[0] if obstacles else None,
-                'frame_size': [frame_width, frame_height]
-            }
+            return self._build_result(obstacles, frame_width, frame_height)
             
         except Exception as e:
             return {
@@ -137,6 +132,128 @@ class ObstacleDetector:
                 'error': str(e)
             }
     
+    def _build_obstacle(self, class_name: str, confidence: float, bbox: List[int],
+                        frame_width: int, frame_height: int) -> Dict:
+        """Build obstacle entry with distance estimate from a bounding box"""
+        x1, y1, x2, y2 = bbox
+        distance = self.calculate_distance(
+            [x1, y1, x2, y2], frame_width, frame_height
+        )
+        
+        return {
+            'class': class_name,
+            'confidence': float(confidence),
+            'bbox': [int(x1), int(y1), int(x2), int(y2)],
+            'distance': distance,
+            'center': [int((x1 + x2) / 2), int((y1 + y2) / 2)],
+            'size': [int(x2 - x1), int(y2 - y1)]
+        }
+    
+    def _build_result(self, obstacles: List[Dict], frame_width: int, frame_height: int) -> Dict:
+        """Build detection result with proximity warnings"""
+        warnings = []
+        
+        for obstacle in obstacles:
+            # Check for warnings
+            if obstacle['distance'] < self.config['warning_distance']:
+                warnings.append({
+                    'type': 'proximity_warning',
+                    'obstacle': obstacle,
+                    'message': f"{obstacle['class']} {obstacle['distance']:.1f}m ahead"
+                })
+        
+        # Sort obstacles by distance (closest first)
+        obstacles.sort(key=lambda x: x['distance'])
+        
+        return {
+            'obstacles': obstacles,
+            'warnings': warnings,
+            'total_obstacles': len(obstacles),
+            'closest_obstacle': obstacles[0] if obstacles else None,
+            'frame_size': [frame_width, frame_height]
+        }
+    
+    def _frame_motion(self, gray: np.ndarray) -> float:
+        """Mean absolute difference against the last detected frame (0-1)"""
+        if self.last_detection_gray is None:
+            return 1.0
+        
+        return float(cv2.absdiff(gray, self.last_detection_gray).mean()) / 255.0
+    
+    def process_frame(self, image: np.ndarray, force_detection: bool = False) -> Dict:
+        """Detect-then-track scheduler for video streams
+        
+        Runs YOLO every ``detection_interval`` frames, or sooner when scene
+        motion since the last detection crosses ``motion_threshold``. On the
+        frames in between, obstacles are propagated with the Kalman tracker
+        and distances/warnings are recomputed from the propagated boxes.
+        """
+        frame_height, frame_width = image.shape[:2]
+        
+        # Small grayscale thumbnail for cheap motion estimation
+        gray = cv2.cvtColor(cv2.resize(image, (64, 48), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        motion = self._frame_motion(gray)
+        
+        self.frame_index += 1
+        
+        interval = max(1, self.config.get('detection_interval', 3))
+        frames_since_detection = (
+            self.frame_index - self.last_detection_frame
+            if self.last_detection_frame is not None else interval
+        )
+        
+        run_detector = (
+            force_detection
+            or frames_since_detection >= interval
+            or motion >= self.config.get('motion_threshold', 0.08)
+        )
+        
+        if run_detector:
+            detections = self.detect_obstacles(image)
+            
+            if 'error' not in detections:
+                self.tracker.update(detections['obstacles'])
+                for det_index, track_id in self.tracker.last_assignments.items():
+                    detections['obstacles'][det_index]['track_id'] = track_id
+                
+                self.last_detection_frame = self.frame_index
+                self.last_detection_gray = gray
+        else:
+            obstacles = []
+            
+            for track in self.tracker.predict():
+                # Only propagate tracks confirmed by the latest detection
+                if track['time_since_update'] > 0:
+                    continue
+                
+                x1, y1, x2, y2 = track['bbox']
+                x1, x2 = np.clip([x1, x2], 0, frame_width - 1)
+                y1, y2 = np.clip([y1, y2], 0, frame_height - 1)
+                if x2 <= x1 or y2 <= y1:
+                    continue
+                
+                obstacle = self._build_obstacle(
+                    track['class'], track['confidence'],
+                    [x1, y1, x2, y2], frame_width, frame_height
+                )
+                obstacle['track_id'] = track['track_id']
+                obstacle['tracked'] = True
+                obstacles.append(obstacle)
+            
+            detections = self._build_result(obstacles, frame_width, frame_height)
+        
+        detections['detector_ran'] = run_detector
+        detections['motion'] = motion
+        
+        return detections
+    
+    def reset_tracking(self):
+        """Reset scheduler and tracker state (e.g. when the camera changes)"""
+        self.tracker.reset()
+        self.frame_index = 0
+        self.last_detection_frame = None
+        self.last_detection_gray = None
+    
     def draw_detections(self, image: np.ndarray, detections: Dict) -> np.ndarray:
         """Draw obstacle detections on image"""
         annotated_image = image.copy()
@@ -205,18 +322,44 @@ class ObstacleDetector:
         
         return messages
 
-if __name__ == "__main__":
-    # Test with webcam
-    detector = ObstacleDetector()
-    cap = cv2.VideoCapture(0)
-    
+def webcam_frames(cap):
+    """Yield frames from an OpenCV capture until it ends"""
     while True:
         ret, frame = cap.read()
         if not ret:
             break
+        yield frame
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Obstacle detection demo')
+    parser.add_argument('--frame-bus', help='read frames from this shared-memory frame bus instead of the webcam')
+    args = parser.parse_args()
+    
+    detector = ObstacleDetector()
+    cap = None
+    
+    if args.frame_bus:
+        # Frames are published by CameraStream.enable_frame_bus() in the capture process
+        from frame_bus import FrameBusReader
+        reader = FrameBusReader(args.frame_bus)
+        # Copy out of the slot: inference outlasts the ring, and frames are drawn on
+        frames = (bus_frame.frame for bus_frame in reader.frames(copy=True))
+    else:
+        # Test with webcam
+        cap = cv2.VideoCapture(0)
+        frames = webcam_frames(cap)
+    
+    last_time = time.time()
+    
+    for frame in frames:
+        # Detect obstacles (YOLO every few frames, tracking in between)
+        detections = detector.process_frame(frame)
         
-        # Detect obstacles
-        detections = detector.detect_obstacles(frame)
+        current_time = time.time()
+        fps = 1.0 / max(current_time - last_time, 1e-6)
+        last_time = current_time
         
         # Draw detections
         frame = detector.draw_detections(frame, detections)
@@ -226,10 +369,12 @@ if __name__ == "__main__":
         if messages:
             print("Audio guidance:", " | ".join(messages))
         
+        cv2.putText(frame, f"FPS: {fps:.1f}", (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
         cv2.imshow('Obstacle Detection', frame)
         
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
     
-    cap.release()
+    if cap is not None:
+        cap.release()
     cv2.destroyAllWindows()
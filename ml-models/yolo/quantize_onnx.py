@@ -0,0 +1,230 @@
+"""Export YOLO weights to ONNX, quantize them to int8 and compare backends
+
+Usage:
+    python quantize_onnx.py --weights yolov8n.pt --calibration-dir calib_images/ \
+        --output-dir weights/ --report weights/quantization_report.json
+
+The int8 model is statically quantized (QDQ format, per-channel weights)
+from activations observed on the calibration images. The report compares
+PyTorch, ONNX fp32 and ONNX int8 on latency and on detection agreement
+with the PyTorch reference.
+"""
+import argparse
+import json
+import logging
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from backends import UltralyticsBackend, OnnxRuntimeBackend, preprocess_image
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+def load_images(image_dir: str, limit: int) -> List[np.ndarray]:
+    """Load up to ``limit`` BGR images from a folder"""
+    paths = sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    images = []
+
+    for path in paths[:limit]:
+        image = cv2.imread(str(path))
+        if image is None:
+            logger.warning(f"Skipping unreadable image {path}")
+            continue
+        images.append(image)
+
+    if not images:
+        raise ValueError(f"No images found in {image_dir}")
+
+    return images
+
+def export_onnx(weights: str, output_dir: Path, imgsz: int, opset: int) -> Path:
+    """Export ultralytics weights to an fp32 ONNX model"""
+    from ultralytics import YOLO
+
+    exported = Path(YOLO(weights).export(format='onnx', imgsz=imgsz, opset=opset, simplify=True))
+    target = output_dir / f"{Path(weights).stem}.onnx"
+
+    if exported.resolve() != target.resolve():
+        shutil.copy(exported, target)
+
+    logger.info(f"Exported fp32 ONNX model to {target}")
+    return target
+
+def quantize_int8(fp32_path: Path, output_dir: Path, calibration_images: List[np.ndarray],
+                  imgsz: int) -> Path:
+    """Statically quantize an ONNX model to int8 using calibration images"""
+    from onnxruntime.quantization import (
+        CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    import onnxruntime as ort
+
+    input_name = ort.InferenceSession(str(fp32_path), providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    class ImageCalibrationReader(CalibrationDataReader):
+        """Feeds letterboxed calibration images to the quantizer"""
+
+        def __init__(self):
+            self.tensors = iter([preprocess_image(image, imgsz)[0] for image in calibration_images])
+
+        def get_next(self):
+            tensor = next(self.tensors, None)
+            return None if tensor is None else {input_name: tensor}
+
+    preprocessed_path = output_dir / f"{fp32_path.stem}.preprocessed.onnx"
+    int8_path = output_dir / f"{fp32_path.stem}.int8.onnx"
+
+    quant_pre_process(str(fp32_path), str(preprocessed_path))
+
+    quantize_static(
+        str(preprocessed_path),
+        str(int8_path),
+        ImageCalibrationReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax
+    )
+
+    preprocessed_path.unlink(missing_ok=True)
+
+    logger.info(f"Quantized int8 ONNX model to {int8_path} ({len(calibration_images)} calibration images)")
+    return int8_path
+
+def benchmark_backend(backend, images: List[np.ndarray], conf: float,
+                      warmup: int = 3) -> Dict:
+    """Time single-image inference and collect detections"""
+    for image in images[:warmup]:
+        backend.predict([image], conf=conf)
+
+    latencies = []
+    detections = []
+
+    for image in images:
+        start = time.perf_counter()
+        result = backend.predict([image], conf=conf)[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        detections.append(result)
+
+    latencies = np.array(latencies)
+
+    return {
+        'latency_ms': {
+            'mean': float(latencies.mean()),
+            'p50': float(np.percentile(latencies, 50)),
+            'p99': float(np.percentile(latencies, 99))
+        },
+        'fps': float(1000.0 / latencies.mean()),
+        'detections': detections
+    }
+
+def agreement(reference: List[np.ndarray], candidate: List[np.ndarray],
+              iou_threshold: float = 0.5) -> Dict[str, float]:
+    """Precision/recall of candidate detections against reference detections"""
+    from postprocessing import PostProcessor
+
+    postprocessor = PostProcessor()
+    tp = fp = fn = 0
+
+    for ref, cand in zip(reference, candidate):
+        matched = np.zeros(len(ref), dtype=bool)
+
+        if len(ref) and len(cand):
+            iou = postprocessor.compute_iou_matrix(cand[:, :4], ref[:, :4])
+            iou[cand[:, 5][:, None] != ref[:, 5][None, :]] = 0.0
+        else:
+            iou = np.zeros((len(cand), len(ref)))
+
+        # Greedy match by candidate confidence
+        for i in np.argsort(-cand[:, 4]) if len(cand) else []:
+            candidates = np.where(~matched & (iou[i] >= iou_threshold))[0]
+            if candidates.size:
+                matched[candidates[np.argmax(iou[i, candidates])]] = True
+                tp += 1
+            else:
+                fp += 1
+
+        fn += int((~matched).sum())
+
+    precision = tp / (tp + fp) if (tp + fp) else 1.0
+    recall = tp / (tp + fn) if (tp + fn) else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if (precision + recall) else 0.0
+
+    return {'precision': precision, 'recall': recall, 'f1': f1}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weights', default='yolov8n.pt', help='ultralytics weights to export')
+    parser.add_argument('--calibration-dir', required=True, help='folder of representative images')
+    parser.add_argument('--eval-dir', help='folder of evaluation images (defaults to calibration dir)')
+    parser.add_argument('--output-dir', default='weights', help='where to write ONNX models')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--opset', type=int, default=17)
+    parser.add_argument('--num-calibration', type=int, default=100)
+    parser.add_argument('--num-eval', type=int, default=50)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--threads', type=int, default=None, help='ONNX Runtime intra-op threads')
+    parser.add_argument('--report', default=None, help='write comparison report JSON here')
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    calibration_images = load_images(args.calibration_dir, args.num_calibration)
+    eval_images = load_images(args.eval_dir or args.calibration_dir, args.num_eval)
+
+    fp32_path = export_onnx(args.weights, output_dir, args.imgsz, args.opset)
+    int8_path = quantize_int8(fp32_path, output_dir, calibration_images, args.imgsz)
+
+    backends = {
+        'pytorch': UltralyticsBackend(args.weights, device='cpu'),
+        'onnx_fp32': OnnxRuntimeBackend(str(fp32_path), num_threads=args.threads),
+        'onnx_int8': OnnxRuntimeBackend(str(int8_path), num_threads=args.threads),
+    }
+
+    results = {name: benchmark_backend(backend, eval_images, args.conf) for name, backend in backends.items()}
+    reference = results['pytorch']['detections']
+
+    report = {
+        'weights': args.weights,
+        'imgsz': args.imgsz,
+        'calibration_images': len(calibration_images),
+        'eval_images': len(eval_images),
+        'models': {
+            'onnx_fp32': {'path': str(fp32_path), 'size_mb': fp32_path.stat().st_size / 1024 ** 2},
+            'onnx_int8': {'path': str(int8_path), 'size_mb': int8_path.stat().st_size / 1024 ** 2},
+        },
+        'backends': {}
+    }
+
+    for name, result in results.items():
+        report['backends'][name] = {
+            'latency_ms': result['latency_ms'],
+            'fps': result['fps'],
+            'speedup_vs_pytorch': results['pytorch']['latency_ms']['mean'] / result['latency_ms']['mean'],
+            'agreement_vs_pytorch': agreement(reference, result['detections'])
+        }
+
+    print(f"\n{'backend':<12}{'mean ms':>10}{'p99 ms':>10}{'speedup':>10}{'recall':>10}{'precision':>12}")
+    for name, entry in report['backends'].items():
+        print(
+            f"{name:<12}{entry['latency_ms']['mean']:>10.1f}{entry['latency_ms']['p99']:>10.1f}"
+            f"{entry['speedup_vs_pytorch']:>10.2f}{entry['agreement_vs_pytorch']['recall']:>10.3f}"
+            f"{entry['agreement_vs_pytorch']['precision']:>12.3f}"
+        )
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Report written to {args.report}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import websockets
+
+from frame_decoding import decode_image_bytes, decode_base64_image, FrameDecodeError
+
+logger = logging.getLogger(__name__)
+
+# Binary frame header: big-endian uint32 frame id, followed by JPEG/PNG bytes
+FRAME_HEADER = struct.Struct('>I')
+
+def parse_frame_id(value) -> int:
+    """Frame id from a JSON message (an unsigned 32-bit integer)"""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"Invalid frame_id: {value!r}")
+    try:
+        frame_id = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid frame_id: {value!r}")
+    if not 0 <= frame_id <= 0xFFFFFFFF:
+        raise ValueError(f"Invalid frame_id: {value!r}")
+    return frame_id
+
+def parse_confidence_threshold(value) -> float:
+    """Confidence threshold from a JSON message, in [0, 1]"""
+    try:
+        threshold = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("confidence_threshold must be a number")
+    if not 0.0 <= threshold <= 1.0:
+        raise ValueError("confidence_threshold must be between 0 and 1")
+    return threshold
+
+class StreamSession:
+    """Per-connection state: only the newest unprocessed frame is kept"""
+
+    def __init__(self, confidence_threshold: float):
+        self.confidence_threshold = confidence_threshold
+        self.pending: Optional[tuple] = None
+        self.frame_ready = asyncio.Event()
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+
+    def offer(self, frame_id: int, payload, received_at: float):
+        """Store a frame, replacing (and dropping) any frame not yet processed"""
+        if self.pending is not None:
+            self.frames_dropped += 1
+        self.pending = (frame_id, payload, received_at)
+        self.frames_received += 1
+        self.frame_ready.set()
+
+    def take(self) -> Optional[tuple]:
+        """Take the newest frame"""
+        frame = self.pending
+        self.pending = None
+        self.frame_ready.clear()
+        return frame
+
+class DetectionStreamServer:
+    """Persistent WebSocket channel for continuous frame detection
+
+    Clients push frames either as binary messages (4-byte big-endian frame
+    id followed by JPEG/PNG bytes) or as JSON text messages
+    ``{"frame_id": ..., "image": "<base64>"}``. A JSON
+    ``{"type": "config", "confidence_threshold": ...}`` message updates the
+    session threshold.
+
+    Each detection result is sent back as JSON tagged with its frame id.
+    While a frame is being processed, newer frames replace older pending
+    ones, so the server always works on the latest frame and stale frames
+    are dropped instead of queued.
+    """
+
+    def __init__(self, infer_fn: Callable[[np.ndarray, float], List[Dict]],
+                 default_confidence: float = 0.75):
+        self.infer_fn = infer_fn
+        self.default_confidence = default_confidence
+        self.active_sessions = 0
+        self.loop = None
+        self.thread = None
+
+    async def handler(self, websocket, path=None):
+        """Handle one streaming client"""
+        logger.info(f"Stream client connected from {websocket.remote_address}")
+        session = StreamSession(self.default_confidence)
+        self.active_sessions += 1
+
+        worker = asyncio.ensure_future(self._process_frames(websocket, session))
+
+        try:
+            async for message in websocket:
+                received_at = time.perf_counter()
+
+                if isinstance(message, bytes):
+                    if len(message) <= FRAME_HEADER.size:
+                        continue
+                    (frame_id,) = FRAME_HEADER.unpack_from(message)
+                    session.offer(frame_id, memoryview(message)[FRAME_HEADER.size:], received_at)
+                    continue
+
+                try:
+                    data = json.loads(message)
+                except ValueError:
+                    await websocket.send(json.dumps({'type': 'error', 'error': 'Invalid JSON message'}))
+                    continue
+
+                # A malformed message gets an error reply, not a closed connection
+                try:
+                    if not isinstance(data, dict):
+                        raise ValueError("Message must be a JSON object")
+
+                    if data.get('type') == 'config':
+                        if 'confidence_threshold' in data:
+                            session.confidence_threshold = parse_confidence_threshold(
+                                data['confidence_threshold']
+                            )
+                    elif 'image' in data:
+                        if not isinstance(data['image'], str) or not data['image']:
+                            raise ValueError("image must be a non-empty base64 string")
+                        session.offer(parse_frame_id(data.get('frame_id', 0)), data['image'], received_at)
+                    else:
+                        raise ValueError("Message has neither a config type nor an image")
+                except ValueError as e:
+                    await websocket.send(json.dumps({'type': 'error', 'error': str(e)}))
+
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            worker.cancel()
+            self.active_sessions -= 1
+            logger.info(
+                f"Stream client disconnected ({session.frames_processed} processed, "
+                f"{session.frames_dropped} dropped)"
+            )
+
+    async def _process_frames(self, websocket, session: StreamSession):
+        """Run detection on the newest pending frame, one at a time"""
+        loop = asyncio.get_event_loop()
+
+        while True:
+            await session.frame_ready.wait()
+            frame = session.take()
+            if frame is None:
+                continue
+
+            frame_id, payload, received_at = frame
+
+            try:
+                # Decoding and inference block, keep them off the event loop
+                detections, decode_ms, inference_ms = await loop.run_in_executor(
+                    None, self._detect, payload, session.confidence_threshold
+                )
+
+                session.frames_processed += 1
+                response = {
+                    'type': 'detections',
+                    'frame_id': frame_id,
+                    'detections': detections,
+                    'count': len(detections),
+                    'dropped_frames': session.frames_dropped,
+                    'timing': {
+                        'decode_ms': decode_ms,
+                        'inference_ms': inference_ms,
+                        'total_ms': (time.perf_counter() - received_at) * 1000
+                    }
+                }
+            except FrameDecodeError as e:
+                response = {'type': 'error', 'frame_id': frame_id, 'error': str(e)}
+            except Exception as e:
+                logger.error(f"Stream detection error: {str(e)}")
+                response = {'type': 'error', 'frame_id': frame_id, 'error': str(e)}
+
+            try:
+                await websocket.send(json.dumps(response))
+            except websockets.exceptions.ConnectionClosed:
+                return
+
+    def _detect(self, payload, confidence_threshold: float):
+        """Decode and run detection on one frame (executor thread)"""
+        decode_start = time.perf_counter()
+        if isinstance(payload, str):
+            image = decode_base64_image(payload)
+        else:
+            image = decode_image_bytes(payload)
+        decode_ms = (time.perf_counter() - decode_start) * 1000
+
+        inference_start = time.perf_counter()
+        detections = self.infer_fn(image, confidence_threshold)
+        inference_ms = (time.perf_counter() - inference_start) * 1000
+
+        return detections, decode_ms, inference_ms
+
+    async def serve(self, host: str, port: int):
+        """Serve until cancelled"""
+        async with websockets.serve(self.handler, host, port, max_size=8 * 1024 * 1024):
+            logger.info(f"YOLO stream server listening on ws://{host}:{port}")
+            await asyncio.Future()
+
+    def start_in_thread(self, host: str = '0.0.0.0', port: int = 5005):
+        """Run the server on its own event loop next to the Flask app"""
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            try:
+                self.loop.run_until_complete(self.serve(host, port))
+            except OSError as e:
+                # e.g. the port is taken by another worker process
+                logger.error(f"YOLO stream server could not listen on {host}:{port}: {e}")
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
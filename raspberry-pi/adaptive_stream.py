@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+@dataclass(frozen=True)
+class StreamProfile:
+    """Encoding settings for one viewer"""
+    name: str
+    width: int
+    height: int
+    quality: int
+    fps: float
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'width': self.width,
+            'height': self.height,
+            'quality': self.quality,
+            'fps': self.fps
+        }
+
+# Quality ladder, best first
+PROFILES = OrderedDict((profile.name, profile) for profile in (
+    StreamProfile('high', 640, 480, 80, 30.0),
+    StreamProfile('medium', 640, 480, 60, 20.0),
+    StreamProfile('low', 480, 360, 50, 15.0),
+    StreamProfile('minimal', 320, 240, 40, 8.0),
+))
+PROFILE_NAMES = list(PROFILES)
+
+class AdaptiveController:
+    """Per-viewer quality control from round-trip and send-queue latency
+
+    Latencies are smoothed with an EWMA. The controller steps one profile
+    down as soon as the link looks congested (high RTT, frames sitting in
+    the send queue, or dropped frames) and steps back up only after several
+    consecutive healthy intervals, so quality does not oscillate.
+    """
+
+    def __init__(self, initial_profile: str = 'high', max_profile: str = 'high',
+                 adaptive: bool = True, alpha: float = 0.3,
+                 congested_rtt: float = 0.25, congested_queue: float = 0.15,
+                 healthy_rtt: float = 0.1, healthy_queue: float = 0.05,
+                 upgrade_after: int = 3):
+        self.max_level = PROFILE_NAMES.index(max_profile)
+        self.level = max(PROFILE_NAMES.index(initial_profile), self.max_level)
+        self.adaptive = adaptive
+        self.alpha = alpha
+
+        self.congested_rtt = congested_rtt
+        self.congested_queue = congested_queue
+        self.healthy_rtt = healthy_rtt
+        self.healthy_queue = healthy_queue
+        self.upgrade_after = upgrade_after
+
+        self.rtt: Optional[float] = None
+        self.queue_latency: Optional[float] = None
+        self.drops = 0
+        self.healthy_intervals = 0
+
+    @property
+    def profile(self) -> StreamProfile:
+        return PROFILES[PROFILE_NAMES[self.level]]
+
+    def _smooth(self, current: Optional[float], sample: float) -> float:
+        return sample if current is None else self.alpha * sample + (1 - self.alpha) * current
+
+    def record_rtt(self, seconds: float):
+        """Ping/pong round trip"""
+        self.rtt = self._smooth(self.rtt, seconds)
+
+    def record_queue_latency(self, seconds: float):
+        """Time from capture until the frame was handed to the socket"""
+        self.queue_latency = self._smooth(self.queue_latency, seconds)
+
+    def record_drop(self):
+        self.drops += 1
+
+    def set_max_profile(self, name: str):
+        """Client-requested quality ceiling"""
+        self.max_level = PROFILE_NAMES.index(name)
+        self.level = max(self.level, self.max_level)
+
+    def update(self) -> bool:
+        """Re-evaluate the profile once per interval; returns True if it changed"""
+        drops, self.drops = self.drops, 0
+        if not self.adaptive:
+            return False
+
+        rtt = self.rtt or 0.0
+        queue_latency = self.queue_latency or 0.0
+        previous = self.level
+
+        if drops or rtt > self.congested_rtt or queue_latency > self.congested_queue:
+            self.healthy_intervals = 0
+            self.level = min(self.level + 1, len(PROFILE_NAMES) - 1)
+        elif rtt < self.healthy_rtt and queue_latency < self.healthy_queue:
+            self.healthy_intervals += 1
+            if self.healthy_intervals >= self.upgrade_after:
+                self.healthy_intervals = 0
+                self.level = max(self.level - 1, self.max_level)
+        else:
+            self.healthy_intervals = 0
+
+        return self.level != previous
+
+    def get_stats(self) -> Dict:
+        return {
+            'profile': self.profile.name,
+            'adaptive': self.adaptive,
+            'rtt_ms': None if self.rtt is None else self.rtt * 1000,
+            'queue_latency_ms': None if self.queue_latency is None else self.queue_latency * 1000
+        }
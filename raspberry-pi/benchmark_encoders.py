@@ -0,0 +1,147 @@
+"""Compare JPEG encoders at the Pi stream resolutions
+
+Usage:
+    python benchmark_encoders.py
+    python benchmark_encoders.py --quality 60 80 --workers 1 2 4 --output encoders.json
+
+Frames are synthetic but camera-like (smooth gradients, edges and sensor
+noise), since pure noise is a worst case JPEG never sees in practice. For
+every available encoder this reports single-thread latency and compressed
+size, then the throughput of the encoder pool with several workers.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from jpeg_encoder import JpegEncoderPool, available_encoders, create_encoder
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEED = 1234
+RESOLUTIONS = [(320, 240), (480, 360), (640, 480), (1280, 720), (1920, 1080)]
+
+def synthetic_frame(width: int, height: int, channels: int = 3,
+                    rng: np.random.Generator = None) -> np.ndarray:
+    """Camera-like BGR(X) frame"""
+    rng = rng or np.random.default_rng(SEED)
+
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    frame = np.empty((height, width, 3), dtype=np.float32)
+    frame[..., 0] = 200 * x + 30 * np.sin(12 * y)
+    frame[..., 1] = 150 * y + 40 * np.cos(9 * x)
+    frame[..., 2] = 120 * (x + y) / 2 + 60
+
+    frame = np.clip(frame + rng.normal(0, 4, frame.shape), 0, 255).astype(np.uint8)
+
+    for _ in range(12):
+        x1, y1 = int(rng.integers(0, width)), int(rng.integers(0, height))
+        x2, y2 = x1 + int(rng.integers(20, width // 3)), y1 + int(rng.integers(20, height // 3))
+        color = [int(c) for c in rng.integers(0, 256, size=3)]
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, -1)
+
+    if channels == 4:
+        frame = np.dstack([frame, np.full((height, width), 255, dtype=np.uint8)])
+
+    return frame
+
+def time_encoder(encoder, frame: np.ndarray, quality: int, min_time: float, warmup: int = 3) -> Dict:
+    """Single-thread encode latency and output size"""
+    for _ in range(warmup):
+        jpeg = encoder.encode(frame, quality)
+
+    durations = []
+    started = time.perf_counter()
+    while len(durations) < 10 or time.perf_counter() - started < min_time:
+        call_start = time.perf_counter_ns()
+        encoder.encode(frame, quality)
+        durations.append(time.perf_counter_ns() - call_start)
+
+    durations_ms = np.array(durations) / 1e6
+
+    return {
+        'p50_ms': float(np.percentile(durations_ms, 50)),
+        'p99_ms': float(np.percentile(durations_ms, 99)),
+        'fps': float(1000.0 / durations_ms.mean()),
+        'bytes': len(jpeg),
+        'megapixels_per_sec': float(frame.shape[0] * frame.shape[1] / 1e6 * 1000.0 / durations_ms.mean())
+    }
+
+async def time_pool(pool: JpegEncoderPool, frame: np.ndarray, quality: int, frames: int) -> float:
+    """Encoded frames per second with ``frames`` encodes in flight"""
+    await asyncio.gather(*[pool.encode(frame, quality) for _ in range(pool.workers)])
+
+    started = time.perf_counter()
+    await asyncio.gather(*[pool.encode(frame, quality) for _ in range(frames)])
+    return frames / (time.perf_counter() - started)
+
+def run(encoders: List[str], resolutions, qualities: List[int], workers: List[int],
+        channels: int, min_time: float) -> Dict:
+    results = {}
+
+    for name in encoders:
+        encoder = create_encoder(name)
+        results[name] = {}
+
+        for width, height in resolutions:
+            frame = synthetic_frame(width, height, channels)
+
+            for quality in qualities:
+                key = f"{width}x{height}@q{quality}"
+                result = time_encoder(encoder, frame, quality, min_time)
+
+                result['pool_fps'] = {}
+                for count in workers:
+                    pool = JpegEncoderPool(encoder, workers=count)
+                    result['pool_fps'][count] = asyncio.run(time_pool(pool, frame, quality, frames=count * 20))
+                    pool.shutdown()
+
+                results[name][key] = result
+                pool_text = ', '.join(f"{count}w {fps:.0f}" for count, fps in result['pool_fps'].items())
+                logger.info(
+                    f"{name:<10} {key:<16} p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  "
+                    f"{result['bytes'] / 1024:7.1f} KiB  pool fps: {pool_text}"
+                )
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'machine': platform.machine(),
+        'channels': channels,
+        'results': results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--encoders', nargs='+', help='encoders to compare (default: all available)')
+    parser.add_argument('--quality', nargs='+', type=int, default=[50, 80])
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4])
+    parser.add_argument('--channels', type=int, choices=[3, 4], default=4,
+                        help='4 matches picamera2 XBGR8888 frames')
+    parser.add_argument('--max-width', type=int, default=1920, help='skip larger resolutions')
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds per measurement')
+    parser.add_argument('--output', help='write JSON report here')
+    args = parser.parse_args()
+
+    encoders = args.encoders or available_encoders()
+    resolutions = [r for r in RESOLUTIONS if r[0] <= args.max_width]
+    logger.info(f"Encoders: {', '.join(encoders)}")
+
+    report = run(encoders, resolutions, args.quality, args.workers, args.channels, args.min_time)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
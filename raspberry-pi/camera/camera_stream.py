@@ -2,13 +2,19 @@ import cv2
 import numpy as np
 import time
 import logging
+import sys
 import threading
-import queue
 from typing import Dict, Optional, Callable, Tuple
 from dataclasses import dataclass
 import json
 from pathlib import Path
 
+# Add shared ML utilities (frame bus) to path
+sys.path.append(str(Path(__file__).parent.parent.parent / 'ml-models' / 'shared'))
+
+from frame_ring_buffer import FrameRingBuffer, FrameSlot
+from frame_bus import SharedFrameBus
+
 @dataclass
 class CameraConfig:
     """Camera configuration"""
@@ -35,7 +41,10 @@ class FrameInfo:
 class CameraStream:
     """Camera streaming system for Raspberry Pi"""
     
-    def __init__(self, camera_id: int = 0, config: Optional[CameraConfig] = None):
+    DEFAULT_CONSUMER = 'default'
+    
+    def __init__(self, camera_id: int = 0, config: Optional[CameraConfig] = None,
+                 buffer_size: int = 30):
         """Initialize camera stream"""
         self.camera_id = camera_id
         self.config = config or CameraConfig()
@@ -44,7 +53,15 @@ class CameraStream:
         self.camera = None
         self.is_streaming = False
         self.capture_thread = None
-        self.frame_queue = queue.Queue(maxsize=30)
+        
+        # Preallocated ring of reusable frame slots, newest frame wins
+        self.frame_buffer = FrameRingBuffer(capacity=buffer_size)
+        self.frame_buffer.register_consumer(self.DEFAULT_CONSUMER)
+        
+        # Shared-memory bus for detector processes (created on first frame)
+        self.frame_bus_name = None
+        self.frame_bus_slots = 4
+        self.frame_bus = None
         
         # Frame tracking
         self.frame_count = 0
@@ -145,6 +162,10 @@ class CameraStream:
                 self.camera.release()
             self.camera = None
         
+        if self.frame_bus:
+            self.frame_bus.close()
+            self.frame_bus = None
+        
         self.logger.info("Camera streaming stopped")
     
     def _capture_worker(self):
@@ -207,16 +228,11 @@ class CameraStream:
             fps=self.current_fps
         )
         
-        # Add to queue
-        try:
-            self.frame_queue.put_nowait(frame_info)
-        except queue.Full:
-            # Remove oldest frame
-            try:
-                self.frame_queue.get_nowait()
-                self.frame_queue.put_nowait(frame_info)
-            except queue.Empty:
-                pass
+        # Copy into the ring buffer, overwriting the oldest slot when full
+        self.frame_buffer.write(frame, current_time, self.frame_count, self.current_fps)
+        
+        if self.frame_bus_name:
+            self._publish_to_bus(frame, current_time)
         
         # Call callbacks
         for callback in self.frame_callbacks:
@@ -225,23 +241,79 @@ class CameraStream:
             except Exception as e:
                 self.logger.error(f"Frame callback error: {str(e)}")
     
-    def get_frame(self, timeout: float = 1.0) -> Optional[FrameInfo]:
-        """Get latest frame"""
-        try:
-            return self.frame_queue.get(timeout=timeout)
-        except queue.Empty:
-            return None
+    def enable_frame_bus(self, name: str = 'camera_frames', slots: int = 4):
+        """Publish every captured frame to a shared-memory frame bus
+        
+        Detector processes attach with ``frame_bus.FrameBusReader(name)``.
+        """
+        self.frame_bus_name = name
+        self.frame_bus_slots = slots
+    
+    def disable_frame_bus(self):
+        """Stop publishing frames and remove the bus"""
+        self.frame_bus_name = None
+        if self.frame_bus:
+            self.frame_bus.close()
+            self.frame_bus = None
     
-    def get_latest_frame(self) -> Optional[FrameInfo]:
-        """Get latest frame without blocking"""
+    def _publish_to_bus(self, frame: np.ndarray, timestamp: float):
+        """Write a frame to the bus, recreating it when the resolution changes"""
         try:
-            # Clear queue and get latest
-            latest_frame = None
-            while not self.frame_queue.empty():
-                latest_frame = self.frame_queue.get_nowait()
-            return latest_frame
-        except queue.Empty:
+            if self.frame_bus and self.frame_bus.shape != frame.shape:
+                self.frame_bus.close()
+                self.frame_bus = None
+            
+            if self.frame_bus is None:
+                height, width = frame.shape[:2]
+                channels = frame.shape[2] if frame.ndim == 3 else 1
+                self.frame_bus = SharedFrameBus(
+                    self.frame_bus_name, height, width, channels, self.frame_bus_slots
+                )
+            
+            self.frame_bus.write(frame.reshape(self.frame_bus.shape), self.frame_count, timestamp)
+        except Exception as e:
+            self.logger.error(f"Frame bus error: {str(e)}")
+            self.frame_bus_name = None
+    
+    def _to_frame_info(self, slot: Optional[FrameSlot]) -> Optional[FrameInfo]:
+        """Wrap a ring buffer slot as FrameInfo"""
+        if slot is None:
             return None
+        
+        return FrameInfo(
+            frame=slot.frame,
+            timestamp=slot.timestamp,
+            frame_id=slot.frame_id,
+            resolution=(slot.frame.shape[1], slot.frame.shape[0]),
+            fps=slot.fps
+        )
+    
+    def register_consumer(self, name: str, from_latest: bool = True):
+        """Register an independent frame reader (detector, recorder, streamer...)"""
+        self.frame_buffer.register_consumer(name, from_latest)
+    
+    def unregister_consumer(self, name: str):
+        """Remove a frame reader"""
+        self.frame_buffer.unregister_consumer(name)
+    
+    def get_frame(self, timeout: float = 1.0, consumer: str = DEFAULT_CONSUMER,
+                  copy: bool = False) -> Optional[FrameInfo]:
+        """Get the next unread frame for a consumer
+        
+        Frames are views into the ring buffer and are overwritten after
+        ``buffer_size`` newer frames; pass ``copy=True`` to keep one longer.
+        """
+        return self._to_frame_info(self.frame_buffer.read_next(consumer, timeout, copy))
+    
+    def get_latest_frame(self, consumer: Optional[str] = None,
+                         copy: bool = False) -> Optional[FrameInfo]:
+        """Get latest frame without blocking
+        
+        With a consumer name, older unread frames of that consumer are skipped.
+        """
+        if consumer is None:
+            return self._to_frame_info(self.frame_buffer.get_latest(copy))
+        return self._to_frame_info(self.frame_buffer.read_latest(consumer, copy))
     
     def add_frame_callback(self, callback: Callable[[FrameInfo], None]):
         """Add frame processing callback"""
@@ -295,7 +367,8 @@ class CameraStream:
             },
             'current_fps': self.current_fps,
             'frame_count': self.frame_count,
-            'queue_size': self.frame_queue.qsize()
+            'queue_size': self.frame_buffer.pending(self.DEFAULT_CONSUMER),
+            'frame_bus': self.frame_bus.name if self.frame_bus else None
         }
         
         if self.camera:
@@ -399,12 +472,16 @@ class CameraStream:
     
     def get_stream_stats(self) -> Dict:
         """Get streaming statistics"""
+        buffer_stats = self.frame_buffer.get_stats()
+        
         return {
             'frames_captured': self.frame_count,
             'current_fps': self.current_fps,
             'target_fps': self.config.fps,
-            'queue_size': self.frame_queue.qsize(),
-            'dropped_frames': max(0, self.frame_count - self.frame_queue.qsize()),
+            'queue_size': self.frame_buffer.pending(self.DEFAULT_CONSUMER),
+            'buffered_frames': buffer_stats['buffered_frames'],
+            'dropped_frames': buffer_stats['consumers'].get(self.DEFAULT_CONSUMER, {}).get('dropped', 0),
+            'consumers': buffer_stats['consumers'],
             'average_frame_time': (time.time() - self.last_frame_time) / max(1, self.frame_count) if self.frame_count > 0 else 0
         }
 
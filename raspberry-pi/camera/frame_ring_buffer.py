@@ -0,0 +1,183 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+@dataclass
+class FrameSlot:
+    """View of one ring buffer slot"""
+    frame: np.ndarray
+    sequence: int
+    timestamp: float
+    frame_id: int
+    fps: float
+
+class FrameRingBuffer:
+    """Preallocated latest-frame-wins ring buffer
+
+    Frames are copied into reusable NumPy slots, so capture does not
+    allocate per frame. ``get_latest`` is O(1). Each named consumer keeps
+    its own read cursor, so several pipelines (detector, recorder, streamer)
+    can share one capture without stealing frames from each other; a slow
+    consumer skips ahead and its drop counter is incremented.
+
+    Returned frames are views into the slots and stay valid until the
+    writer wraps around (``capacity`` frames later). Use ``is_valid`` to
+    check, or pass ``copy=True`` to get an owned copy.
+    """
+
+    def __init__(self, capacity: int = 30):
+        self.capacity = max(2, capacity)
+        self.slots: Optional[np.ndarray] = None
+        self.sequences = np.full(self.capacity, -1, dtype=np.int64)
+        self.timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self.frame_ids = np.zeros(self.capacity, dtype=np.int64)
+        self.fps_values = np.zeros(self.capacity, dtype=np.float64)
+
+        # Sequence number of the newest complete frame (-1 when empty)
+        self.head = -1
+        self.condition = threading.Condition()
+
+        # consumer name -> [next sequence to read, dropped frames]
+        self.consumers: Dict[str, list] = {}
+
+    def _ensure_slots(self, frame: np.ndarray):
+        """Allocate (or reallocate on resolution change) the slot storage"""
+        if self.slots is None or self.slots.shape[1:] != frame.shape or self.slots.dtype != frame.dtype:
+            self.slots = np.empty((self.capacity,) + frame.shape, dtype=frame.dtype)
+            self.sequences.fill(-1)
+
+    def write(self, frame: np.ndarray, timestamp: Optional[float] = None,
+              frame_id: int = 0, fps: float = 0.0) -> int:
+        """Copy a frame into the next slot and return its sequence number"""
+        self._ensure_slots(frame)
+
+        sequence = self.head + 1
+        index = sequence % self.capacity
+
+        # Invalidate the slot while it is being overwritten
+        self.sequences[index] = -1
+        np.copyto(self.slots[index], frame)
+        self.timestamps[index] = timestamp if timestamp is not None else time.time()
+        self.frame_ids[index] = frame_id
+        self.fps_values[index] = fps
+        self.sequences[index] = sequence
+
+        with self.condition:
+            self.head = sequence
+            self.condition.notify_all()
+
+        return sequence
+
+    def _slot(self, sequence: int, copy: bool) -> Optional[FrameSlot]:
+        """Read slot metadata for a sequence if it has not been overwritten"""
+        index = sequence % self.capacity
+        if self.sequences[index] != sequence:
+            return None
+
+        frame = self.slots[index]
+        slot = FrameSlot(
+            frame=frame.copy() if copy else frame,
+            sequence=sequence,
+            timestamp=float(self.timestamps[index]),
+            frame_id=int(self.frame_ids[index]),
+            fps=float(self.fps_values[index])
+        )
+
+        # Writer may have wrapped around while we were reading
+        if self.sequences[index] != sequence:
+            return None
+
+        return slot
+
+    def get_latest(self, copy: bool = False) -> Optional[FrameSlot]:
+        """Newest frame in O(1), without affecting consumer cursors"""
+        head = self.head
+        if head < 0:
+            return None
+        return self._slot(head, copy)
+
+    def is_valid(self, sequence: int) -> bool:
+        """Whether a previously returned frame's slot still holds that frame"""
+        return self.sequences[sequence % self.capacity] == sequence
+
+    def register_consumer(self, name: str, from_latest: bool = True):
+        """Create an independent read cursor"""
+        start = self.head + 1 if from_latest else max(0, self.head - self.capacity + 1)
+        self.consumers[name] = [start, 0]
+
+    def unregister_consumer(self, name: str):
+        """Remove a read cursor"""
+        self.consumers.pop(name, None)
+
+    def read_next(self, consumer: str, timeout: Optional[float] = None,
+                  copy: bool = False) -> Optional[FrameSlot]:
+        """Next unread frame for a consumer, waiting up to ``timeout``
+
+        Frames that were overwritten before the consumer got to them are
+        skipped and counted as dropped.
+        """
+        if consumer not in self.consumers:
+            self.register_consumer(consumer)
+        cursor = self.consumers[consumer]
+
+        with self.condition:
+            if cursor[0] > self.head:
+                self.condition.wait_for(lambda: cursor[0] <= self.head, timeout=timeout)
+            if cursor[0] > self.head:
+                return None
+
+        # Skip frames that have already been overwritten
+        oldest = self.head - self.capacity + 1
+        if cursor[0] < oldest:
+            cursor[1] += oldest - cursor[0]
+            cursor[0] = oldest
+
+        while cursor[0] <= self.head:
+            slot = self._slot(cursor[0], copy)
+            cursor[0] += 1
+            if slot is not None:
+                return slot
+            cursor[1] += 1
+
+        return None
+
+    def read_latest(self, consumer: str, copy: bool = False) -> Optional[FrameSlot]:
+        """Newest frame for a consumer, marking everything before it as read"""
+        if consumer not in self.consumers:
+            self.register_consumer(consumer)
+        cursor = self.consumers[consumer]
+
+        slot = self.get_latest(copy)
+        if slot is None or slot.sequence < cursor[0]:
+            return None
+
+        cursor[1] += slot.sequence - cursor[0]
+        cursor[0] = slot.sequence + 1
+
+        return slot
+
+    def pending(self, consumer: str) -> int:
+        """Number of unread frames still available to a consumer"""
+        cursor = self.consumers.get(consumer)
+        if cursor is None:
+            return 0
+        oldest = max(0, self.head - self.capacity + 1)
+        return max(0, self.head - max(cursor[0], oldest) + 1)
+
+    def get_stats(self) -> Dict:
+        """Buffer and per-consumer statistics"""
+        return {
+            'capacity': self.capacity,
+            'frames_written': self.head + 1,
+            'buffered_frames': min(self.head + 1, self.capacity),
+            'consumers': {
+                name: {
+                    'pending': self.pending(name),
+                    'dropped': cursor[1]
+                }
+                for name, cursor in list(self.consumers.items())
+            }
+        }
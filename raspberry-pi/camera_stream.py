@@ -1,74 +1,115 @@
 import asyncio
 import websockets
-import json
-import base64
-import cv2
+import os
 from picamera2 import Picamera2
 import logging
+from urllib.parse import parse_qs, urlparse
+
+from adaptive_stream import AdaptiveController, PROFILES
+from sensor_integration import sensor_manager
+from sensor_sampler import SensorSampler
+from jpeg_encoder import HardwareMjpegSource, JpegEncoderPool, create_encoder
+from stream_broadcaster import StreamBroadcaster, request_path
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+STREAM_PORT = int(os.getenv('PI_STREAM_PORT', '8765'))
+STREAM_FPS = float(os.getenv('PI_STREAM_FPS', '30'))
+CAPTURE_WIDTH = int(os.getenv('PI_STREAM_WIDTH', '640'))
+CAPTURE_HEIGHT = int(os.getenv('PI_STREAM_HEIGHT', '480'))
+# Quality of on-demand full-resolution keyframes
+KEYFRAME_QUALITY = int(os.getenv('PI_STREAM_KEYFRAME_QUALITY', '90'))
+# Frames are dropped for a client while this many bytes are still unsent
+MAX_SEND_BUFFER = int(os.getenv('PI_STREAM_MAX_SEND_BUFFER', str(256 * 1024)))
+# Send header-only messages for frames that did not visibly change
+SKIP_UNCHANGED = os.getenv('PI_STREAM_SKIP_UNCHANGED', 'false').lower() == 'true'
+CHANGE_THRESHOLD = float(os.getenv('PI_STREAM_CHANGE_THRESHOLD', '2.0'))
+KEYFRAME_INTERVAL = float(os.getenv('PI_STREAM_KEYFRAME_INTERVAL', '2.0'))
+# auto (libjpeg-turbo if installed, else OpenCV), turbojpeg or opencv
+JPEG_ENCODER = os.getenv('PI_STREAM_ENCODER', 'auto')
+ENCODER_WORKERS = int(os.getenv('PI_STREAM_ENCODER_WORKERS', '2'))
+# Use the Pi's hardware MJPEG encoder for capture-resolution frames
+HARDWARE_MJPEG = os.getenv('PI_STREAM_HARDWARE_MJPEG', 'false').lower() == 'true'
+# Sensor polling cadence in seconds (DHT22 supports at most one read every 2 s)
+CLIMATE_INTERVAL = float(os.getenv('PI_SENSOR_CLIMATE_INTERVAL', '2.0'))
+PROXIMITY_INTERVAL = float(os.getenv('PI_SENSOR_PROXIMITY_INTERVAL', '0.1'))
+
 # Initialize camera
 picam2 = Picamera2()
-config = picam2.create_preview_configuration(main={"size": (640, 480)})
+config = picam2.create_preview_configuration(main={"size": (CAPTURE_WIDTH, CAPTURE_HEIGHT)})
 picam2.configure(config)
 picam2.start()
 
-# Sensor data simulation (replace with actual sensor readings)
+hardware_source = None
+if HARDWARE_MJPEG:
+    try:
+        hardware_source = HardwareMjpegSource(picam2, quality=KEYFRAME_QUALITY)
+    except Exception as e:
+        logger.warning(f"Hardware MJPEG encoder unavailable, using software encoding: {str(e)}")
+
+# Sensors are polled in background threads; frames only read the latest snapshot
+sensor_sampler = SensorSampler()
+sensor_sampler.add_source('climate', sensor_manager.read_temperature_humidity, CLIMATE_INTERVAL)
+sensor_sampler.add_source('proximity', sensor_manager.read_proximity, PROXIMITY_INTERVAL)
+sensor_sampler.start()
+
 def get_sensor_data():
-    """Get sensor data from connected sensors"""
-    return {
-        'temperature': 24.5,
-        'humidity': 62,
-        'proximity': 1.2
-    }
+    """Get the latest sensor data without blocking"""
+    return sensor_sampler.get_sensor_data()
 
-async def stream_handler(websocket, path):
-    """Handle WebSocket connections for video streaming"""
+# One capture and encode per tick, shared by all connected viewers
+broadcaster = StreamBroadcaster(
+    capture_fn=picam2.capture_array,
+    sensor_fn=get_sensor_data,
+    fps=STREAM_FPS,
+    max_send_buffer=MAX_SEND_BUFFER,
+    change_threshold=CHANGE_THRESHOLD,
+    keyframe_interval=KEYFRAME_INTERVAL,
+    keyframe_quality=KEYFRAME_QUALITY,
+    encoder_pool=JpegEncoderPool(create_encoder(JPEG_ENCODER), workers=ENCODER_WORKERS),
+    hardware_source=hardware_source
+)
+
+async def stream_handler(websocket, path=None):
+    """Handle WebSocket connections for video streaming
+    
+    Frames are sent in the binary format from stream_protocol.py; clients
+    connecting with ``?protocol=json`` get the legacy base64 JSON messages.
+    Viewers that fall behind drop frames instead of queueing them.
+    
+    Each viewer starts on ``?profile=`` (default high) and is adapted to its
+    link unless ``?adaptive=0``; ``?max_profile=`` caps the quality.
+    """
     logger.info(f"New client connected from {websocket.remote_address}")
     
+    query = parse_qs(urlparse(request_path(websocket, path)).query)
+    legacy_json = query.get('protocol', ['binary'])[0] == 'json'
+    skip_unchanged = query.get('skip_unchanged', [str(SKIP_UNCHANGED)])[0].lower() in ('1', 'true')
+    
+    profile = query.get('profile', ['high'])[0]
+    max_profile = query.get('max_profile', ['high'])[0]
+    controller = AdaptiveController(
+        initial_profile=profile if profile in PROFILES else 'high',
+        max_profile=max_profile if max_profile in PROFILES else 'high',
+        adaptive=query.get('adaptive', ['1'])[0].lower() in ('1', 'true')
+    )
+    
     try:
-        while True:
-            # Capture frame
-            frame = picam2.capture_array()
-            
-            # Convert to JPEG
-            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-            
-            # Encode to base64
-            frame_base64 = base64.b64encode(buffer).decode('utf-8')
-            
-            # Get sensor data
-            sensor_data = get_sensor_data()
-            
-            # Create message
-            message = {
-                'type': 'stream',
-                'data': {
-                    'frame': frame_base64,
-                    'timestamp': asyncio.get_event_loop().time(),
-                    'sensor_data': sensor_data
-                }
-            }
-            
-            # Send to client
-            await websocket.send(json.dumps(message))
-            
-            # Control frame rate (30 FPS)
-            await asyncio.sleep(1/30)
-            
-    except websockets.exceptions.ConnectionClosed:
-        logger.info("Client disconnected")
+        subscriber = await broadcaster.serve_client(websocket, legacy_json, skip_unchanged, controller)
+        logger.info(
+            f"Client disconnected ({subscriber.frames_sent} sent, {subscriber.frames_dropped} dropped, "
+            f"{len(broadcaster.subscribers)} viewers left)"
+        )
     except Exception as e:
         logger.error(f"Streaming error: {str(e)}")
 
 async def main():
     """Start WebSocket server"""
-    logger.info("Starting Raspberry Pi camera stream server on ws://0.0.0.0:8765")
+    logger.info(f"Starting Raspberry Pi camera stream server on ws://0.0.0.0:{STREAM_PORT}")
     
-    async with websockets.serve(stream_handler, "0.0.0.0", 8765):
+    async with websockets.serve(stream_handler, "0.0.0.0", STREAM_PORT):
         await asyncio.Future()  # Run forever
 
 if __name__ == "__main__":
@@ -76,5 +117,10 @@ if __name__ == "__main__":
         asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Server stopped by user")
+        sensor_sampler.stop()
+        sensor_manager.cleanup()
+        if hardware_source:
+            hardware_source.stop()
+        broadcaster.encoder_pool.shutdown()
         picam2.stop()
-        
\ No newline at end of file
+        
@@ -0,0 +1,168 @@
+import asyncio
+import io
+import logging
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class JpegEncoder(ABC):
+    """Encodes BGR (or BGRX) frames to JPEG bytes"""
+
+    name = 'base'
+
+    @abstractmethod
+    def encode(self, frame: np.ndarray, quality: int = 80) -> bytes:
+        """Encode one frame at the given JPEG quality"""
+
+class OpenCVJpegEncoder(JpegEncoder):
+    """cv2.imencode, always available"""
+
+    name = 'opencv'
+
+    def encode(self, frame: np.ndarray, quality: int = 80) -> bytes:
+        if frame.ndim == 3 and frame.shape[2] == 4:
+            frame = frame[..., :3]
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buffer.tobytes()
+
+class TurboJpegEncoder(JpegEncoder):
+    """libjpeg-turbo through PyTurboJPEG
+
+    Encodes 4-channel picamera2 frames directly as BGRX, without the copy
+    OpenCV needs to drop the padding channel.
+    """
+
+    name = 'turbojpeg'
+
+    def __init__(self, lib_path: Optional[str] = None):
+        from turbojpeg import TurboJPEG, TJPF_BGR, TJPF_BGRX, TJSAMP_420
+
+        self.jpeg = TurboJPEG(lib_path) if lib_path else TurboJPEG()
+        self.pixel_formats = {3: TJPF_BGR, 4: TJPF_BGRX}
+        self.subsample = TJSAMP_420
+
+    def encode(self, frame: np.ndarray, quality: int = 80) -> bytes:
+        return self.jpeg.encode(
+            np.ascontiguousarray(frame),
+            quality=quality,
+            pixel_format=self.pixel_formats[frame.shape[2]],
+            jpeg_subsample=self.subsample
+        )
+
+# Software encoders, fastest first
+ENCODERS = {
+    'turbojpeg': TurboJpegEncoder,
+    'opencv': OpenCVJpegEncoder,
+}
+
+def available_encoders() -> List[str]:
+    """Names of the software encoders that can be created on this machine"""
+    names = []
+    for name, encoder_class in ENCODERS.items():
+        try:
+            encoder_class()
+            names.append(name)
+        except Exception:
+            continue
+    return names
+
+def create_encoder(name: Optional[str] = None) -> JpegEncoder:
+    """Create an encoder by name, or the fastest available one"""
+    if name and name != 'auto':
+        return ENCODERS[name]()
+
+    for encoder_name, encoder_class in ENCODERS.items():
+        try:
+            encoder = encoder_class()
+            logger.info(f"Using {encoder_name} JPEG encoder")
+            return encoder
+        except Exception as e:
+            logger.debug(f"{encoder_name} JPEG encoder unavailable: {str(e)}")
+
+    return OpenCVJpegEncoder()
+
+class JpegEncoderPool:
+    """Runs resize + JPEG encode in worker threads, off the asyncio event loop
+
+    Both OpenCV and libjpeg-turbo release the GIL while encoding, so the
+    workers encode in parallel on separate cores.
+    """
+
+    def __init__(self, encoder: Optional[JpegEncoder] = None, workers: int = 2):
+        self.encoder = encoder or create_encoder()
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jpeg-encoder')
+
+    def encode_sync(self, frame: np.ndarray, quality: int = 80,
+                    size: Optional[Tuple[int, int]] = None) -> bytes:
+        """Resize to ``size`` (width, height) if given, then encode"""
+        if size is not None and (frame.shape[1], frame.shape[0]) != tuple(size):
+            frame = cv2.resize(frame, tuple(size), interpolation=cv2.INTER_AREA)
+        return self.encoder.encode(frame, quality)
+
+    async def encode(self, frame: np.ndarray, quality: int = 80,
+                     size: Optional[Tuple[int, int]] = None) -> bytes:
+        """Encode in the pool and await the JPEG bytes"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, self.encode_sync, frame, quality, size)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+class HardwareMjpegSource:
+    """Latest frame from the Pi's hardware MJPEG encoder (picamera2)
+
+    The V4L2 encoder compresses the camera's main stream as it is captured,
+    so full-resolution JPEGs cost no CPU. It encodes at a fixed quality and
+    only at the capture resolution; other sizes still go through the pool.
+    """
+
+    def __init__(self, picam2, quality: int = 85):
+        from picamera2.encoders import MJPEGEncoder, Quality
+        from picamera2.outputs import FileOutput
+
+        source = self
+
+        class LatestFrameOutput(io.BufferedIOBase):
+            def write(self, buffer):
+                with source.lock:
+                    source.latest = bytes(buffer)
+                    source.frames += 1
+                return len(buffer)
+
+        self.lock = threading.Lock()
+        self.latest: Optional[bytes] = None
+        self.frames = 0
+        self.quality = quality
+
+        self.picam2 = picam2
+        self.encoder = MJPEGEncoder()
+        picam2.start_encoder(self.encoder, FileOutput(LatestFrameOutput()), quality=self._quality_level(quality, Quality))
+
+        logger.info("Hardware MJPEG encoder started")
+
+    @staticmethod
+    def _quality_level(quality: int, levels):
+        """Map a JPEG quality to picamera2's coarse quality presets"""
+        if quality >= 90:
+            return levels.VERY_HIGH
+        if quality >= 75:
+            return levels.HIGH
+        if quality >= 50:
+            return levels.MEDIUM
+        return levels.LOW
+
+    def get_latest(self) -> Optional[bytes]:
+        with self.lock:
+            return self.latest
+
+    def stop(self):
+        self.picam2.stop_encoder(self.encoder)
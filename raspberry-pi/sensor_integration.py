@@ -1,5 +1,7 @@
+import sys
 import time
 import logging
+from pathlib import Path
 try:
     import RPi.GPIO as GPIO
     import Adafruit_DHT
@@ -8,6 +10,9 @@ except ImportError:
     GPIO = None
     Adafruit_DHT = None
 
+# Add sensor drivers to path
+sys.path.append(str(Path(__file__).parent / 'sensors'))
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -23,9 +28,10 @@ class SensorManager:
     def __init__(self):
         """Initialize sensors"""
         if GPIO:
-            GPIO.setmode(GPIO.BCM)
-            GPIO.setup(TRIG_PIN, GPIO.OUT)
-            GPIO.setup(ECHO_PIN, GPIO.IN)
+            from ultrasonic_sensor import UltrasonicSensor
+            
+            # Edge-callback echo timing instead of busy-waiting on the echo pin
+            self.ultrasonic = UltrasonicSensor(TRIG_PIN, ECHO_PIN, sensor_id='proximity')
             logger.info("GPIO sensors initialized")
         else:
             logger.info("Running in simulation mode")
@@ -53,26 +59,13 @@ class SensorManager:
         """Read distance from ultrasonic sensor"""
         if GPIO:
             try:
-                # Trigger pulse
-                GPIO.output(TRIG_PIN, True)
-                time.sleep(0.00001)
-                GPIO.output(TRIG_PIN, False)
-                
-                # Measure echo
-                pulse_start = time.time()
-                pulse_end = time.time()
-                
-                while GPIO.input(ECHO_PIN) == 0:
-                    pulse_start = time.time()
-                
-                while GPIO.input(ECHO_PIN) == 1:
-                    pulse_end = time.time()
+                distance = self.ultrasonic.measure_distance()
                 
-                pulse_duration = pulse_end - pulse_start
-                distance = pulse_duration * 17150
-                distance = round(distance, 2)
+                # No echo within range
+                if distance is None:
+                    return {'proximity': None}
                 
-                return {'proximity': distance / 100}  # Convert to meters
+                return {'proximity': round(distance, 2) / 100}  # Convert to meters
             except Exception as e:
                 logger.error(f"Ultrasonic sensor error: {str(e)}")
         
@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class SensorSample:
+    """Latest values from one sensor source"""
+    values: Dict
+    timestamp: float
+    read_ms: float
+
+@dataclass
+class SensorSource:
+    """A sensor read function and its polling cadence"""
+    name: str
+    read_fn: Callable[[], Dict]
+    interval: float
+    stale_after: float
+    reads: int = 0
+    errors: int = 0
+    thread: Optional[threading.Thread] = None
+
+class SensorSampler:
+    """Background sensor polling with a lock-free latest-value snapshot
+
+    Each source is polled on its own cadence in its own thread, so a DHT22
+    ``read_retry`` that blocks for seconds never delays the ultrasonic
+    reads or the video loop. Results are published by swapping in a new
+    immutable snapshot dict; readers just take the current reference, which
+    is O(1) and never waits on a sensor.
+    """
+
+    def __init__(self):
+        self.sources: Dict[str, SensorSource] = {}
+        self.snapshot: Dict[str, SensorSample] = {}
+        self.publish_lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def add_source(self, name: str, read_fn: Callable[[], Dict], interval: float,
+                   stale_after: Optional[float] = None):
+        """Register a sensor; values older than ``stale_after`` seconds are flagged stale"""
+        self.sources[name] = SensorSource(name, read_fn, interval, stale_after or 3 * interval)
+
+    def start(self):
+        """Start one polling thread per source"""
+        self.stop_event.clear()
+
+        for source in self.sources.values():
+            if source.thread and source.thread.is_alive():
+                continue
+            source.thread = threading.Thread(
+                target=self._poll, args=(source,), name=f"sensor-{source.name}", daemon=True
+            )
+            source.thread.start()
+
+        logger.info(f"Sensor sampler started: {', '.join(self.sources)}")
+
+    def stop(self, timeout: float = 2.0):
+        """Stop polling threads"""
+        self.stop_event.set()
+        for source in self.sources.values():
+            if source.thread:
+                source.thread.join(timeout=timeout)
+
+    def _poll(self, source: SensorSource):
+        next_read = time.monotonic()
+
+        while not self.stop_event.is_set():
+            started = time.perf_counter()
+            try:
+                values = source.read_fn()
+                self._publish(source.name, SensorSample(
+                    values=dict(values),
+                    timestamp=time.time(),
+                    read_ms=(time.perf_counter() - started) * 1000
+                ))
+                source.reads += 1
+            except Exception as e:
+                source.errors += 1
+                logger.error(f"Sensor {source.name} read error: {str(e)}")
+
+            # Fixed cadence; a read that overran its interval is followed immediately
+            next_read = max(next_read + source.interval, time.monotonic())
+            self.stop_event.wait(next_read - time.monotonic())
+
+    def _publish(self, name: str, sample: SensorSample):
+        # Copy-and-swap: readers always see a complete snapshot without locking
+        with self.publish_lock:
+            snapshot = dict(self.snapshot)
+            snapshot[name] = sample
+            self.snapshot = snapshot
+
+    def get_snapshot(self) -> Dict[str, SensorSample]:
+        """Latest sample per source (do not mutate)"""
+        return self.snapshot
+
+    def get_sensor_data(self) -> Dict:
+        """Flat latest values plus per-source age and staleness"""
+        snapshot = self.snapshot
+        now = time.time()
+
+        data = {}
+        ages = {}
+        stale = []
+
+        for name, source in self.sources.items():
+            sample = snapshot.get(name)
+            if sample is None:
+                stale.append(name)
+                continue
+
+            data.update(sample.values)
+            ages[name] = round((now - sample.timestamp) * 1000)
+            if now - sample.timestamp > source.stale_after:
+                stale.append(name)
+
+        data['age_ms'] = ages
+        data['stale'] = stale
+        return data
+
+    def get_stats(self) -> Dict:
+        """Per-source read counts, errors and last read duration"""
+        snapshot = self.snapshot
+        return {
+            name: {
+                'interval': source.interval,
+                'reads': source.reads,
+                'errors': source.errors,
+                'last_read_ms': snapshot[name].read_ms if name in snapshot else None
+            }
+            for name, source in self.sources.items()
+        }
@@ -0,0 +1,125 @@
+"""Simulated RPi.GPIO for running the sensor code off the Pi
+
+Implements the subset of the RPi.GPIO API the sensors use. HC-SR04 style
+ultrasonic sensors are simulated: a HIGH->LOW transition on a trigger pin
+produces an echo pulse on the paired echo pin whose width matches the
+distance set with ``set_distance``, delivered through the same edge
+callbacks ``add_event_detect`` registers on real hardware.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+BCM = 11
+BOARD = 10
+OUT = 0
+IN = 1
+LOW = 0
+HIGH = 1
+FALLING = 32
+RISING = 31
+BOTH = 33
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+
+SPEED_OF_SOUND = 34300  # cm/s
+# Delay between the trigger pulse and the echo rising edge on an HC-SR04
+ECHO_LATENCY = 0.0005
+
+_lock = threading.Lock()
+_levels: Dict[int, int] = {}
+_directions: Dict[int, int] = {}
+_callbacks: Dict[int, List[Callable[[int], None]]] = {}
+_edges: Dict[int, int] = {}
+_echo_pins: Dict[int, int] = {}
+_distances: Dict[int, Optional[float]] = {}
+
+def setmode(mode):
+    pass
+
+def setwarnings(flag):
+    pass
+
+def setup(channel, direction, pull_up_down=PUD_OFF, initial=LOW):
+    channels = channel if isinstance(channel, (list, tuple)) else [channel]
+    with _lock:
+        for pin in channels:
+            _directions[pin] = direction
+            _levels.setdefault(pin, initial if direction == OUT else LOW)
+
+def input(channel) -> int:
+    return _levels.get(channel, LOW)
+
+def output(channel, state):
+    state = HIGH if state else LOW
+    previous = _levels.get(channel, LOW)
+    _set_level(channel, state)
+
+    echo_pin = _echo_pins.get(channel)
+    if echo_pin is not None and previous == HIGH and state == LOW:
+        _simulate_echo(echo_pin)
+
+def add_event_detect(channel, edge, callback=None, bouncetime=None):
+    with _lock:
+        if channel in _edges:
+            raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+        _edges[channel] = edge
+        _callbacks[channel] = [callback] if callback else []
+
+def add_event_callback(channel, callback):
+    with _lock:
+        _callbacks.setdefault(channel, []).append(callback)
+
+def remove_event_detect(channel):
+    with _lock:
+        _edges.pop(channel, None)
+        _callbacks.pop(channel, None)
+
+def cleanup(channel=None):
+    channels = channel if isinstance(channel, (list, tuple)) else [channel]
+    with _lock:
+        for pin in (list(_levels) if channel is None else channels):
+            _levels.pop(pin, None)
+            _directions.pop(pin, None)
+            _edges.pop(pin, None)
+            _callbacks.pop(pin, None)
+
+# Simulation controls
+
+def attach_ultrasonic(trigger_pin: int, echo_pin: int, distance: Optional[float] = 100.0):
+    """Pair a trigger and echo pin as one simulated ultrasonic sensor"""
+    _echo_pins[trigger_pin] = echo_pin
+    _distances[echo_pin] = distance
+
+def set_distance(echo_pin: int, distance: Optional[float]):
+    """Distance in cm reported by a simulated sensor (None: no echo)"""
+    _distances[echo_pin] = distance
+
+def _set_level(channel: int, state: int):
+    with _lock:
+        previous = _levels.get(channel, LOW)
+        _levels[channel] = state
+        edge = _edges.get(channel)
+        callbacks = list(_callbacks.get(channel, []))
+
+    if previous == state or edge is None:
+        return
+    if edge == BOTH or (edge == RISING and state == HIGH) or (edge == FALLING and state == LOW):
+        for callback in callbacks:
+            callback(channel)
+
+def _simulate_echo(echo_pin: int):
+    distance = _distances.get(echo_pin)
+    if distance is None:
+        return
+
+    width = 2 * distance / SPEED_OF_SOUND
+
+    def pulse():
+        time.sleep(ECHO_LATENCY)
+        _set_level(echo_pin, HIGH)
+        time.sleep(width)
+        _set_level(echo_pin, LOW)
+
+    threading.Thread(target=pulse, daemon=True).start()
@@ -0,0 +1,237 @@
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+class SlidingSums:
+    """Sum and sum of squares over the last ``size`` values"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.ring = np.zeros(size, dtype=np.float64)
+        self.count = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+
+    def push(self, value: float):
+        index = self.count % self.size
+        if self.count >= self.size:
+            old = self.ring[index]
+            self.sum -= old
+            self.sum_sq -= old * old
+
+        self.ring[index] = value
+        self.count += 1
+
+        # Re-sum once per lap so add/subtract rounding cannot accumulate
+        if index == self.size - 1:
+            self.sum = float(self.ring.sum())
+            self.sum_sq = float(np.dot(self.ring, self.ring))
+        else:
+            self.sum += value
+            self.sum_sq += value * value
+
+    @property
+    def n(self) -> int:
+        return min(self.count, self.size)
+
+class SlidingExtremes:
+    """Min and max over the last ``size`` values with monotonic queues"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.count = 0
+        self.min_queue = deque()
+        self.max_queue = deque()
+
+    def push(self, value: float):
+        index = self.count
+        self.count += 1
+
+        while self.min_queue and self.min_queue[-1][1] >= value:
+            self.min_queue.pop()
+        while self.max_queue and self.max_queue[-1][1] <= value:
+            self.max_queue.pop()
+        self.min_queue.append((index, value))
+        self.max_queue.append((index, value))
+
+        oldest = self.count - self.size
+        if self.min_queue[0][0] < oldest:
+            self.min_queue.popleft()
+        if self.max_queue[0][0] < oldest:
+            self.max_queue.popleft()
+
+    @property
+    def min(self) -> float:
+        return self.min_queue[0][1]
+
+    @property
+    def max(self) -> float:
+        return self.max_queue[0][1]
+
+class EWMA:
+    """Exponentially weighted mean and variance"""
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.mean = 0.0
+        self.variance = 0.0
+        self.initialized = False
+
+    def update(self, value: float):
+        if not self.initialized:
+            self.mean = value
+            self.initialized = True
+            return
+
+        delta = value - self.mean
+        self.mean += self.alpha * delta
+        self.variance = (1 - self.alpha) * (self.variance + self.alpha * delta * delta)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+class CUSUM:
+    """Two-sided CUSUM on standardized residuals (slack and threshold in sigmas)"""
+
+    def __init__(self, slack: float = 0.5, threshold: float = 8.0):
+        self.slack = slack
+        self.threshold = threshold
+        self.positive = 0.0
+        self.negative = 0.0
+
+    def update(self, z: float) -> Optional[str]:
+        """Returns 'increase' or 'decrease' when a shift is detected"""
+        self.positive = max(0.0, self.positive + z - self.slack)
+        self.negative = max(0.0, self.negative - z - self.slack)
+
+        if self.positive > self.threshold:
+            self.reset()
+            return 'increase'
+        if self.negative > self.threshold:
+            self.reset()
+            return 'decrease'
+        return None
+
+    def reset(self):
+        self.positive = 0.0
+        self.negative = 0.0
+
+class PageHinkley:
+    """Two-sided Page-Hinkley test on standardized residuals"""
+
+    def __init__(self, delta: float = 0.25, threshold: float = 15.0):
+        self.delta = delta
+        self.threshold = threshold
+        self.reset()
+
+    def update(self, z: float) -> Optional[str]:
+        """Returns 'increase' or 'decrease' when a shift is detected"""
+        self.count += 1
+        self.mean += (z - self.mean) / self.count
+
+        self.up += z - self.mean - self.delta
+        self.up_min = min(self.up_min, self.up)
+        self.down += z - self.mean + self.delta
+        self.down_max = max(self.down_max, self.down)
+
+        if self.up - self.up_min > self.threshold:
+            self.reset()
+            return 'increase'
+        if self.down_max - self.down > self.threshold:
+            self.reset()
+            return 'decrease'
+        return None
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.up = 0.0
+        self.up_min = 0.0
+        self.down = 0.0
+        self.down_max = 0.0
+
+@dataclass
+class ChangeEvent:
+    """A mean shift reported by a change detector"""
+    detector: str
+    direction: str
+    sample: int
+    timestamp: float
+
+class SensorStatistics:
+    """Online statistics and change detection for one sensor stream
+
+    Every accumulator is updated in O(1) per reading, so anomaly and
+    statistics queries only read the current state. Values are shifted by
+    the first reading before the sliding sums see them, which keeps the
+    sum-of-squares variance well conditioned for readings far from zero.
+    """
+
+    def __init__(self, window: int = 100, recent: int = 10, ewma_alpha: float = 0.1,
+                 cusum_slack: float = 0.5, cusum_threshold: float = 8.0,
+                 page_hinkley_delta: float = 0.25, page_hinkley_threshold: float = 15.0,
+                 warmup: int = 20):
+        self.recent = recent
+        self.warmup = warmup
+        self.count = 0
+        self.first_value = None
+        self.shift = 0.0
+
+        self.recent_sums = SlidingSums(recent)
+        self.baseline_sums = SlidingSums(2 * recent)
+        self.extremes = SlidingExtremes(window)
+        self.ewma = EWMA(ewma_alpha)
+        self.cusum = CUSUM(cusum_slack, cusum_threshold)
+        self.page_hinkley = PageHinkley(page_hinkley_delta, page_hinkley_threshold)
+        self.last_change: Optional[ChangeEvent] = None
+
+    def update(self, value: float, timestamp: float):
+        if self.first_value is None:
+            self.first_value = value
+            self.shift = value
+
+        # Residual against the baseline before this reading moves it
+        if self.count >= self.warmup:
+            z = (value - self.ewma.mean) / max(self.ewma.std, 1e-9)
+            for name, detector in (('cusum', self.cusum), ('page_hinkley', self.page_hinkley)):
+                direction = detector.update(z)
+                if direction:
+                    self.last_change = ChangeEvent(name, direction, self.count, timestamp)
+
+        shifted = value - self.shift
+        self.recent_sums.push(shifted)
+        self.baseline_sums.push(shifted)
+        self.extremes.push(value)
+        self.ewma.update(value)
+        self.count += 1
+
+    @property
+    def recent_mean(self) -> float:
+        """Mean of the last ``recent`` readings"""
+        return self.recent_sums.sum / self.recent_sums.n + self.shift
+
+    def previous_window(self):
+        """(mean, std) of the ``recent`` readings before the recent window"""
+        n = self.baseline_sums.n - self.recent_sums.n
+        if n <= 0:
+            return None
+
+        total = self.baseline_sums.sum - self.recent_sums.sum
+        total_sq = self.baseline_sums.sum_sq - self.recent_sums.sum_sq
+        mean = total / n
+        variance = total_sq / n - mean * mean
+        # Cancellation noise on a flat signal must not look like spread
+        if variance < 1e-12 * (mean * mean + 1.0):
+            variance = 0.0
+        return mean + self.shift, math.sqrt(variance)
+
+    def recent_change(self, within: Optional[int] = None) -> Optional[ChangeEvent]:
+        """Last detected change if it happened within the last ``within`` readings"""
+        within = self.recent if within is None else within
+        if self.last_change and self.count - self.last_change.sample <= within:
+            return self.last_change
+        return None
@@ -0,0 +1,99 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+class ReadingChannel:
+    """Bounded ring buffer of timestamped scalar readings
+
+    Storage is preallocated, so a producer that outpaces its consumers
+    overwrites the oldest readings instead of growing memory. ``latest``
+    always returns the newest reading, windows come back as chronologically
+    ordered NumPy arrays, and readings overwritten before ``read_new``
+    consumed them are counted as dropped.
+    """
+
+    def __init__(self, capacity: int = 256):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self.capacity = capacity
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+
+        # Total readings written; the next write goes to count % capacity
+        self.count = 0
+        self.read_cursor = 0
+        self.dropped = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, value: float, timestamp: Optional[float] = None):
+        """Store a reading, overwriting the oldest when full"""
+        timestamp = time.time() if timestamp is None else timestamp
+
+        with self.lock:
+            index = self.count % self.capacity
+            self.values[index] = value
+            self.timestamps[index] = timestamp
+            self.count += 1
+
+            unread = self.count - self.read_cursor
+            if unread > self.capacity:
+                self.dropped += unread - self.capacity
+                self.read_cursor = self.count - self.capacity
+
+    def record_miss(self):
+        """Count a measurement that produced no reading"""
+        self.misses += 1
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        """Newest (timestamp, value), or None when empty"""
+        with self.lock:
+            if self.count == 0:
+                return None
+            index = (self.count - 1) % self.capacity
+            return float(self.timestamps[index]), float(self.values[index])
+
+    def _window(self, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Caller holds the lock; start/end are absolute write counts
+        indices = np.arange(start, end) % self.capacity
+        return self.timestamps[indices], self.values[indices]
+
+    def last(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Up to ``n`` newest readings as (timestamps, values), oldest first"""
+        with self.lock:
+            n = min(max(n, 0), len(self))
+            return self._window(self.count - n, self.count)
+
+    def since(self, seconds: float, now: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Readings from the last ``seconds`` as (timestamps, values), oldest first"""
+        cutoff = (time.time() if now is None else now) - seconds
+        timestamps, values = self.last(self.capacity)
+
+        # Timestamps are appended in order, so the window is a suffix
+        start = np.searchsorted(timestamps, cutoff, side='left')
+        return timestamps[start:], values[start:]
+
+    def read_new(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Readings not returned by a previous call, oldest first"""
+        with self.lock:
+            window = self._window(self.read_cursor, self.count)
+            self.read_cursor = self.count
+            return window
+
+    def get_stats(self) -> Dict:
+        """Fill level and loss counters"""
+        with self.lock:
+            return {
+                'capacity': self.capacity,
+                'buffered': len(self),
+                'total': self.count,
+                'unread': self.count - self.read_cursor,
+                'dropped': self.dropped,
+                'misses': self.misses
+            }
@@ -0,0 +1,130 @@
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+class SensorBuffer:
+    """Columnar ring buffer of one sensor's readings
+
+    Values, timestamps and confidences live in preallocated float64 arrays.
+    Every reading is written twice, at ``i`` and ``i + capacity``, so the
+    newest ``n`` readings are always one contiguous slice: windows are
+    zero-copy views, oldest first. Views are only valid until the next
+    ``append``; copy them to keep them.
+
+    Mean and variance of the buffered readings are kept up to date on
+    append and eviction, so they cost O(1) to read.
+    """
+
+    def __init__(self, capacity: int = 100):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self.capacity = capacity
+        self._values = np.zeros(2 * capacity, dtype=np.float64)
+        self._timestamps = np.zeros(2 * capacity, dtype=np.float64)
+        self._confidences = np.zeros(2 * capacity, dtype=np.float64)
+        self.count = 0
+
+        # Welford accumulators over the buffered readings
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, value: float, timestamp: float, confidence: float = 1.0):
+        """Add a reading, evicting the oldest when full"""
+        index = self.count % self.capacity
+
+        if self.count >= self.capacity:
+            self._remove_from_stats(self._values[index])
+
+        for column, item in ((self._values, value), (self._timestamps, timestamp),
+                             (self._confidences, confidence)):
+            column[index] = item
+            column[index + self.capacity] = item
+
+        self.count += 1
+        self._add_to_stats(value, len(self))
+
+    def _add_to_stats(self, value: float, n: int):
+        delta = value - self._mean
+        self._mean += delta / n
+        self._m2 += delta * (value - self._mean)
+
+    def _remove_from_stats(self, value: float):
+        n = len(self) - 1
+        if n == 0:
+            self._mean = 0.0
+            self._m2 = 0.0
+            return
+
+        delta = value - self._mean
+        self._mean -= delta / n
+        # Rounding can leave a tiny negative sum of squares
+        self._m2 = max(self._m2 - delta * (value - self._mean), 0.0)
+
+    def _slice(self, n: Optional[int]) -> slice:
+        size = len(self)
+        n = size if n is None else min(max(n, 0), size)
+        end = self.count % self.capacity + self.capacity
+        return slice(end - n, end)
+
+    def values(self, n: Optional[int] = None) -> np.ndarray:
+        """View of the newest ``n`` values (all by default), oldest first"""
+        return self._values[self._slice(n)]
+
+    def timestamps(self, n: Optional[int] = None) -> np.ndarray:
+        """View of the newest ``n`` timestamps, oldest first"""
+        return self._timestamps[self._slice(n)]
+
+    def confidences(self, n: Optional[int] = None) -> np.ndarray:
+        """View of the newest ``n`` confidences, oldest first"""
+        return self._confidences[self._slice(n)]
+
+    def window(self, n: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Views of the newest ``n`` (values, timestamps, confidences)"""
+        window = self._slice(n)
+        return self._values[window], self._timestamps[window], self._confidences[window]
+
+    def since(self, start_time: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Views of the readings with timestamp >= ``start_time``"""
+        timestamps = self.timestamps()
+        skip = int(np.searchsorted(timestamps, start_time, side='left'))
+        return self.window(len(timestamps) - skip)
+
+    @property
+    def latest_value(self) -> float:
+        return float(self._values[self._slice(1)][0])
+
+    @property
+    def latest_timestamp(self) -> float:
+        return float(self._timestamps[self._slice(1)][0])
+
+    @property
+    def latest_confidence(self) -> float:
+        return float(self._confidences[self._slice(1)][0])
+
+    @property
+    def first_timestamp(self) -> float:
+        return float(self.timestamps()[0])
+
+    @property
+    def mean(self) -> float:
+        return self._mean
+
+    @property
+    def variance(self) -> float:
+        """Population variance, as ``np.var``"""
+        size = len(self)
+        return self._m2 / size if size else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def clear(self):
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
@@ -3,9 +3,11 @@ import time
 import logging
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
-from collections import deque
 import json
 
+from sensor_buffer import SensorBuffer
+from online_stats import SensorStatistics
+
 @dataclass
 class SensorData:
     """Unified sensor data structure"""
@@ -26,37 +28,147 @@ class FusedReading:
     confidence: float
     contributing_sensors: List[str]
     fusion_method: str
+    closing_speed: Optional[float] = None
 
-class KalmanFilter:
-    """Simple Kalman filter for sensor fusion"""
+class BatchKalmanFilter:
+    """Constant-velocity Kalman filter over many sensor channels at once
+    
+    Each channel tracks [position, velocity] with its own measurement and
+    acceleration variance. State and covariance live in NumPy arrays, so one
+    ``update`` and one ``estimate`` call per fusion tick cover every channel.
+    Measurements carry their own timestamps: each channel is predicted by
+    its own dt up to its measurement, and estimates for a common time are
+    extrapolated without touching the filter state.
+    """
+    
+    def __init__(self, acceleration_variance: float = 400.0, initial_velocity_variance: float = 1e4):
+        self.acceleration_variance = acceleration_variance
+        self.initial_velocity_variance = initial_velocity_variance
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        
+        # State, symmetric covariance terms and time of the last update
+        self.position = np.zeros(0)
+        self.velocity = np.zeros(0)
+        self.p00 = np.zeros(0)
+        self.p01 = np.zeros(0)
+        self.p11 = np.zeros(0)
+        self.last_time = np.zeros(0)
+        self.initialized = np.zeros(0, dtype=bool)
+        
+        # Per-channel noise
+        self.measurement_variance = np.zeros(0)
+        self.process_variance = np.zeros(0)
+        
+        # Latest measurement per channel waiting for the next update
+        self.pending = np.zeros(0, dtype=bool)
+        self.pending_value = np.zeros(0)
+        self.pending_time = np.zeros(0)
+        self.confidence = np.zeros(0)
+    
+    def add_channel(self, name: str, measurement_variance: float = 1.0,
+                    acceleration_variance: Optional[float] = None) -> int:
+        """Register a channel; returns its index"""
+        if name in self.index:
+            return self.index[name]
+        
+        if acceleration_variance is None:
+            acceleration_variance = self.acceleration_variance
+        
+        self.index[name] = len(self.names)
+        self.names.append(name)
+        
+        # Growing the arrays only happens when a new sensor shows up
+        for attr, initial in (('position', 0.0), ('velocity', 0.0), ('p00', 0.0), ('p01', 0.0),
+                              ('p11', 0.0), ('last_time', 0.0), ('initialized', False),
+                              ('measurement_variance', measurement_variance),
+                              ('process_variance', acceleration_variance),
+                              ('pending', False), ('pending_value', 0.0), ('pending_time', 0.0),
+                              ('confidence', 0.0)):
+            setattr(self, attr, np.append(getattr(self, attr), initial))
+        
+        return self.index[name]
+    
+    def stage(self, index: int, value: float, timestamp: float, confidence: float = 1.0):
+        """Queue a measurement for the next ``update`` (latest per channel wins)"""
+        self.pending[index] = True
+        self.pending_value[index] = value
+        self.pending_time[index] = timestamp
+        self.confidence[index] = confidence
+    
+    @staticmethod
+    def _predict(position, velocity, p00, p01, p11, dt, q):
+        dt2 = dt * dt
+        return (
+            position + dt * velocity,
+            velocity,
+            p00 + 2 * dt * p01 + dt2 * p11 + q * dt2 * dt2 / 4,
+            p01 + dt * p11 + q * dt2 * dt / 2,
+            p11 + q * dt2
+        )
+    
+    def update(self) -> int:
+        """Apply all staged measurements; returns how many were used"""
+        # Measurements older than a channel's state cannot be applied
+        usable = self.pending & (~self.initialized | (self.pending_time >= self.last_time))
+        self.pending[:] = False
+        
+        start = usable & ~self.initialized
+        if start.any():
+            self.position[start] = self.pending_value[start]
+            self.velocity[start] = 0.0
+            self.p00[start] = self.measurement_variance[start]
+            self.p01[start] = 0.0
+            self.p11[start] = self.initial_velocity_variance
+            self.last_time[start] = self.pending_time[start]
+            self.initialized[start] = True
+        
+        idx = np.flatnonzero(usable & ~start)
+        if len(idx) == 0:
+            return int(usable.sum())
+        
+        dt = self.pending_time[idx] - self.last_time[idx]
+        position, velocity, p00, p01, p11 = self._predict(
+            self.position[idx], self.velocity[idx], self.p00[idx], self.p01[idx], self.p11[idx],
+            dt, self.process_variance[idx]
+        )
+        
+        # Low-confidence readings count as noisier measurements
+        r = self.measurement_variance[idx] / np.maximum(self.confidence[idx], 1e-3)
+        innovation = self.pending_value[idx] - position
+        s = p00 + r
+        k0 = p00 / s
+        k1 = p01 / s
+        
+        self.position[idx] = position + k0 * innovation
+        self.velocity[idx] = velocity + k1 * innovation
+        self.p00[idx] = (1 - k0) * p00
+        self.p01[idx] = (1 - k0) * p01
+        self.p11[idx] = p11 - k1 * p01
+        self.last_time[idx] = self.pending_time[idx]
+        
+        return int(usable.sum())
     
-    def __init__(self, process_variance: float = 1e-5, measurement_variance: float = 1e-3):
-        self.process_variance = process_variance
-        self.measurement_variance = measurement_variance
-        self.estimated_value = 0.0
-        self.estimated_variance = 1.0
-        self.is_initialized = False
+    def estimate(self, timestamp: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(positions, velocities, position variances) of all channels at ``timestamp``
+        
+        Channels without data are NaN.
+        """
+        dt = np.maximum(timestamp - self.last_time, 0.0)
+        position, velocity, p00, _, _ = self._predict(
+            self.position, self.velocity, self.p00, self.p01, self.p11, dt, self.process_variance
+        )
+        
+        missing = ~self.initialized
+        position[missing] = np.nan
+        velocity = np.where(missing, np.nan, velocity)
+        p00[missing] = np.nan
+        return position, velocity, p00
     
-    def update(self, measurement: float, measurement_variance: float = None) -> float:
-        """Update filter with new measurement"""
-        if measurement_variance is None:
-            measurement_variance = self.measurement_variance
-        
-        if not self.is_initialized:
-            self.estimated_value = measurement
-            self.estimated_variance = measurement_variance
-            self.is_initialized = True
-            return self.estimated_value
-        
-        # Prediction step
-        predicted_variance = self.estimated_variance + self.process_variance
-        
-        # Update step
-        kalman_gain = predicted_variance / (predicted_variance + measurement_variance)
-        self.estimated_value = self.estimated_value + kalman_gain * (measurement - self.estimated_value)
-        self.estimated_variance = (1 - kalman_gain) * predicted_variance
-        
-        return self.estimated_value
+    @property
+    def latest_time(self) -> float:
+        """Newest measurement time across channels"""
+        return float(self.last_time[self.initialized].max()) if self.initialized.any() else 0.0
 
 class SensorFusion:
     """Multi-sensor data fusion system"""
@@ -65,8 +177,8 @@ class SensorFusion:
         """Initialize sensor fusion system"""
         self.sensors = {}
         self.sensor_data = {}
-        self.fusion_filters = {}
         self.data_buffers = {}
+        self.statistics = {}
         
         # Fusion parameters
         self.buffer_size = 100
@@ -80,6 +192,15 @@ class SensorFusion:
         # Load configuration
         self.config = self.load_config(config_path)
         
+        # Position/velocity filter over all distance sensors
+        self.distance_filter = BatchKalmanFilter(
+            acceleration_variance=self.config.get('kalman', {}).get('acceleration_variance', 400.0)
+        )
+        self.distance_weights = np.zeros(0)
+        
+        # Channels silent for longer than this are left out of the fusion
+        self.max_age = self.config.get('kalman', {}).get('max_age', 0.5)
+        
         self.logger.info("Sensor fusion system initialized")
     
     def load_config(self, config_path: Optional[str]) -> Dict:
@@ -90,27 +211,39 @@ class SensorFusion:
                     'type': 'distance',
                     'position': (0, 0, 0),
                     'weight': 1.0,
-                    'variance': 1.0
+                    'variance': 1.0,
+                    'acceleration_variance': 400.0  # (cm/s^2)^2
                 },
                 'ultrasonic_left': {
                     'type': 'distance',
                     'position': (-10, 0, 0),
                     'weight': 1.0,
-                    'variance': 1.0
+                    'variance': 1.0,
+                    'acceleration_variance': 400.0  # (cm/s^2)^2
                 },
                 'ultrasonic_right': {
                     'type': 'distance',
                     'position': (10, 0, 0),
                     'weight': 1.0,
-                    'variance': 1.0
+                    'variance': 1.0,
+                    'acceleration_variance': 400.0  # (cm/s^2)^2
                 }
             },
             'fusion_methods': {
                 'distance': 'kalman'
             },
+            'kalman': {
+                'acceleration_variance': 400.0,  # Default for sensors without their own
+                'max_age': 0.5  # seconds
+            },
             'thresholds': {
                 'outlier_detection': 3.0,  # Standard deviations
-                'min_confidence': 0.3
+                'min_confidence': 0.3,
+                'anomaly_z_score': 2.5,
+                'cusum_slack': 0.5,  # Standard deviations
+                'cusum_threshold': 8.0,
+                'page_hinkley_delta': 0.25,
+                'page_hinkley_threshold': 15.0
             }
         }
         
@@ -129,69 +262,98 @@ class SensorFusion:
         
         # Initialize data buffer if needed
         if sensor_id not in self.data_buffers:
-            self.data_buffers[sensor_id] = deque(maxlen=self.buffer_size)
-        
-        # Add to buffer
-        self.data_buffers[sensor_id].append(sensor_data)
-        
-        # Initialize Kalman filter if needed
-        if sensor_id not in self.fusion_filters:
-            sensor_config = self.config['sensors'].get(sensor_id, {})
-            variance = sensor_config.get('variance', 1.0)
-            self.fusion_filters[sensor_id] = KalmanFilter(measurement_variance=variance)
+            self.data_buffers[sensor_id] = SensorBuffer(self.buffer_size)
+            self.statistics[sensor_id] = self._create_statistics()
+        
+        # Add to buffer; only the latest reading object is kept
+        self.data_buffers[sensor_id].append(sensor_data.value, sensor_data.timestamp, sensor_data.confidence)
+        self.sensor_data[sensor_id] = sensor_data
+        self.statistics[sensor_id].update(sensor_data.value, sensor_data.timestamp)
+        
+        # Distance sensors feed the batched Kalman filter at the next fusion tick
+        sensor_config = self.config['sensors'].get(sensor_id, {})
+        if sensor_config.get('type') == 'distance':
+            index = self.distance_filter.index.get(sensor_id)
+            if index is None:
+                index = self.distance_filter.add_channel(
+                    sensor_id,
+                    measurement_variance=sensor_config.get('variance', 1.0),
+                    acceleration_variance=sensor_config.get('acceleration_variance')
+                )
+                self.distance_weights = np.append(self.distance_weights, sensor_config.get('weight', 1.0))
+            self.distance_filter.stage(index, sensor_data.value, sensor_data.timestamp, sensor_data.confidence)
         
         self.logger.debug(f"Added data from {sensor_id}: {sensor_data.value} {sensor_data.unit}")
     
+    def _create_statistics(self) -> SensorStatistics:
+        """Online statistics tuned from the configured thresholds"""
+        thresholds = self.config.get('thresholds', {})
+        return SensorStatistics(
+            window=self.buffer_size,
+            cusum_slack=thresholds.get('cusum_slack', 0.5),
+            cusum_threshold=thresholds.get('cusum_threshold', 8.0),
+            page_hinkley_delta=thresholds.get('page_hinkley_delta', 0.25),
+            page_hinkley_threshold=thresholds.get('page_hinkley_threshold', 15.0)
+        )
+    
     def fuse_distance_sensors(self) -> Optional[FusedReading]:
         """Fuse distance sensor readings"""
-        distance_sensors = []
-        
-        # Collect distance sensors
-        for sensor_id, sensor_config in self.config['sensors'].items():
-            if sensor_config.get('type') == 'distance':
-                if sensor_id in self.data_buffers and self.data_buffers[sensor_id]:
-                    latest_data = self.data_buffers[sensor_id][-1]
-                    if latest_data.confidence >= self.confidence_threshold:
-                        distance_sensors.append((sensor_id, latest_data))
+        kalman = self.distance_filter
         
-        if not distance_sensors:
+        if not kalman.names:
             return None
         
-        # Remove outliers
-        filtered_sensors = self._remove_outliers(distance_sensors)
+        # One batched filter step for every sensor with new data
+        kalman.update()
+        
+        # Align all channels to the newest measurement time; a sensor that has
+        # gone silent would otherwise be extrapolated along its last velocity
+        fusion_time = kalman.latest_time
+        positions, velocities, variances = kalman.estimate(fusion_time)
         
-        if not filtered_sensors:
+        mask = (kalman.initialized & (fusion_time - kalman.last_time <= self.max_age)
+                & (kalman.confidence >= self.confidence_threshold))
+        if not mask.any():
             return None
         
-        # Fuse using weighted average
-        fused_value = 0.0
-        total_weight = 0.0
-        contributing_sensors = []
+        # Remove outliers
+        mask[mask] = self._inlier_mask(positions[mask])
         
-        for sensor_id, sensor_data in filtered_sensors:
-            weight = self.config['sensors'][sensor_id].get('weight', 1.0) * sensor_data.confidence
-            fused_value += sensor_data.value * weight
-            total_weight += weight
-            contributing_sensors.append(sensor_id)
+        # Fuse using inverse-variance weighted average
+        quality = self.distance_weights * kalman.confidence * mask
+        weights = np.zeros(len(quality))
+        weights[mask] = quality[mask] / variances[mask]
+        total_weight = weights.sum()
         
         if total_weight > 0:
-            fused_value /= total_weight
+            fused_value = float(np.dot(weights[mask], positions[mask]) / total_weight)
             
-            # Apply Kalman filter
-            if 'distance' in self.fusion_filters:
-                fused_value = self.fusion_filters['distance'].update(fused_value)
+            # Positive when obstacles are getting closer
+            closing_speed = float(-np.dot(weights[mask], velocities[mask]) / total_weight)
             
             return FusedReading(
                 value=fused_value,
                 unit='cm',
-                timestamp=time.time(),
-                confidence=min(total_weight, 1.0),
-                contributing_sensors=contributing_sensors,
-                fusion_method='weighted_average_kalman'
+                timestamp=fusion_time,
+                confidence=min(float(quality.sum()), 1.0),
+                contributing_sensors=[kalman.names[i] for i in np.flatnonzero(mask)],
+                fusion_method='batch_kalman_weighted_average',
+                closing_speed=closing_speed
             )
         
         return None
     
+    def get_closing_speeds(self) -> Dict[str, float]:
+        """Per-sensor closing speed in cm/s (positive when approaching)"""
+        kalman = self.distance_filter
+        _, velocities, _ = kalman.estimate(kalman.latest_time)
+        
+        return {
+            name: float(-velocities[i])
+            for i, name in enumerate(kalman.names)
+            if kalman.initialized[i]
+        }
+    
     def fuse_all_sensors(self) -> Dict[str, FusedReading]:
         """Fuse all sensor types"""
         fused_readings = {}
@@ -206,40 +368,33 @@ class SensorFusion:
         
         return fused_readings
     
-    def _remove_outliers(self, sensor_data_list: List[Tuple[str, SensorData]]) -> List[Tuple[str, SensorData]]:
-        """Remove outliers using statistical methods"""
-        if len(sensor_data_list) < 3:
-            return sensor_data_list
+    def _inlier_mask(self, values: np.ndarray) -> np.ndarray:
+        """Mask of values that are not statistical outliers"""
+        if len(values) < 3:
+            return np.ones(len(values), dtype=bool)
+        
+        mean = values.mean()
+        std = values.std()
         
-        # Extract values
-        values = [data.value for _, data in sensor_data_list]
-        mean = np.mean(values)
-        std = np.std(values)
+        if std == 0:
+            return np.ones(len(values), dtype=bool)
         
         # Remove outliers (more than 3 standard deviations)
         threshold = self.config['thresholds']['outlier_detection']
-        filtered = []
-        
-        for sensor_id, sensor_data in sensor_data_list:
-            z_score = abs(sensor_data.value - mean) / std if std > 0 else 0
-            if z_score <= threshold:
-                filtered.append((sensor_id, sensor_data))
-        
-        return filtered
+        return np.abs(values - mean) / std <= threshold
     
     def get_sensor_status(self) -> Dict[str, Dict]:
         """Get status of all sensors"""
         status = {}
         
         for sensor_id, buffer in self.data_buffers.items():
-            if buffer:
-                latest = buffer[-1]
+            if len(buffer):
                 status[sensor_id] = {
-                    'last_reading': latest.value,
-                    'last_timestamp': latest.timestamp,
-                    'confidence': latest.confidence,
+                    'last_reading': buffer.latest_value,
+                    'last_timestamp': buffer.latest_timestamp,
+                    'confidence': buffer.latest_confidence,
                     'buffer_size': len(buffer),
-                    'data_rate': len(buffer) / (time.time() - buffer[0].timestamp) if len(buffer) > 1 else 0
+                    'data_rate': len(buffer) / (time.time() - buffer.first_timestamp) if len(buffer) > 1 else 0
                 }
             else:
                 status[sensor_id] = {
@@ -255,14 +410,17 @@ class SensorFusion:
         
         for sensor_id, buffer in self.data_buffers.items():
             if len(buffer) > 1:
-                values = [data.value for data in buffer]
+                sensor_stats = self.statistics[sensor_id]
+                values = buffer.values()
                 stats[sensor_id] = {
-                    'count': len(values),
-                    'mean': np.mean(values),
-                    'std': np.std(values),
-                    'min': np.min(values),
-                    'max': np.max(values),
-                    'latest': values[-1],
+                    'count': len(buffer),
+                    'mean': buffer.mean,
+                    'std': buffer.std,
+                    'min': sensor_stats.extremes.min,
+                    'max': sensor_stats.extremes.max,
+                    'latest': float(values[-1]),
+                    'ewma': sensor_stats.ewma.mean,
+                    'ewma_std': sensor_stats.ewma.std,
                     'trend': 'increasing' if values[-1] > values[0] else 'decreasing'
                 }
         
@@ -272,26 +430,21 @@ class SensorFusion:
         """Detect anomalies in sensor data"""
         anomalies = []
         
-        for sensor_id, buffer in self.data_buffers.items():
-            if len(buffer) < 10:
-                continue
-            
-            # Get recent values
-            recent_values = [data.value for data in list(buffer)[-10:]]
-            older_values = [data.value for data in list(buffer)[-20:-10]] if len(buffer) >= 20 else []
-            
-            if not older_values:
+        threshold = self.config.get('thresholds', {}).get('anomaly_z_score', 2.5)
+        
+        for sensor_id, sensor_stats in self.statistics.items():
+            # Needs a full recent window and a full window before it
+            if sensor_stats.count < 2 * sensor_stats.recent:
                 continue
             
-            # Statistical anomaly detection
-            recent_mean = np.mean(recent_values)
-            older_mean = np.mean(older_values)
-            older_std = np.std(older_values)
+            # Statistical anomaly detection from the sliding window sums
+            recent_mean = sensor_stats.recent_mean
+            older_mean, older_std = sensor_stats.previous_window()
             
             if older_std > 0:
                 z_score = abs(recent_mean - older_mean) / older_std
                 
-                if z_score > 2.5:  # Threshold for anomaly
+                if z_score > threshold:
                     anomalies.append({
                         'sensor_id': sensor_id,
                         'type': 'statistical_anomaly',
@@ -300,6 +453,17 @@ class SensorFusion:
                         'historical_mean': older_mean,
                         'timestamp': time.time()
                     })
+            
+            # Sustained mean shifts flagged by CUSUM / Page-Hinkley
+            change = sensor_stats.recent_change()
+            if change:
+                anomalies.append({
+                    'sensor_id': sensor_id,
+                    'type': 'change_point',
+                    'detector': change.detector,
+                    'direction': change.direction,
+                    'timestamp': change.timestamp
+                })
         
         return anomalies
     
@@ -309,16 +473,14 @@ class SensorFusion:
             return None
         
         # Get recent values
-        recent_data = list(self.data_buffers[sensor_id])[-10:]
-        values = [data.value for data in recent_data]
-        timestamps = [data.timestamp for data in recent_data]
+        values = self.data_buffers[sensor_id].values(10)
         
         if len(values) < 2:
             return None
         
         # Simple linear regression
-        x = np.array(range(len(values)))
-        y = np.array(values)
+        x = np.arange(len(values))
+        y = values
         
         # Fit line
         coeffs = np.polyfit(x, y, 1)
@@ -334,14 +496,16 @@ class SensorFusion:
         export_data = {}
         
         for sensor_id, buffer in self.data_buffers.items():
+            unit = self.sensor_data[sensor_id].unit
+            values, timestamps, confidences = buffer.window()
             export_data[sensor_id] = [
                 {
-                    'value': data.value,
-                    'unit': data.unit,
-                    'timestamp': data.timestamp,
-                    'confidence': data.confidence
+                    'value': value,
+                    'unit': unit,
+                    'timestamp': timestamp,
+                    'confidence': confidence
                 }
-                for data in buffer
+                for value, timestamp, confidence in zip(values.tolist(), timestamps.tolist(), confidences.tolist())
             ]
         
         if format == 'json':
@@ -356,7 +520,10 @@ class SensorFusion:
     def cleanup(self):
         """Cleanup resources"""
         self.data_buffers.clear()
-        self.fusion_filters.clear()
+        self.sensor_data.clear()
+        self.statistics.clear()
+        self.distance_filter = BatchKalmanFilter(self.distance_filter.acceleration_variance)
+        self.distance_weights = np.zeros(0)
         self.logger.info("Sensor fusion system cleaned up")
 
 # Example usage
@@ -407,7 +574,8 @@ if __name__ == "__main__":
             
             if 'distance' in fused:
                 distance_fusion = fused['distance']
-                print(f"Fused distance: {distance_fusion.value:.2f}cm (confidence: {distance_fusion.confidence:.2f})")
+                print(f"Fused distance: {distance_fusion.value:.2f}cm (confidence: {distance_fusion.confidence:.2f}, "
+                      f"closing speed: {distance_fusion.closing_speed:.1f}cm/s)")
             
             time.sleep(0.05)
         
@@ -1,11 +1,21 @@
-import RPi.GPIO as GPIO
+import os
 import time
 import logging
 from typing import Dict, List, Optional, Tuple
 import threading
-import queue
 from dataclasses import dataclass
 
+import numpy as np
+
+from reading_channel import ReadingChannel
+
+# Simulated echoes only when asked for; a missing RPi.GPIO must not turn
+# into made-up distances on a real device
+if os.getenv('ULTRASONIC_FAKE_GPIO', 'false').lower() == 'true':
+    import fake_gpio as GPIO
+else:
+    import RPi.GPIO as GPIO
+
 @dataclass
 class SensorReading:
     """Sensor reading data structure"""
@@ -18,7 +28,8 @@ class UltrasonicSensor:
     """Ultrasonic distance sensor for obstacle detection"""
     
     def __init__(self, trigger_pin: int, echo_pin: int, 
-                 sensor_id: str = "default", max_distance: float = 400.0):
+                 sensor_id: str = "default", max_distance: float = 400.0,
+                 mode: str = "interrupt", buffer_size: int = 256):
         """
         Initialize ultrasonic sensor
         
@@ -27,6 +38,8 @@ class UltrasonicSensor:
             echo_pin: GPIO pin for echo
             sensor_id: Unique identifier for sensor
             max_distance: Maximum measurable distance in cm
+            mode: "interrupt" (echo edge callbacks) or "poll" (busy-wait on the echo pin)
+            buffer_size: Readings kept for latest-value and windowed reads
         """
         self.trigger_pin = trigger_pin
         self.echo_pin = echo_pin
@@ -38,10 +51,14 @@ class UltrasonicSensor:
         GPIO.setup(trigger_pin, GPIO.OUT)
         GPIO.setup(echo_pin, GPIO.IN)
         
+        if hasattr(GPIO, 'attach_ultrasonic'):
+            # Simulated GPIO: pair the pins as one fake sensor
+            GPIO.attach_ultrasonic(trigger_pin, echo_pin)
+        
         # Sensor state
         self.is_active = False
         self.reading_thread = None
-        self.reading_queue = queue.Queue()
+        self.readings = ReadingChannel(buffer_size)
         
         # Calibration
         self.speed_of_sound = 34300  # cm/s at 20°C
@@ -51,38 +68,110 @@ class UltrasonicSensor:
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
         
-        self.logger.info(f"Ultrasonic sensor {sensor_id} initialized on pins {trigger_pin}/{echo_pin}")
+        # Echo edge timestamps (perf_counter_ns) written by the GPIO callback thread
+        self.mode = mode
+        self.echo_start_ns = None
+        self.echo_end_ns = None
+        self.echo_armed = False
+        self.echo_done = threading.Event()
+        
+        if mode == "interrupt":
+            try:
+                GPIO.add_event_detect(echo_pin, GPIO.BOTH, callback=self._on_echo_edge)
+            except RuntimeError as e:
+                self.logger.warning(f"Edge detection unavailable for sensor {sensor_id}, polling instead: {str(e)}")
+                self.mode = "poll"
+        
+        self.logger.info(f"Ultrasonic sensor {sensor_id} initialized on pins {trigger_pin}/{echo_pin} ({self.mode} mode)")
+    
+    @property
+    def echo_timeout(self) -> float:
+        """Longest echo wait in seconds: round trip at max distance plus margin"""
+        return 2 * self.max_distance / self.speed_of_sound + 0.005
+    
+    def _on_echo_edge(self, channel: int):
+        """GPIO callback on both echo edges
+        
+        RPi.GPIO does not report the edge direction and reading the pin here
+        races short echoes, so edges are told apart by order: after a
+        trigger the first one is rising and the second falling.
+        """
+        now = time.perf_counter_ns()
+        
+        if not self.echo_armed:
+            return
+        
+        if self.echo_start_ns is None:
+            self.echo_start_ns = now
+        else:
+            self.echo_end_ns = now
+            self.echo_armed = False
+            self.echo_done.set()
+    
+    def _send_trigger(self):
+        """Send the 10 microsecond trigger pulse"""
+        GPIO.output(self.trigger_pin, GPIO.LOW)
+        time.sleep(0.000002)  # 2 microseconds
+        GPIO.output(self.trigger_pin, GPIO.HIGH)
+        time.sleep(0.00001)   # 10 microseconds
+        GPIO.output(self.trigger_pin, GPIO.LOW)
+    
+    def _measure_interrupt(self) -> Optional[float]:
+        """Echo pulse width in seconds from edge callback timestamps"""
+        # A previous echo still high would make its falling edge look like a rising one
+        if GPIO.input(self.echo_pin):
+            return None
+        
+        self.echo_start_ns = None
+        self.echo_end_ns = None
+        self.echo_done.clear()
+        self.echo_armed = True
+        
+        self._send_trigger()
+        
+        # Sleeps until the falling edge instead of spinning on the pin
+        if not self.echo_done.wait(self.echo_timeout):
+            self.echo_armed = False
+            return None
+        
+        return (self.echo_end_ns - self.echo_start_ns) / 1e9
+    
+    def _measure_poll(self) -> Optional[float]:
+        """Echo pulse width in seconds by busy-waiting on the echo pin"""
+        self._send_trigger()
+        
+        # Wait for echo start
+        timeout = time.perf_counter_ns() + int(self.echo_timeout * 1e9)
+        
+        while GPIO.input(self.echo_pin) == 0:
+            if time.perf_counter_ns() > timeout:
+                return None
+        
+        pulse_start = time.perf_counter_ns()
+        
+        # Wait for echo end
+        timeout = pulse_start + int(self.echo_timeout * 1e9)
+        
+        while GPIO.input(self.echo_pin) == 1:
+            if time.perf_counter_ns() > timeout:
+                return None
+        
+        pulse_end = time.perf_counter_ns()
+        
+        return (pulse_end - pulse_start) / 1e9
     
     def measure_distance(self) -> Optional[float]:
         """Measure distance using ultrasonic sensor"""
         try:
-            # Send trigger pulse
-            GPIO.output(self.trigger_pin, GPIO.LOW)
-            time.sleep(0.000002)  # 2 microseconds
-            GPIO.output(self.trigger_pin, GPIO.HIGH)
-            time.sleep(0.00001)   # 10 microseconds
-            GPIO.output(self.trigger_pin, GPIO.LOW)
-            
-            # Wait for echo start
-            timeout = time.time() + 0.04  # 40ms timeout (max distance ~400cm)
-            
-            while GPIO.input(self.echo_pin) == 0:
-                if time.time() > timeout:
-                    return None
-            
-            pulse_start = time.time()
+            if self.mode == "interrupt":
+                pulse_duration = self._measure_interrupt()
+            else:
+                pulse_duration = self._measure_poll()
             
-            # Wait for echo end
-            timeout = time.time() + 0.04
-            
-            while GPIO.input(self.echo_pin) == 1:
-                if time.time() > timeout:
-                    return None
-            
-            pulse_end = time.time()
+            if pulse_duration is None:
+                return None
             
             # Calculate distance
-            pulse_duration = pulse_end - pulse_start
             distance = (pulse_duration * self.speed_of_sound) / 2
             
             # Apply temperature compensation
@@ -129,13 +218,16 @@ class UltrasonicSensor:
     def _continuous_reading_worker(self, interval: float):
         """Worker thread for continuous readings"""
         while self.is_active:
-            reading = self.get_reading()
-            
-            if reading:
-                self.reading_queue.put(reading)
-            
+            self.record_reading(self.get_reading())
             time.sleep(interval)
     
+    def record_reading(self, reading: Optional[SensorReading]):
+        """Store a reading taken by this sensor or by a scheduler"""
+        if reading:
+            self.readings.append(reading.distance, reading.timestamp)
+        else:
+            self.readings.record_miss()
+    
     def stop_continuous_reading(self):
         """Stop continuous readings"""
         self.is_active = False
@@ -145,12 +237,37 @@ class UltrasonicSensor:
         
         self.logger.info(f"Stopped continuous reading for sensor {self.sensor_id}")
     
-    def get_latest_reading(self) -> Optional[SensorReading]:
-        """Get the latest reading from queue"""
-        try:
-            return self.reading_queue.get_nowait()
-        except queue.Empty:
+    def get_latest_reading(self, max_age: Optional[float] = None) -> Optional[SensorReading]:
+        """Get the newest stored reading, optionally only if younger than max_age seconds"""
+        latest = self.readings.latest()
+        
+        if latest is None:
+            return None
+        
+        timestamp, distance = latest
+        if max_age is not None and time.time() - timestamp > max_age:
             return None
+        
+        return SensorReading(distance=distance, timestamp=timestamp, sensor_id=self.sensor_id)
+    
+    def get_readings(self, count: Optional[int] = None,
+                     seconds: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Stored readings as (timestamps, distances) arrays, oldest first
+        
+        Args:
+            count: Only the newest ``count`` readings
+            seconds: Only readings from the last ``seconds``
+        """
+        if seconds is not None:
+            timestamps, distances = self.readings.since(seconds)
+            start = 0 if count is None else max(len(timestamps) - count, 0)
+            return timestamps[start:], distances[start:]
+        
+        return self.readings.last(self.readings.capacity if count is None else count)
+    
+    def get_new_readings(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Readings not returned by a previous call as (timestamps, distances) arrays"""
+        return self.readings.read_new()
     
     def get_average_reading(self, count: int = 5) -> Optional[float]:
         """Get average of multiple readings"""
@@ -196,13 +313,17 @@ class UltrasonicSensor:
             'max_distance': self.max_distance,
             'speed_of_sound': self.speed_of_sound,
             'temperature_offset': self.temperature_offset,
-            'is_active': self.is_active
+            'mode': self.mode,
+            'is_active': self.is_active,
+            'readings': self.readings.get_stats()
         }
     
     def cleanup(self):
         """Cleanup GPIO resources"""
         try:
             self.stop_continuous_reading()
+            if self.mode == "interrupt":
+                GPIO.remove_event_detect(self.echo_pin)
             GPIO.cleanup([self.trigger_pin, self.echo_pin])
             self.logger.info(f"Sensor {self.sensor_id} cleaned up")
         except Exception as e:
@@ -211,16 +332,26 @@ class UltrasonicSensor:
 class MultiSensorArray:
     """Array of multiple ultrasonic sensors"""
     
-    def __init__(self, sensor_configs: List[Dict]):
+    def __init__(self, sensor_configs: List[Dict], guard_time: float = 0.01):
         """
         Initialize sensor array
         
         Args:
             sensor_configs: List of sensor configurations
                            [{'trigger_pin': int, 'echo_pin': int, 'sensor_id': str}]
+            guard_time: Pause after each measurement so residual echoes die out
+                        before the next sensor fires (seconds)
         """
         self.sensors = {}
         self.is_active = False
+        self.guard_time = guard_time
+        self.scheduler_thread = None
+        self.stop_event = threading.Event()
+        self.cycles = 0
+        
+        # Readings from the last complete staggered cycle, swapped in whole
+        self.snapshot: Dict[str, SensorReading] = {}
+        self.snapshot_time = None
         
         # Create sensors
         for config in sensor_configs:
@@ -229,31 +360,93 @@ class MultiSensorArray:
                 trigger_pin=config['trigger_pin'],
                 echo_pin=config['echo_pin'],
                 sensor_id=sensor_id,
-                max_distance=config.get('max_distance', 400.0)
+                max_distance=config.get('max_distance', 400.0),
+                mode=config.get('mode', 'interrupt')
             )
             self.sensors[sensor_id] = sensor
         
         self.logger = logging.getLogger(__name__)
         self.logger.info(f"Initialized sensor array with {len(self.sensors)} sensors")
     
-    def start_all_sensors(self, interval: float = 0.1):
-        """Start all sensors"""
-        for sensor in self.sensors.values():
-            sensor.start_continuous_reading(interval)
+    def start_all_sensors(self, interval: float = 0.1, staggered: bool = True):
+        """Start all sensors
+        
+        With ``staggered`` a single scheduler fires the sensors one after
+        another, so no two sensors ping at the same time (cross-talk). Each
+        sensor fires as soon as the previous echo completed plus the guard
+        time, and at most once per ``interval`` seconds.
+        """
+        if self.is_active:
+            return
         
         self.is_active = True
-        self.logger.info("All sensors started")
+        
+        if staggered:
+            self.stop_event.clear()
+            self.scheduler_thread = threading.Thread(
+                target=self._round_robin_worker,
+                args=(interval,)
+            )
+            self.scheduler_thread.daemon = True
+            self.scheduler_thread.start()
+        else:
+            for sensor in self.sensors.values():
+                sensor.start_continuous_reading(interval)
+        
+        self.logger.info(f"All sensors started ({'staggered' if staggered else 'free-running'})")
+    
+    def _round_robin_worker(self, interval: float):
+        """Fire each sensor in turn, one echo in flight at a time"""
+        sensors = list(self.sensors.values())
+        
+        while not self.stop_event.is_set():
+            cycle_start = time.perf_counter()
+            cycle_readings = {}
+            
+            for sensor in sensors:
+                reading = sensor.get_reading()
+                sensor.record_reading(reading)
+                if reading:
+                    cycle_readings[sensor.sensor_id] = reading
+                if self.stop_event.wait(self.guard_time):
+                    return
+            
+            # Publish the cycle as one unit so readers never mix cycles
+            self.snapshot = cycle_readings
+            self.snapshot_time = time.time()
+            self.cycles += 1
+            
+            # Never fire a sensor more often than the requested interval
+            remaining = interval - (time.perf_counter() - cycle_start)
+            if remaining > 0:
+                self.stop_event.wait(remaining)
     
     def stop_all_sensors(self):
         """Stop all sensors"""
+        self.stop_event.set()
+        
+        if self.scheduler_thread and self.scheduler_thread.is_alive():
+            self.scheduler_thread.join(timeout=1)
+        self.scheduler_thread = None
+        self.snapshot = {}
+        self.snapshot_time = None
+        
         for sensor in self.sensors.values():
             sensor.stop_continuous_reading()
         
         self.is_active = False
         self.logger.info("All sensors stopped")
     
-    def get_all_readings(self) -> Dict[str, SensorReading]:
-        """Get latest readings from all sensors"""
+    def get_all_readings(self, max_skew: float = 0.5) -> Dict[str, SensorReading]:
+        """Get one time-aligned set of readings from all sensors
+        
+        While the staggered scheduler runs this is the last complete firing
+        cycle. Otherwise it is each sensor's latest reading, leaving out any
+        older than ``max_skew`` seconds relative to the newest one.
+        """
+        if self.scheduler_thread is not None and self.snapshot_time is not None:
+            return dict(self.snapshot)
+        
         readings = {}
         
         for sensor_id, sensor in self.sensors.items():
@@ -261,6 +454,13 @@ class MultiSensorArray:
             if reading:
                 readings[sensor_id] = reading
         
+        if readings:
+            newest = max(reading.timestamp for reading in readings.values())
+            readings = {
+                sensor_id: reading for sensor_id, reading in readings.items()
+                if newest - reading.timestamp <= max_skew
+            }
+        
         return readings
     
     def get_closest_obstacle(self) -> Optional[Tuple[str, SensorReading]]:
@@ -0,0 +1,388 @@
+import asyncio
+import base64
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+import websockets
+
+from adaptive_stream import AdaptiveController, PROFILES
+from jpeg_encoder import HardwareMjpegSource, JpegEncoderPool
+from stream_protocol import encode_frame_message, FLAG_KEYFRAME
+
+logger = logging.getLogger(__name__)
+
+def request_path(websocket, path: Optional[str] = None) -> str:
+    """Request path across websockets versions (legacy handlers get it as an argument)"""
+    if path is not None:
+        return path
+    request = getattr(websocket, 'request', None)
+    return getattr(request, 'path', None) or getattr(websocket, 'path', '/')
+
+def send_buffer_size(websocket) -> int:
+    """Bytes queued in the socket's transport, waiting to go out"""
+    transport = getattr(websocket, 'transport', None)
+    if transport is None:
+        return 0
+    return transport.get_write_buffer_size()
+
+class ChangeDetector:
+    """Detects frames that are visually unchanged from the last one sent"""
+
+    def __init__(self, threshold: float = 2.0, keyframe_interval: float = 2.0):
+        self.threshold = threshold
+        self.keyframe_interval = keyframe_interval
+        self.last_thumbnail = None
+        self.last_keyframe_time = 0.0
+
+    def check(self, frame: np.ndarray, now: float) -> Tuple[bool, bool]:
+        """Return (changed, keyframe) for a frame"""
+        thumbnail = cv2.resize(frame[..., :3], (32, 24), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+        keyframe = self.last_thumbnail is None or now - self.last_keyframe_time >= self.keyframe_interval
+        changed = keyframe or np.abs(thumbnail - self.last_thumbnail).mean() >= self.threshold
+
+        if changed:
+            self.last_thumbnail = thumbnail
+        if keyframe:
+            self.last_keyframe_time = now
+
+        return changed, keyframe
+
+@dataclass(eq=False)
+class Subscriber:
+    """One connected viewer, its negotiated profile and bounded outgoing queue"""
+    websocket: object
+    legacy_json: bool = False
+    skip_unchanged: bool = False
+    controller: AdaptiveController = None
+    queue_size: int = 2
+    queue: asyncio.Queue = None
+    needs_full_frame: bool = True
+    keyframe_requested: bool = False
+    next_due: float = 0.0
+    frames_sent: int = 0
+    frames_dropped: int = 0
+
+    def __post_init__(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.controller is None:
+            self.controller = AdaptiveController()
+
+    def is_due(self, now: float, tick: float) -> bool:
+        """Whether this viewer's frame rate calls for a frame at this tick"""
+        if self.keyframe_requested:
+            return True
+        if now < self.next_due - tick / 2:
+            return False
+
+        period = 1.0 / self.controller.profile.fps
+        self.next_due = max(self.next_due + period, now + period - tick)
+        return True
+
+    def offer(self, message, captured_at: float):
+        """Queue a message, dropping the oldest queued one when the viewer lags"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.frames_dropped += 1
+            self.controller.record_drop()
+            # The dropped message may have been the last full frame
+            self.needs_full_frame = True
+        self.queue.put_nowait((message, captured_at))
+
+class StreamBroadcaster:
+    """Captures each frame once and fans it out to all viewers
+
+    A single producer task captures a frame per tick and runs change
+    detection once. Every viewer has its own profile (resolution, JPEG
+    quality, frame rate) picked by an AdaptiveController from its measured
+    round-trip and send-queue latency; a frame is encoded once per distinct
+    profile in use, in a JpegEncoderPool off the event loop, and the
+    resulting messages are shared. Each viewer has a
+    small queue and its own send task, so a slow viewer drops frames instead
+    of delaying the others. Viewers can request a full-resolution keyframe
+    (for ML consumers) with a ``{"type": "keyframe"}`` message. The producer
+    only runs while at least one viewer is connected.
+    """
+
+    def __init__(self, capture_fn: Callable[[], np.ndarray],
+                 sensor_fn: Callable[[], Dict], fps: float = 30.0,
+                 max_send_buffer: int = 256 * 1024, change_threshold: float = 2.0,
+                 keyframe_interval: float = 2.0, keyframe_quality: int = 90,
+                 adjust_interval: float = 1.0, encoder_pool: Optional[JpegEncoderPool] = None,
+                 hardware_source: Optional[HardwareMjpegSource] = None):
+        self.capture_fn = capture_fn
+        self.sensor_fn = sensor_fn
+        self.fps = fps
+        self.max_send_buffer = max_send_buffer
+        self.keyframe_quality = keyframe_quality
+        self.adjust_interval = adjust_interval
+        self.encoder_pool = encoder_pool or JpegEncoderPool()
+        # Hardware MJPEG frames replace software encodes at capture resolution
+        # and keyframe quality; lower qualities are encoded in software
+        self.hardware_source = hardware_source
+
+        self.change_detector = ChangeDetector(change_threshold, keyframe_interval)
+        self.subscribers: Set[Subscriber] = set()
+        self.producer_task: Optional[asyncio.Task] = None
+
+        self.frame_id = 0
+        self.frames_captured = 0
+        self.frames_encoded = 0
+
+    def subscribe(self, websocket, legacy_json: bool = False, skip_unchanged: bool = False,
+                  controller: Optional[AdaptiveController] = None) -> Subscriber:
+        """Register a viewer, starting the producer for the first one"""
+        subscriber = Subscriber(websocket, legacy_json, skip_unchanged, controller)
+        self.subscribers.add(subscriber)
+
+        if self.producer_task is None or self.producer_task.done():
+            self.producer_task = asyncio.ensure_future(self._produce())
+
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        """Remove a viewer, stopping the producer after the last one"""
+        self.subscribers.discard(subscriber)
+
+        if not self.subscribers and self.producer_task is not None:
+            self.producer_task.cancel()
+            self.producer_task = None
+
+    async def _produce(self):
+        """Capture, encode and broadcast one frame per tick"""
+        loop = asyncio.get_event_loop()
+        interval = 1.0 / self.fps
+        next_tick = loop.time()
+
+        while self.subscribers:
+            # Pace on a fixed schedule rather than sleeping a full interval after each frame
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_tick = loop.time()
+
+            try:
+                await self._broadcast_frame(loop.time(), interval)
+            except Exception as e:
+                logger.error(f"Frame broadcast error: {str(e)}")
+
+    async def _broadcast_frame(self, now: float, tick: float):
+        """Capture once, encode once per profile, then hand the messages to due viewers"""
+        due = [s for s in list(self.subscribers) if s.is_due(now, tick)]
+        if not due:
+            return
+
+        # Capture blocks until the next camera frame, keep it off the event loop
+        loop = asyncio.get_event_loop()
+        frame = await loop.run_in_executor(None, self.capture_fn)
+        timestamp = time.time()
+        sensor_data = self.sensor_fn()
+        self.frame_id += 1
+        self.frames_captured += 1
+
+        height, width = frame.shape[:2]
+        flags = 0
+        changed = True
+        if any(s.skip_unchanged for s in due):
+            changed, keyframe = self.change_detector.check(frame, timestamp)
+            if keyframe:
+                flags |= FLAG_KEYFRAME
+            if changed:
+                # The detector now compares against this frame, so viewers
+                # that skip this tick would never see the change otherwise
+                for subscriber in self.subscribers.difference(due):
+                    subscriber.needs_full_frame = True
+
+        # Pick the JPEG and message variant each viewer needs
+        plans = []
+        for subscriber in due:
+            if subscriber.keyframe_requested:
+                # Full capture resolution for ML consumers
+                size, quality, frame_flags = (width, height), self.keyframe_quality, flags | FLAG_KEYFRAME
+            else:
+                # Fit inside the profile keeping the capture aspect ratio, never upscale
+                profile = subscriber.controller.profile
+                scale = min(profile.width / width, profile.height / height, 1.0)
+                size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                quality, frame_flags = profile.quality, flags
+
+            if subscriber.legacy_json:
+                key = ('json', size, quality)
+            elif (subscriber.skip_unchanged and not changed and not subscriber.needs_full_frame
+                  and not subscriber.keyframe_requested):
+                key = ('unchanged',)
+            else:
+                key = ('binary', size, quality, frame_flags)
+
+            plans.append((subscriber, key, subscriber.keyframe_requested))
+
+        # Each distinct JPEG is encoded once, all of them concurrently in the pool
+        hardware_jpeg = self.hardware_source.get_latest() if self.hardware_source else None
+        jpeg_keys = list({key[1:3] for _, key, _ in plans if key[0] != 'unchanged'})
+        encoded = {}
+        pending = []
+
+        for size, quality in jpeg_keys:
+            if hardware_jpeg is not None and size == (width, height) and quality >= self.keyframe_quality:
+                encoded[(size, quality)] = hardware_jpeg
+            else:
+                pending.append((size, quality))
+
+        results = await asyncio.gather(*[
+            self.encoder_pool.encode(frame, quality, size) for size, quality in pending
+        ])
+        encoded.update(zip(pending, results))
+        self.frames_encoded += len(pending)
+
+        messages = {}
+        for subscriber, key, keyframe_requested in plans:
+            if key not in messages:
+                if key[0] == 'json':
+                    messages[key] = json.dumps({
+                        'type': 'stream',
+                        'data': {
+                            'frame': base64.b64encode(encoded[key[1:3]]).decode('utf-8'),
+                            'frame_id': self.frame_id,
+                            'timestamp': timestamp,
+                            'sensor_data': sensor_data
+                        }
+                    })
+                elif key[0] == 'unchanged':
+                    messages[key] = encode_frame_message(self.frame_id, timestamp, None, sensor_data, flags)
+                else:
+                    messages[key] = encode_frame_message(
+                        self.frame_id, timestamp, encoded[key[1:3]], sensor_data, key[3]
+                    )
+
+            if key[0] != 'unchanged':
+                subscriber.needs_full_frame = False
+            if keyframe_requested:
+                subscriber.keyframe_requested = False
+            subscriber.offer(messages[key], timestamp)
+
+    async def send_profile(self, subscriber: Subscriber):
+        """Tell a viewer which profile it is receiving"""
+        await subscriber.websocket.send(json.dumps({
+            'type': 'profile',
+            'profile': subscriber.controller.profile.to_dict(),
+            'adaptive': subscriber.controller.adaptive
+        }))
+
+    async def send_loop(self, subscriber: Subscriber):
+        """Send queued messages to one viewer until it disconnects"""
+        websocket = subscriber.websocket
+
+        while True:
+            message, captured_at = await subscriber.queue.get()
+
+            # Socket is backed up, drop this frame rather than queueing it in the kernel
+            if send_buffer_size(websocket) > self.max_send_buffer:
+                subscriber.frames_dropped += 1
+                subscriber.controller.record_drop()
+                if not isinstance(message, str):
+                    subscriber.needs_full_frame = True
+                continue
+
+            await websocket.send(message)
+            subscriber.frames_sent += 1
+            subscriber.controller.record_queue_latency(time.time() - captured_at)
+
+    async def control_loop(self, subscriber: Subscriber):
+        """Measure round-trip time and re-evaluate the viewer's profile"""
+        websocket = subscriber.websocket
+
+        while True:
+            await asyncio.sleep(self.adjust_interval)
+
+            started = time.perf_counter()
+            try:
+                pong = await websocket.ping()
+                await asyncio.wait_for(pong, timeout=2 * self.adjust_interval)
+                subscriber.controller.record_rtt(time.perf_counter() - started)
+            except asyncio.TimeoutError:
+                subscriber.controller.record_rtt(2 * self.adjust_interval)
+
+            if subscriber.controller.update():
+                logger.info(
+                    f"Viewer {getattr(websocket, 'remote_address', None)} switched to "
+                    f"{subscriber.controller.profile.name} profile"
+                )
+                await self.send_profile(subscriber)
+
+    async def receive_loop(self, subscriber: Subscriber):
+        """Handle keyframe and profile requests from a viewer"""
+        async for message in subscriber.websocket:
+            if isinstance(message, bytes):
+                continue
+
+            try:
+                data = json.loads(message)
+            except ValueError:
+                continue
+
+            # Malformed control messages are ignored, they must not end the stream
+            if not isinstance(data, dict):
+                continue
+
+            if data.get('type') == 'keyframe':
+                subscriber.keyframe_requested = True
+            elif data.get('type') == 'profile':
+                max_profile = data.get('max_profile')
+                if isinstance(max_profile, str) and max_profile in PROFILES:
+                    subscriber.controller.set_max_profile(max_profile)
+                if 'adaptive' in data:
+                    subscriber.controller.adaptive = bool(data['adaptive'])
+                await self.send_profile(subscriber)
+
+    async def serve_client(self, websocket, legacy_json: bool = False, skip_unchanged: bool = False,
+                           controller: Optional[AdaptiveController] = None) -> Subscriber:
+        """Stream to one viewer until it disconnects"""
+        subscriber = self.subscribe(websocket, legacy_json, skip_unchanged, controller)
+        tasks = [
+            asyncio.ensure_future(self.send_loop(subscriber)),
+            asyncio.ensure_future(self.control_loop(subscriber)),
+            asyncio.ensure_future(self.receive_loop(subscriber)),
+        ]
+
+        try:
+            await self.send_profile(subscriber)
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error is not None and not isinstance(error, websockets.exceptions.ConnectionClosed):
+                    raise error
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.unsubscribe(subscriber)
+
+        return subscriber
+
+    def get_stats(self) -> Dict:
+        """Producer and per-viewer statistics"""
+        return {
+            'subscribers': len(self.subscribers),
+            'frames_captured': self.frames_captured,
+            'frames_encoded': self.frames_encoded,
+            'encoder': self.encoder_pool.encoder.name,
+            'encoder_workers': self.encoder_pool.workers,
+            'hardware_mjpeg': self.hardware_source is not None,
+            'viewers': [
+                {
+                    'remote_address': str(getattr(s.websocket, 'remote_address', None)),
+                    'frames_sent': s.frames_sent,
+                    'frames_dropped': s.frames_dropped,
+                    **s.controller.get_stats()
+                }
+                for s in list(self.subscribers)
+            ]
+        }
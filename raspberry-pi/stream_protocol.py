@@ -0,0 +1,72 @@
+"""Binary framing for the Raspberry Pi video stream
+
+Each video frame is sent as one binary WebSocket message:
+
+    offset  size  field
+    0       4     magic b'PIVF'
+    4       1     protocol version
+    5       1     flags (FLAG_*)
+    6       4     frame id (uint32)
+    10      8     capture timestamp, unix seconds (float64)
+    18      2     sensor block length N (uint16)
+    20      N     sensor block, compact UTF-8 JSON
+    20+N    ...   JPEG bytes (absent when FLAG_UNCHANGED is set)
+
+All integers are big-endian. Compared to base64 JPEG inside JSON this
+saves ~33% bandwidth and the base64/JSON encoding cost on the Pi.
+"""
+import json
+import struct
+from typing import Dict, Optional, Tuple
+
+STREAM_MAGIC = b'PIVF'
+STREAM_VERSION = 1
+
+STREAM_HEADER = struct.Struct('>4sBBIdH')
+
+# Frame is identical to the previous one, no JPEG payload follows
+FLAG_UNCHANGED = 0x01
+# Full frame sent regardless of change detection
+FLAG_KEYFRAME = 0x02
+
+def encode_frame_message(frame_id: int, timestamp: float, jpeg: Optional[bytes],
+                         sensor_data: Optional[Dict] = None, flags: int = 0) -> bytes:
+    """Pack a header, sensor block and JPEG into one binary message"""
+    sensor_block = json.dumps(sensor_data or {}, separators=(',', ':')).encode('utf-8')
+    if len(sensor_block) > 0xFFFF:
+        raise ValueError("Sensor block too large")
+
+    if jpeg is None:
+        flags |= FLAG_UNCHANGED
+
+    header = STREAM_HEADER.pack(
+        STREAM_MAGIC, STREAM_VERSION, flags, frame_id & 0xFFFFFFFF, timestamp, len(sensor_block)
+    )
+
+    return b''.join((header, sensor_block, jpeg or b''))
+
+def decode_frame_message(message: bytes) -> Tuple[Dict, memoryview]:
+    """Unpack a binary message into (header fields, JPEG view)"""
+    if len(message) < STREAM_HEADER.size:
+        raise ValueError("Message shorter than stream header")
+
+    magic, version, flags, frame_id, timestamp, sensor_length = STREAM_HEADER.unpack_from(message)
+    if magic != STREAM_MAGIC:
+        raise ValueError("Not a stream frame message")
+    if version != STREAM_VERSION:
+        raise ValueError(f"Unsupported stream protocol version {version}")
+
+    view = memoryview(message)
+    sensor_start = STREAM_HEADER.size
+    jpeg_start = sensor_start + sensor_length
+
+    header = {
+        'frame_id': frame_id,
+        'timestamp': timestamp,
+        'flags': flags,
+        'unchanged': bool(flags & FLAG_UNCHANGED),
+        'keyframe': bool(flags & FLAG_KEYFRAME),
+        'sensor_data': json.loads(bytes(view[sensor_start:jpeg_start]) or b'{}')
+    }
+
+    return header, view[jpeg_start:]
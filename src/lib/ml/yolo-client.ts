@@ -40,4 +40,96 @@ export async function detectObjectsFromVideo(
   const imageData = canvas.toDataURL("image/jpeg", 0.8);
 
   return detectObjects(imageData);
-}
\ No newline at end of file
+}
+
+const YOLO_WS_URL = process.env.NEXT_PUBLIC_YOLO_WS_URL || "ws://localhost:5005";
+
+export interface StreamDetectionResult {
+  frameId: number;
+  detections: BoundingBox[];
+  droppedFrames: number;
+  latencyMs: number;
+}
+
+// Persistent streaming channel: frames are pushed as binary messages
+// (4-byte big-endian frame id + JPEG bytes) and results come back tagged
+// with their frame id. The server drops stale frames, so callers can push
+// at camera rate without building up latency.
+export class YoloStreamClient {
+  private ws: WebSocket | null = null;
+  private nextFrameId = 0;
+
+  constructor(
+    private onResult: (result: StreamDetectionResult) => void,
+    private url: string = YOLO_WS_URL
+  ) {}
+
+  connect(confidenceThreshold?: number): void {
+    const ws = new WebSocket(this.url);
+    ws.binaryType = "arraybuffer";
+
+    ws.onopen = () => {
+      if (confidenceThreshold !== undefined) {
+        ws.send(JSON.stringify({ type: "config", confidence_threshold: confidenceThreshold }));
+      }
+    };
+
+    ws.onmessage = (event) => {
+      try {
+        const data = JSON.parse(event.data);
+        if (data.type !== "detections") return;
+
+        this.onResult({
+          frameId: data.frame_id,
+          detections: data.detections || [],
+          droppedFrames: data.dropped_frames || 0,
+          latencyMs: data.timing?.total_ms || 0,
+        });
+      } catch (error) {
+        console.error("YOLO stream message error:", error);
+      }
+    };
+
+    ws.onerror = (error) => {
+      console.error("YOLO stream error:", error);
+    };
+
+    this.ws = ws;
+  }
+
+  async sendFrame(videoElement: HTMLVideoElement, quality: number = 0.8): Promise<number | null> {
+    if (!this.ws || this.ws.readyState !== WebSocket.OPEN) return null;
+
+    // Skip encoding while the socket is still flushing earlier frames
+    if (this.ws.bufferedAmount > 0) return null;
+
+    const canvas = document.createElement("canvas");
+    canvas.width = videoElement.videoWidth;
+    canvas.height = videoElement.videoHeight;
+
+    const ctx = canvas.getContext("2d");
+    if (!ctx) return null;
+
+    ctx.drawImage(videoElement, 0, 0);
+
+    const blob = await new Promise<Blob | null>((resolve) =>
+      canvas.toBlob(resolve, "image/jpeg", quality)
+    );
+    if (!blob) return null;
+
+    const jpeg = new Uint8Array(await blob.arrayBuffer());
+    const message = new Uint8Array(4 + jpeg.length);
+    const frameId = this.nextFrameId++;
+
+    new DataView(message.buffer).setUint32(0, frameId);
+    message.set(jpeg, 4);
+    this.ws.send(message);
+
+    return frameId;
+  }
+
+  disconnect(): void {
+    this.ws?.close();
+    this.ws = null;
+  }
+}
@@ -15,6 +15,44 @@ export interface RaspberryPiStatus {
   lastSeen: string;
 }
 
+// Binary video frame from the Pi stream server (raspberry-pi/stream_protocol.py)
+export interface RaspberryPiStreamFrame {
+  frameId: number;
+  timestamp: number;
+  keyframe: boolean;
+  unchanged: boolean;
+  sensorData: Record<string, any>;
+  jpeg: Blob | null;
+}
+
+const STREAM_MAGIC = 'PIVF';
+const STREAM_HEADER_SIZE = 20;
+const FLAG_UNCHANGED = 0x01;
+const FLAG_KEYFRAME = 0x02;
+
+export function decodeStreamFrame(buffer: ArrayBuffer): RaspberryPiStreamFrame | null {
+  if (buffer.byteLength < STREAM_HEADER_SIZE) return null;
+
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== STREAM_MAGIC) return null;
+
+  const flags = view.getUint8(5);
+  const sensorLength = view.getUint16(18);
+  const sensorEnd = STREAM_HEADER_SIZE + sensorLength;
+  const sensorText = new TextDecoder().decode(new Uint8Array(buffer, STREAM_HEADER_SIZE, sensorLength));
+  const unchanged = (flags & FLAG_UNCHANGED) !== 0;
+
+  return {
+    frameId: view.getUint32(6),
+    timestamp: view.getFloat64(10),
+    keyframe: (flags & FLAG_KEYFRAME) !== 0,
+    unchanged,
+    sensorData: sensorText ? JSON.parse(sensorText) : {},
+    jpeg: unchanged ? null : new Blob([buffer.slice(sensorEnd)], { type: 'image/jpeg' })
+  };
+}
+
 class RaspberryPiClient {
   private baseUrl: string;
   private streamUrl: string | null = null;
@@ -192,12 +230,21 @@ class RaspberryPiClient {
 
     try {
       const ws = new WebSocket(this.streamUrl);
+      ws.binaryType = 'arraybuffer';
 
       ws.onopen = () => {
         console.log('WebSocket connected to Raspberry Pi');
       };
 
       ws.onmessage = (event) => {
+        if (event.data instanceof ArrayBuffer) {
+          const frame = decodeStreamFrame(event.data);
+          if (frame) {
+            onMessage({ type: 'stream', data: frame });
+          }
+          return;
+        }
+
         try {
           const data = JSON.parse(event.data);
           onMessage(data);